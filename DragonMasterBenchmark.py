@@ -0,0 +1,825 @@
+"""
+Run this script to benchmark the parts of our Device Manager that are performance sensitive. This does not require any devices
+or our Unity application to be running. Results are printed to the terminal.
+
+if you have any questions, please contact Ryan Andersen at 404-643-1783
+"""
+#std lib imports
+import sys
+import time
+import os
+import socket
+import threading
+import random
+import tracemalloc
+from types import SimpleNamespace
+
+#internal project imports
+import DragonMasterDeviceManager
+import DragonMasterDevice
+import DragonMasterSerialDevice
+
+
+#region helper methods
+"""
+Runs the function that is passed in the number of times requested and returns the average time in seconds of a single run
+"""
+def time_function(functionToTime, numberOfRuns, *args):
+    startTime = time.perf_counter()
+    for i in range(numberOfRuns):
+        functionToTime(*args)
+    return (time.perf_counter() - startTime) / numberOfRuns
+
+"""
+Prints the name of our benchmark as a header
+"""
+def print_benchmark_header(benchmarkName):
+    print ('=' * 60)
+    print (DragonMasterDeviceManager.set_string_length(benchmarkName, 60, ' '))
+    print ('=' * 60)
+    return
+#endregion helper methods
+
+
+#region frame encoder benchmark
+"""
+This is the way we used to build our frames before adding the TCPFrameEncoder. It is kept here so that we have something to compare against
+"""
+def legacy_build_frame(queuedEvents):
+    bytesToSend = []
+    for event in queuedEvents:
+        eventToAdd = list(event)
+        eventToAdd.insert(0, len(eventToAdd))
+        bytesToSend = bytesToSend + eventToAdd
+    return bytearray(bytesToSend)
+
+"""
+Builds our frame using the TCPFrameEncoder that is used by our TCPManager
+"""
+def encoder_build_frame(frameEncoder, queuedEvents):
+    frameEncoder.reset()
+    for event in queuedEvents:
+        frameEncoder.add_event(event)
+    return frameEncoder.get_frame()
+
+"""
+Compares the time it takes to build a frame of queued events using our legacy list concatenation and our TCPFrameEncoder
+"""
+def benchmark_frame_encoder():
+    print_benchmark_header("Frame Encoder")
+    frameEncoder = DragonMasterDeviceManager.TCPFrameEncoder()
+    for numberOfEvents in [10, 100, 1000, 5000]:
+        #A mix of drax input and joystick sized events with a station hash
+        queuedEvents = [[DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_INPUT_EVENT, 0, 0, 4, 210, i % 256, 1] for i in range(numberOfEvents)]
+        numberOfRuns = max(1, int(10000 / numberOfEvents))
+
+        if bytes(legacy_build_frame(queuedEvents)) != bytes(encoder_build_frame(frameEncoder, queuedEvents)):
+            print ("Frame encoder does not match our legacy frame!")
+            return
+
+        legacyTime = time_function(legacy_build_frame, numberOfRuns, queuedEvents)
+        encoderTime = time_function(encoder_build_frame, numberOfRuns, frameEncoder, queuedEvents)
+        print (DragonMasterDeviceManager.set_string_length_multiple(str(numberOfEvents) + " events", \
+            "legacy: " + "{:.3f}".format(legacyTime * 1000) + "ms  encoder: " + "{:.3f}".format(encoderTime * 1000) + "ms"))
+    return
+#endregion frame encoder benchmark
+
+
+#region frame decoder benchmark
+"""
+This is the way we used to process the events received from Unity. The entire response was buffered before being separated into events
+"""
+def legacy_decode_events(receivedChunks):
+    fullResponse = bytearray()
+    for chunk in receivedChunks:
+        fullResponse += chunk
+    eventList = []
+    startIndex = 0
+    while startIndex < len(fullResponse):
+        sizeOfPacket = (fullResponse[startIndex] << 8) + fullResponse[startIndex + 1]
+        startIndex += 2
+        eventList.append(fullResponse[startIndex:startIndex + sizeOfPacket])
+        startIndex += sizeOfPacket
+    return len(eventList)
+
+"""
+Processes the received chunks using the TCPFrameDecoder, the way our receive threads read into it
+"""
+def decoder_decode_events(frameDecoder, receivedChunks):
+    frameDecoder.reset()
+    numberOfEvents = 0
+    for chunk in receivedChunks:
+        for event in frameDecoder.decode_bytes(chunk):
+            numberOfEvents += 1
+    return numberOfEvents
+
+"""
+Returns the time in seconds until our decoder has returned the first complete event. Our legacy decoder could not return any events
+until every chunk had been received
+"""
+def decoder_time_to_first_event(frameDecoder, receivedChunks):
+    frameDecoder.reset()
+    startTime = time.perf_counter()
+    for chunk in receivedChunks:
+        for event in frameDecoder.decode_bytes(chunk):
+            return time.perf_counter() - startTime
+    return time.perf_counter() - startTime
+
+"""
+Compares our legacy receive processing to our TCPFrameDecoder using a mix of small drax events and large print ticket events,
+received in chunks the size of our receive buffer
+"""
+def benchmark_frame_decoder():
+    print_benchmark_header("Frame Decoder")
+    frameDecoder = DragonMasterDeviceManager.TCPFrameDecoder()
+    for numberOfEvents in [10, 100, 1000, 5000]:
+        receivedStream = bytearray()
+        for i in range(numberOfEvents):
+            if i % 50 == 0:
+                event = bytes([DragonMasterDeviceManager.DragonMasterDeviceManager.PRINTER_AUDIT_TICKET, 0, 0, 4, 210]) + b'a' * 2000
+            else:
+                event = bytes([DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_OUTPUT_EVENT, 0, 0, 4, 210, 0, 1])
+            receivedStream += len(event).to_bytes(2, byteorder='big') + event
+        receivedChunks = [bytes(receivedStream[i:i + DragonMasterDeviceManager.TCPManager.MAX_RECV_BUFFER]) \
+            for i in range(0, len(receivedStream), DragonMasterDeviceManager.TCPManager.MAX_RECV_BUFFER)]
+        numberOfRuns = max(1, int(10000 / numberOfEvents))
+
+        if legacy_decode_events(receivedChunks) != decoder_decode_events(frameDecoder, receivedChunks):
+            print ("Frame decoder did not find the same number of events as our legacy decoder!")
+            return
+
+        legacyTime = time_function(legacy_decode_events, numberOfRuns, receivedChunks)
+        decoderTime = time_function(decoder_decode_events, numberOfRuns, frameDecoder, receivedChunks)
+        print (DragonMasterDeviceManager.set_string_length_multiple(str(numberOfEvents) + " events", \
+            "legacy: " + "{:.3f}".format(legacyTime * 1000) + "ms  decoder: " + "{:.3f}".format(decoderTime * 1000) + "ms"))
+        print (DragonMasterDeviceManager.set_string_length_multiple("  first event", \
+            "legacy: " + "{:.3f}".format(legacyTime * 1000) + "ms  decoder: " + \
+            "{:.3f}".format(decoder_time_to_first_event(frameDecoder, receivedChunks) * 1000) + "ms"))
+    return
+#endregion frame decoder benchmark
+
+
+#region socket round trip benchmark
+"""
+Echoes every message that is received on the connected socket back to the sender until the connection is closed
+"""
+def echo_socket_thread(listenSocket):
+    conn, addr = listenSocket.accept()
+    buff = conn.recv(1024)
+    while buff:
+        conn.sendall(buff)
+        buff = conn.recv(1024)
+    conn.close()
+    return
+
+"""
+Sends a small event through the socket and waits for it to be echoed back. Returns a list of the round trip times in microseconds
+"""
+def measure_round_trip_times(clientSocket, numberOfRuns):
+    eventToSend = bytes([DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_INPUT_EVENT, 0, 0, 4, 210, 1])
+    roundTripTimes = []
+    for i in range(numberOfRuns):
+        startTime = time.perf_counter()
+        clientSocket.sendall(eventToSend)
+        bytesReceived = 0
+        while bytesReceived < len(eventToSend):
+            bytesReceived += len(clientSocket.recv(1024))
+        roundTripTimes.append((time.perf_counter() - startTime) * 1000000)
+    return roundTripTimes
+
+"""
+Opens a listening socket of the family and type passed in with an echo thread behind it and measures the round trip time of a small event
+"""
+def time_socket_round_trip(socketFamily, socketType, address, numberOfRuns):
+    listenSocket = socket.socket(socketFamily, socketType)
+    if socketFamily == socket.AF_UNIX:
+        if os.path.exists(address):
+            os.unlink(address)
+    else:
+        listenSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listenSocket.bind(address)
+    listenSocket.listen(1)
+    if socketFamily == socket.AF_INET:
+        address = listenSocket.getsockname()#We bound to port 0, so we need to know which port we were given
+    echoThread = threading.Thread(target=echo_socket_thread, args=(listenSocket,))
+    echoThread.daemon = True
+    echoThread.start()
+
+    clientSocket = socket.socket(socketFamily, socketType)
+    clientSocket.connect(address)
+    if socketFamily == socket.AF_INET:
+        clientSocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    measure_round_trip_times(clientSocket, 100)#Warm up our connection before we start recording
+    roundTripTimes = sorted(measure_round_trip_times(clientSocket, numberOfRuns))
+    clientSocket.close()
+    echoThread.join()
+    listenSocket.close()
+    if socketFamily == socket.AF_UNIX:
+        os.unlink(address)
+
+    averageTime = sum(roundTripTimes) / len(roundTripTimes)
+    p99Time = roundTripTimes[min(len(roundTripTimes) - 1, int(len(roundTripTimes) * .99))]
+    return averageTime, p99Time
+
+"""
+Compares the round trip latency of a small event through loopback TCP and unix domain sockets. This is the transport that is used
+between our device manager and Unity
+"""
+def benchmark_socket_round_trip():
+    print_benchmark_header("Socket Round Trip")
+    numberOfRuns = 5000
+    transportsToTest = [
+        ("tcp loopback", socket.AF_INET, socket.SOCK_STREAM, (DragonMasterDeviceManager.TCPManager.HOST_ADDRESS, 0)),
+        ("unix stream", socket.AF_UNIX, socket.SOCK_STREAM, "/tmp/DragonMasterBenchmarkStream.sock"),
+        ("unix seqpacket", socket.AF_UNIX, socket.SOCK_SEQPACKET, "/tmp/DragonMasterBenchmarkSeqpacket.sock"),
+    ]
+    for transportName, socketFamily, socketType, address in transportsToTest:
+        averageTime, p99Time = time_socket_round_trip(socketFamily, socketType, address, numberOfRuns)
+        print (DragonMasterDeviceManager.set_string_length_multiple(transportName, \
+            "avg: " + "{:.1f}".format(averageTime) + "us  p99: " + "{:.1f}".format(p99Time) + "us"))
+    return
+#endregion socket round trip benchmark
+
+
+#region push latency benchmark
+"""
+Stands in for our device manager so that a TCPManager can be run without any devices
+"""
+class BenchmarkDeviceManager:
+    def check_for_joystick_events(self):
+        return
+
+    def execute_all_events_processed_from_tcp(self, eventList):
+        return
+
+"""
+Reads everything our TCPManager sends until the connection is closed
+"""
+def drain_socket_thread(clientSocket):
+    try:
+        while clientSocket.recv(4096):
+            pass
+    except Exception as e:
+        pass
+    return
+
+"""
+Queues events one at a time through a persistent TCPManager and returns the enqueue to wire latency histogram
+"""
+def measure_enqueue_to_wire_latency(tcpManager, numberOfEvents):
+    tcpManager.enqueueToWireLatency.reset()
+    eventToSend = bytes([DragonMasterDeviceManager.DragonMasterDeviceManager.BA_BILL_ACCEPTED_EVENT, 0, 0, 4, 210, 1])
+    for i in range(numberOfEvents):
+        tcpManager.add_event_to_send(eventToSend)
+        time.sleep(.002)#Gives our send thread time to go back to waiting, the way events are normally spread out
+    time.sleep(DragonMasterDeviceManager.TCPManager.PERSISTENT_SEND_INTERVAL * 2)
+    return tcpManager.enqueueToWireLatency
+
+"""
+Compares how long an event waits before being written to our socket when our persistent send thread polls our queue and
+when it is woken up by each event that is queued
+"""
+def benchmark_push_latency():
+    print_benchmark_header("Enqueue To Wire Latency")
+    TCPManager = DragonMasterDeviceManager.TCPManager
+    #Our transport settings are put back once we are done, so that the benchmarks that run after this one use the settings they expect
+    changedSettingNames = ("USE_PERSISTENT_CONNECTION", "USE_UNIX_SOCKET", "UNIX_SEND_SOCKET_PATH", "UNIX_RECEIVE_SOCKET_PATH", "USE_PUSH_MODE", \
+        "PUSH_BATCH_WINDOW_MICROSECONDS")
+    originalSettings = {settingName : getattr(TCPManager, settingName) for settingName in changedSettingNames}
+    try:
+        TCPManager.USE_PERSISTENT_CONNECTION = True
+        TCPManager.USE_UNIX_SOCKET = True
+        TCPManager.UNIX_SEND_SOCKET_PATH = "/tmp/DragonMasterBenchmarkSend.sock"
+        TCPManager.UNIX_RECEIVE_SOCKET_PATH = "/tmp/DragonMasterBenchmarkReceive.sock"#Nothing listens here. Our receive thread will simply keep retrying
+        tcpManager = TCPManager(BenchmarkDeviceManager())
+
+        clientSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        for i in range(100):
+            try:
+                clientSocket.connect(TCPManager.UNIX_SEND_SOCKET_PATH)
+                break
+            except Exception as e:
+                time.sleep(.01)#Our send thread has not started listening yet
+        drainThread = threading.Thread(target=drain_socket_thread, args=(clientSocket,))
+        drainThread.daemon = True
+        drainThread.start()
+
+        for modeName, usePushMode, batchWindow in [("poll", False, 0), ("push", True, 0), ("push 200us batch", True, 200)]:
+            TCPManager.USE_PUSH_MODE = usePushMode
+            TCPManager.PUSH_BATCH_WINDOW_MICROSECONDS = batchWindow
+            latencyHistogram = measure_enqueue_to_wire_latency(tcpManager, 500)
+            print (modeName + ": " + latencyHistogram.to_string())
+        clientSocket.close()
+    finally:
+        for settingName, settingValue in originalSettings.items():
+            setattr(TCPManager, settingName, settingValue)
+    return
+#endregion push latency benchmark
+
+
+#region command dispatch benchmark
+"""
+This is the if/elif ladder that we used to interpret Unity commands before adding our UNITY_COMMAND_REGISTRY. It is kept here so that we
+have something to compare against. Arguments are decoded the same way our old handlers decoded them
+"""
+def legacy_interpret_event(deviceManager, eventMessage):
+    DM = DragonMasterDeviceManager.DragonMasterDeviceManager
+    if eventMessage == None or len(eventMessage) <= 0:
+        return
+
+    eventCommandByte = eventMessage[0]
+    if eventCommandByte == DM.RETRIEVE_CONNECTED_DEVICES:
+        deviceManager.on_retrieve_connected_devices()
+        return
+    elif eventCommandByte == DM.STATUS_FROM_UNITY:
+        deviceManager.on_status_from_unity()
+        return
+    elif eventCommandByte == DM.OMNI_EVENT:
+        deviceManager.on_omnidongle_event_received(eventMessage[1:])
+        return
+    elif eventCommandByte == DM.KILL_APPLICATION_EVENT:
+        return
+    elif eventCommandByte == DM.SEND_DM_VERSION_NUMBER:
+        return
+    elif eventCommandByte == DM.SEND_LOCATION_NAME:
+        return
+    elif eventCommandByte == DM.SEND_MACHINE_NUMBER:
+        return
+    if len(eventMessage) < 5:
+        return
+    playerStationHash = int.from_bytes(eventMessage[1:5], byteorder='big')
+    eventData = eventMessage[5:]
+
+    if eventCommandByte == DM.DRAX_HARD_METER_EVENT:
+        if len(eventData) >= 3:
+            deviceManager.on_drax_hard_meter_event(playerStationHash, eventData[0], (eventData[1] << 8) + eventData[2])
+        return
+    elif eventCommandByte == DM.DRAX_OUTPUT_EVENT:
+        if len(eventData) >= 2:
+            deviceManager.on_drax_output_event(playerStationHash, (eventData[0] << 8) + eventData[1])
+        return
+    elif eventCommandByte == DM.DRAX_OUTPUT_BIT_ENABLE_EVENT:
+        if len(eventData) >= 2:
+            deviceManager.on_drax_output_bit_enable_event(playerStationHash, (eventData[0] << 8) + eventData[1])
+        return
+    elif eventCommandByte == DM.DRAX_OUTPUT_BIT_DISABLE_EVENT:
+        if len(eventData) >= 2:
+            deviceManager.on_drax_output_bit_disable_event(playerStationHash, (eventData[0] << 8) + eventData[1])
+        return
+    elif eventCommandByte == DM.PRINTER_CASHOUT_TICKET:
+        deviceManager.on_print_cashout_ticket_event(playerStationHash, eventData)
+        return
+    elif eventCommandByte == DM.PRINTER_AUDIT_TICKET:
+        deviceManager.on_print_audit_ticket_event(playerStationHash, eventData)
+        return
+    elif eventCommandByte == DM.PRINTER_CODEX_TICKET:
+        deviceManager.on_print_codex_ticket_event(playerStationHash, eventData)
+        return
+    elif eventCommandByte == DM.PRINTER_TEST_TICKET:
+        deviceManager.on_print_test_ticket_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.PRINTER_STATE_EVENT:
+        deviceManager.on_printer_state_request(playerStationHash)
+    elif eventCommandByte == DM.BA_IDLE_EVENT:
+        deviceManager.on_ba_idle_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.BA_INHIBIT_EVENT:
+        deviceManager.on_ba_inhibit_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.BA_RESET_EVENT:
+        deviceManager.on_ba_reset_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.BA_ACCEPT_BILL_EVENT:
+        deviceManager.on_ba_stack_bill_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.BA_REJECT_BILL_EVENT:
+        deviceManager.on_ba_reject_bill_event(playerStationHash)
+        return
+    elif eventCommandByte == DM.BA_BILL_STATE_UPDATE_EVENT:
+        deviceManager.on_ba_request_state_event(playerStationHash)
+        return
+    return
+
+"""
+Creates a device manager without starting any of its threads. No devices are connected, so every handler will return
+once it finds that there is no device for the player station
+"""
+def create_benchmark_device_manager():
+    deviceManager = DragonMasterDeviceManager.DragonMasterDeviceManager.__new__(DragonMasterDeviceManager.DragonMasterDeviceManager)
+    deviceManager.CONNECTED_OMNIDONGLE = None
+    deviceManager.deviceRegistry = DragonMasterDeviceManager.DeviceRegistry()
+    deviceManager.allConnectedDevices = deviceManager.deviceRegistry.allDevices
+    deviceManager.playerStationRegistry = DragonMasterDeviceManager.PlayerStationRegistry()
+    deviceManager.playerStationDictionary = deviceManager.playerStationRegistry.stationsByParentPath
+    deviceManager.playerStationHashToParentDevicePath = deviceManager.playerStationRegistry.parentPathsByStationHash
+    deviceManager.deviceEventBus = DragonMasterDeviceManager.DeviceEventBus()#No subscribers, since there is no Unity application to send our events to
+    deviceManager.stationStateStore = DragonMasterDeviceManager.StationStateStore(None)#Our benchmarks should never write station states to disk
+    deviceManager.deviceDiscoverySnapshot = None
+    deviceManager.deviceTopologyIndex = None
+    deviceManager.isProbingHotpluggedDevice = False
+    deviceManager.abandonedDeviceStartKeys = set()
+    deviceManager.deviceRemovalLock = threading.RLock()
+    deviceManager.devicesAnnouncedWithoutStation = set()
+    deviceManager.recievedStatusFromGameFlag = False
+    return deviceManager
+
+"""
+Creates a list of commands in roughly the mix that we receive from Unity. Mostly drax outputs, with bill acceptor and printer commands mixed in
+"""
+def create_command_trace(numberOfCommands):
+    DM = DragonMasterDeviceManager.DragonMasterDeviceManager
+    stationHash = bytes([0, 0, 4, 210])
+    commandTemplates = [
+        (bytes([DM.STATUS_FROM_UNITY]), 5),
+        (bytes([DM.DRAX_OUTPUT_EVENT]) + stationHash + bytes([0, 3]), 30),
+        (bytes([DM.DRAX_OUTPUT_BIT_ENABLE_EVENT]) + stationHash + bytes([0, 1]), 15),
+        (bytes([DM.DRAX_OUTPUT_BIT_DISABLE_EVENT]) + stationHash + bytes([0, 1]), 15),
+        (bytes([DM.DRAX_HARD_METER_EVENT]) + stationHash + bytes([1, 0, 5]), 10),
+        (bytes([DM.BA_IDLE_EVENT]) + stationHash, 5),
+        (bytes([DM.BA_INHIBIT_EVENT]) + stationHash, 5),
+        (bytes([DM.BA_ACCEPT_BILL_EVENT]) + stationHash, 5),
+        (bytes([DM.BA_BILL_STATE_UPDATE_EVENT]) + stationHash, 5),
+        (bytes([DM.PRINTER_CASHOUT_TICKET]) + stationHash + b'0|10.00|1234', 5),
+    ]
+    randomGenerator = random.Random(1)
+    return randomGenerator.choices([command for command, weight in commandTemplates], \
+        weights=[weight for command, weight in commandTemplates], k=numberOfCommands)
+
+"""
+Runs every command in our trace through the dispatch function that is passed in
+"""
+def dispatch_command_trace(dispatchFunction, deviceManager, commandTrace):
+    for eventMessage in commandTrace:
+        dispatchFunction(deviceManager, eventMessage)
+    return
+
+"""
+Compares dispatching a mixed trace of 100k Unity commands through our legacy if/elif ladder and our UNITY_COMMAND_REGISTRY. Our legacy ladder
+does not trace latency, so our registry is compared with tracing turned off. The cost of tracing is shown separately
+"""
+def benchmark_command_dispatch():
+    print_benchmark_header("Command Dispatch")
+    deviceManager = create_benchmark_device_manager()
+    commandTrace = create_command_trace(100000)
+    registryDispatch = DragonMasterDeviceManager.DragonMasterDeviceManager.interpret_and_process_event_from_unity
+    tracingWasEnabled = DragonMasterDeviceManager.LatencyTracer.TRACING_ENABLED
+
+    legacyTime = time_function(dispatch_command_trace, 3, legacy_interpret_event, deviceManager, commandTrace)
+    DragonMasterDeviceManager.LatencyTracer.TRACING_ENABLED = False
+    registryTime = time_function(dispatch_command_trace, 3, registryDispatch, deviceManager, commandTrace)
+    DragonMasterDeviceManager.LatencyTracer.TRACING_ENABLED = True
+    tracedRegistryTime = time_function(dispatch_command_trace, 3, registryDispatch, deviceManager, commandTrace)
+    DragonMasterDeviceManager.LatencyTracer.TRACING_ENABLED = tracingWasEnabled
+    print (DragonMasterDeviceManager.set_string_length_multiple("100k commands", \
+        "legacy: " + "{:.1f}".format(legacyTime * 1000) + "ms  registry: " + "{:.1f}".format(registryTime * 1000) + "ms"))
+    print (DragonMasterDeviceManager.set_string_length_multiple("100k commands traced", \
+        "registry: " + "{:.1f}".format(tracedRegistryTime * 1000) + "ms"))
+    return
+
+"""
+Decodes the bytes that we received from Unity and dispatches every event in them, the same way that our TCPManager does
+"""
+def decode_and_dispatch(deviceManager, frameDecoder, receivedBytes):
+    for eventMessage in frameDecoder.decode_bytes(receivedBytes):
+        deviceManager.interpret_and_process_event_from_unity(eventMessage)
+    return
+
+"""
+Wraps each of our commands in the 2 byte length prefix that Unity sends
+"""
+def build_received_bytes(commandList):
+    return b''.join(len(command).to_bytes(2, 'big') + command for command in commandList)
+
+"""
+Compares setting the drax outputs of every station with one DRAX_OUTPUT_EVENT per station against a single BATCH_STATION_EVENT. This
+includes decoding the received bytes, but not the extra reads and wakeups that separate packets may cost us on the socket
+"""
+def benchmark_batch_dispatch():
+    print_benchmark_header("Batch Station Dispatch")
+    DM = DragonMasterDeviceManager.DragonMasterDeviceManager
+    deviceManager = create_benchmark_device_manager()
+    frameDecoder = DragonMasterDeviceManager.TCPFrameDecoder()
+    for numberOfStations in (8, 32, 64):
+        stationCommands = [bytes([DM.DRAX_OUTPUT_EVENT]) + stationIndex.to_bytes(4, 'big') + bytes([0, 3]) for stationIndex in range(numberOfStations)]
+        batchCommand = bytes([DM.BATCH_STATION_EVENT]) + b''.join(len(command).to_bytes(2, 'big') + command for command in stationCommands)
+
+        separateTime = time_function(decode_and_dispatch, 2000, deviceManager, frameDecoder, build_received_bytes(stationCommands))
+        batchTime = time_function(decode_and_dispatch, 2000, deviceManager, frameDecoder, build_received_bytes([batchCommand]))
+        print ((str(numberOfStations) + " stations").ljust(25) + "separate: " + "{:.1f}".format(separateTime * 1000000) + "us  batch: " \
+            + "{:.1f}".format(batchTime * 1000000) + "us")
+    return
+#endregion command dispatch benchmark
+
+
+#region device scan benchmark
+"""
+This is the way we used to check whether our device manager contained an enumerated element before adding the DeviceRegistry. Each check
+was a scan through all of our connected devices
+"""
+def legacy_rescan_contains(deviceManager, draxElements, joystickElements, printerElements):
+    for draxElement in draxElements:
+        for dev in deviceManager.allConnectedDevices:
+            if isinstance(dev, DragonMasterSerialDevice.Draxboard) and dev.comport == draxElement.device:
+                break
+    for joystickElement in joystickElements:
+        for dev in deviceManager.allConnectedDevices:
+            if isinstance(dev, DragonMasterDevice.Joystick) and dev.joystickUInput.phys == joystickElement.phys:
+                break
+    for printerElement in printerElements:
+        for dev in deviceManager.allConnectedDevices:
+            if isinstance(dev, DragonMasterDevice.Printer) and dev.printerObject.device.port_numbers == printerElement.port_numbers\
+                and dev.printerObject.device.bus == printerElement.bus:
+                break
+    return
+
+"""
+Checks all of our enumerated elements using the contains methods of our device manager, which use the DeviceRegistry indexes
+"""
+def registry_rescan_contains(deviceManager, draxElements, joystickElements, printerElements):
+    for draxElement in draxElements:
+        deviceManager.device_manager_contains_draxboard(draxElement)
+    for joystickElement in joystickElements:
+        deviceManager.device_manager_contains_joystick(joystickElement)
+    for printerElement in printerElements:
+        deviceManager.device_manager_contains_printer(printerElement)
+    return
+
+"""
+Adds a draxboard, joystick and printer for each of our stations to the device manager without starting them. Returns the elements that
+would be enumerated for those devices on a rescan
+"""
+def add_synthetic_stations(deviceManager, numberOfStations):
+    draxElements, joystickElements, printerElements = [], [], []
+    for i in range(numberOfStations):
+        draxElement = SimpleNamespace(device="/dev/ttyACM" + str(i))
+        draxboard = DragonMasterSerialDevice.Draxboard.__new__(DragonMasterSerialDevice.Draxboard)
+        draxboard.comport = draxElement.device
+        deviceManager.deviceRegistry.add_device(draxboard)
+
+        joystickElement = SimpleNamespace(phys="usb-0000:00:14.0-" + str(i) + "/input0", path="/dev/input/event" + str(i))
+        joystick = DragonMasterDevice.UltimarcJoystick.__new__(DragonMasterDevice.UltimarcJoystick)
+        joystick.joystickUInput = joystickElement
+        deviceManager.deviceRegistry.add_device(joystick)
+
+        printerElement = SimpleNamespace(bus=1, port_numbers=[i // 4 + 1, i % 4 + 1, 2])
+        printer = DragonMasterDevice.CustomTG02.__new__(DragonMasterDevice.CustomTG02)
+        printer.printerObject = SimpleNamespace(device=printerElement)
+        deviceManager.deviceRegistry.add_device(printer)
+
+        draxElements.append(draxElement)
+        joystickElements.append(joystickElement)
+        printerElements.append(printerElement)
+    return draxElements, joystickElements, printerElements
+
+"""
+Compares checking every enumerated element of a rescan against our connected devices with a linear scan and with our DeviceRegistry indexes
+"""
+def benchmark_device_scan():
+    print_benchmark_header("Device Rescan")
+    for numberOfStations in (8, 32, 64):
+        deviceManager = create_benchmark_device_manager()
+        draxElements, joystickElements, printerElements = add_synthetic_stations(deviceManager, numberOfStations)
+
+        legacyTime = time_function(legacy_rescan_contains, 20, deviceManager, draxElements, joystickElements, printerElements)
+        registryTime = time_function(registry_rescan_contains, 20, deviceManager, draxElements, joystickElements, printerElements)
+        print ((str(numberOfStations) + " stations").ljust(25) + "legacy: " + "{:.1f}".format(legacyTime * 1000000) + "us  registry: " \
+            + "{:.1f}".format(registryTime * 1000000) + "us")
+    return
+#endregion device scan benchmark
+
+
+#region memory benchmark
+"""
+This is the way we used to build the message that is sent to Unity for each event, before DeviceEvent.to_unity_message was added
+"""
+def legacy_build_unity_message(deviceEvent):
+    messageToSend = []
+    messageToSend.append(deviceEvent.eventType)
+    if deviceEvent.playerStationHash != None:
+        messageToSend += int.to_bytes(deviceEvent.playerStationHash, 4, byteorder='big')
+    messageToSend += deviceEvent.eventData
+    return messageToSend
+
+"""
+Calls our function the number of times requested and keeps every result alive, so that we can see how much memory each result holds on to
+
+@rtype: tuple
+@returns: (bytes retained per result, memory blocks retained per result)
+"""
+def measure_retained_memory(functionToMeasure, numberOfRuns, *args):
+    results = []
+    tracemalloc.start()
+    startSnapshot = tracemalloc.take_snapshot()
+    for i in range(numberOfRuns):
+        results.append(functionToMeasure(*args))
+    endSnapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    sizeDifference, blockDifference = 0, 0
+    for statistic in endSnapshot.compare_to(startSnapshot, 'filename'):
+        if statistic.traceback[0].filename == tracemalloc.__file__:
+            continue#Our snapshots allocate memory of their own that we do not want to count
+        sizeDifference += statistic.size_diff
+        blockDifference += statistic.count_diff
+    return sizeDifference / numberOfRuns, blockDifference / numberOfRuns
+
+"""
+A Draxboard that is given a __dict__ again, which is how our devices stored their attributes before we declared __slots__
+"""
+class DictDraxboard(DragonMasterSerialDevice.Draxboard):
+    pass
+
+"""
+Prints a single line comparing the memory that is retained before and after
+"""
+def print_memory_comparison(testName, legacyMeasurement, newMeasurement):
+    print (testName.ljust(25) + "legacy: " + "{:.0f}".format(legacyMeasurement[0]) + "B/" + "{:.1f}".format(legacyMeasurement[1]) + " blocks  new: " \
+        + "{:.0f}".format(newMeasurement[0]) + "B/" + "{:.1f}".format(newMeasurement[1]) + " blocks")
+    return
+
+"""
+Measures the memory that is held on to by each event that is waiting in our TCP queue, and by each of our devices
+"""
+def benchmark_memory():
+    print_benchmark_header("Memory")
+    stationEvent = DragonMasterDeviceManager.DeviceEvent(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_INPUT_EVENT, [0x01, 0x02], 0x12345678)
+    billEvent = DragonMasterDeviceManager.DeviceEvent(DragonMasterDeviceManager.DragonMasterDeviceManager.BA_BILL_INSERTED_EVENT, [0x00, 0x00, 0x00, 0x14], 0x12345678)
+    stationlessEvent = DragonMasterDeviceManager.DeviceEvent(DragonMasterDeviceManager.DragonMasterDeviceManager.OMNI_EVENT, [0x01, 0x02, 0x03, 0x04])
+    for testName, deviceEvent in (("station event", stationEvent), ("bill event", billEvent), ("stationless event", stationlessEvent)):
+        legacyMeasurement = measure_retained_memory(legacy_build_unity_message, 10000, deviceEvent)
+        newMeasurement = measure_retained_memory(deviceEvent.to_unity_message, 10000)
+        print_memory_comparison(testName, legacyMeasurement, newMeasurement)
+
+    deviceManager = create_benchmark_device_manager()
+    legacyMeasurement = measure_retained_memory(DictDraxboard, 1000, deviceManager)
+    newMeasurement = measure_retained_memory(DragonMasterSerialDevice.Draxboard, 1000, deviceManager)
+    print_memory_comparison("draxboard", legacyMeasurement, newMeasurement)
+    return
+#endregion memory benchmark
+
+
+#region topology benchmark
+"""
+A stand in for a pyudev.Device, so that we can build a device tree without any devices connected
+"""
+class SyntheticUdevDevice:
+
+    def __init__(self, parent, sysName, subsystem = None, deviceType = None):
+        self.parent = parent
+        self.sys_name = sysName
+        self.subsystem = subsystem
+        self.device_type = deviceType
+        if parent == None:
+            self.device_path = "/devices/" + sysName
+        else:
+            self.device_path = parent.device_path + "/" + sysName
+        return
+
+    def find_parent(self, subsystem, deviceType = None):
+        dev = self.parent
+        while dev != None:
+            if dev.subsystem == subsystem and (deviceType == None or dev.device_type == deviceType):
+                return dev
+            dev = dev.parent
+        return None
+
+"""
+A stand in for a pyudev.Context that lists our synthetic device tree
+"""
+class SyntheticDeviceContext:
+
+    def __init__(self):
+        self.allDevices = []
+        return
+
+    def add_device(self, parent, sysName, subsystem = None, deviceType = None):
+        dev = SyntheticUdevDevice(parent, sysName, subsystem, deviceType)
+        self.allDevices.append(dev)
+        return dev
+
+    def list_devices(self):
+        return iter(self.allDevices)
+
+"""
+Builds a udev tree with a hub for each player station. Each hub holds a draxboard, a bill acceptor, a printer and a joystick. Extra
+nodes are added to each device, as a real machine has many more udev nodes than the ones that we are looking for
+
+@rtype: tuple
+@returns: (SyntheticDeviceContext, list of (device class, device element) for each device in our tree)
+"""
+def build_synthetic_station_tree(numberOfStations):
+    deviceContext = SyntheticDeviceContext()
+    pciRoot = deviceContext.add_device(None, "pci0000:00")
+    usbController = deviceContext.add_device(pciRoot, "0000:00:14.0", "pci")
+    usbRoot = deviceContext.add_device(usbController, "usb1", "usb", "usb_device")
+    for i in range(200):
+        deviceContext.add_device(pciRoot, "0000:00:" + str(i) + ".0", "pci")
+
+    devicesToResolve = []
+    for i in range(numberOfStations):
+        hubName = "1-" + str(i + 1)
+        stationHub = deviceContext.add_device(usbRoot, hubName, "usb", "usb_device")
+        for hubPort, serialName, deviceClass in ((1, "ttyACM" + str(i), DragonMasterSerialDevice.Draxboard), (2, "ttyUSB" + str(i), DragonMasterSerialDevice.DBV400)):
+            serialUSBDevice = deviceContext.add_device(stationHub, hubName + "." + str(hubPort), "usb", "usb_device")
+            serialInterface = deviceContext.add_device(serialUSBDevice, hubName + "." + str(hubPort) + ":1.0", "usb", "usb_interface")
+            if serialName.startswith("ttyUSB"):
+                #A usb-serial converter has a usb-serial node between its interface and its tty node
+                serialInterface = deviceContext.add_device(serialInterface, serialName, "usb-serial")
+            deviceContext.add_device(serialInterface, serialName, "tty")
+            devicesToResolve.append((deviceClass, SimpleNamespace(location=hubName + "." + str(hubPort) + ":1.0", name=serialName)))
+
+        printerDevice = deviceContext.add_device(stationHub, hubName + ".3", "usb", "usb_device")
+        deviceContext.add_device(printerDevice, hubName + ".3:1.0", "usb", "usb_interface")
+        devicesToResolve.append((DragonMasterDevice.CustomTG02, SimpleNamespace(bus=1, port_numbers=[i + 1, 3])))
+
+        joystickDevice = deviceContext.add_device(stationHub, hubName + ".4", "usb", "usb_device")
+        joystickInterface = deviceContext.add_device(joystickDevice, hubName + ".4:1.0", "usb", "usb_interface")
+        joystickHID = deviceContext.add_device(joystickInterface, "0003:D209:0501." + str(i), "hid")
+        joystickInput = deviceContext.add_device(joystickHID, "input" + str(i), "input")
+        deviceContext.add_device(joystickInput, "js" + str(i), "input")
+        devicesToResolve.append((DragonMasterDevice.UltimarcJoystick, SimpleNamespace(phys="usb-0000:00:14.0-" + str(i + 1) + ".4/input0")))
+
+        for dev in (stationHub, joystickInput, printerDevice):
+            for j in range(10):
+                deviceContext.add_device(dev, dev.sys_name + "-node" + str(j))
+    return deviceContext, devicesToResolve
+
+"""
+This is the way each of our devices used to find their parent path, by searching through every udev device
+"""
+def legacy_fetch_parent_path(deviceContext, deviceClass, deviceElement):
+    if deviceClass == DragonMasterSerialDevice.Draxboard or deviceClass == DragonMasterSerialDevice.DBV400:
+        devToReturn = None
+        for dev in deviceContext.list_devices():
+            if dev.device_path.__contains__(deviceElement.location) and dev.device_path.__contains__(deviceElement.name):
+                devToReturn = dev.parent.parent.parent.device_path
+        return devToReturn
+    if deviceClass == DragonMasterDevice.CustomTG02:
+        pathString = str(deviceElement.bus) + "-" + ".".join(str(p) for p in deviceElement.port_numbers)
+        for dev in deviceContext.list_devices():
+            if dev.sys_name == pathString:
+                return dev.parent.device_path
+        return None
+    usbKey = deviceElement.phys.split('-')[-1].split('/')[0]
+    for dev in deviceContext.list_devices():
+        if "js" in dev.sys_name and usbKey in dev.device_path:
+            return dev.parent.parent.parent.parent.parent.device_path
+    return None
+
+def legacy_resolve_parent_paths(deviceContext, devicesToResolve):
+    return [legacy_fetch_parent_path(deviceContext, deviceClass, deviceElement) for deviceClass, deviceElement in devicesToResolve]
+
+"""
+Resolves every parent path the way that a search does now. Our index is built once and each device uses its own fetch_parent_path
+"""
+def index_resolve_parent_paths(deviceManager, devicesToResolve):
+    deviceManager.deviceTopologyIndex = DragonMasterDeviceManager.DeviceTopologyIndex(deviceManager.deviceContext)
+    parentPaths = []
+    for deviceClass, deviceElement in devicesToResolve:
+        device = deviceClass.__new__(deviceClass)
+        device.dragonMasterDeviceManager = deviceManager
+        parentPaths.append(device.fetch_parent_path(deviceElement))
+    deviceManager.deviceTopologyIndex = None
+    return parentPaths
+
+"""
+Compares resolving the parent path of every device in a search, with a scan of every udev device and with our DeviceTopologyIndex
+"""
+def benchmark_topology_index():
+    print_benchmark_header("Parent Path Resolution")
+    for numberOfStations in (8, 32, 64):
+        deviceManager = create_benchmark_device_manager()
+        deviceManager.deviceContext, devicesToResolve = build_synthetic_station_tree(numberOfStations)
+        if legacy_resolve_parent_paths(deviceManager.deviceContext, devicesToResolve) != index_resolve_parent_paths(deviceManager, devicesToResolve):
+            print ("Parent paths from our index did not match the legacy parent paths")
+
+        legacyTime = time_function(legacy_resolve_parent_paths, 5, deviceManager.deviceContext, devicesToResolve)
+        indexTime = time_function(index_resolve_parent_paths, 5, deviceManager, devicesToResolve)
+        print ((str(numberOfStations) + " stations (" + str(len(deviceManager.deviceContext.allDevices)) + " nodes)").ljust(30) + "legacy: " + \
+            "{:.1f}".format(legacyTime * 1000) + "ms  index: " + "{:.2f}".format(indexTime * 1000) + "ms")
+    return
+#endregion topology benchmark
+
+
+ALL_BENCHMARKS = {
+    "frameencoder" : benchmark_frame_encoder,
+    "framedecoder" : benchmark_frame_decoder,
+    "socketroundtrip" : benchmark_socket_round_trip,
+    "pushlatency" : benchmark_push_latency,
+    "commanddispatch" : benchmark_command_dispatch,
+    "batchdispatch" : benchmark_batch_dispatch,
+    "devicescan" : benchmark_device_scan,
+    "memory" : benchmark_memory,
+    "topology" : benchmark_topology_index,
+}
+
+#Pass in the names of the benchmarks you would like to run. If no names are passed in, we will run all of our benchmarks
+if __name__ == "__main__":
+    benchmarksToRun = [name.lower() for name in sys.argv[1:]]
+    if len(benchmarksToRun) == 0:
+        benchmarksToRun = list(ALL_BENCHMARKS.keys())
+    for benchmarkName in benchmarksToRun:
+        if benchmarkName not in ALL_BENCHMARKS:
+            print ("'" + benchmarkName + "' is not a valid benchmark. Valid benchmarks: " + str(list(ALL_BENCHMARKS.keys())))
+            continue
+        ALL_BENCHMARKS[benchmarkName]()
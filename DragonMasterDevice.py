@@ -26,6 +26,9 @@ import DragonMasterSerialDevice
 The Base class for all our Dragon Master Devices
 """
 class DragonMasterDevice:
+    #Every device class declares the attributes that it sets in __init__, so that our devices do not carry a __dict__
+    __slots__ = ("dragonMasterDeviceManager", "deviceParentPath", "deviceEventQueue", "isPerformingQueuedEvents", "deviceWorkerThread", \
+        "deviceWorkerLock", "deviceWorkerStopped", "commandExecutionTimes")
 
     def __init__(self, dragonMasterDeviceManager):
 
@@ -37,6 +40,13 @@ class DragonMasterDevice:
         self.deviceEventQueue = queue.Queue()
         #Bool value that indicates whether or not we are performing a queued event
         self.isPerformingQueuedEvents = False
+        #The long lived thread that carries out the events in our queue. One worker is kept per device so that our events are always performed in order
+        self.deviceWorkerThread = None
+        self.deviceWorkerLock = threading.Lock()
+        #Marked true once our device has been disconnected. Events that are queued after this are dropped rather than starting a new worker
+        self.deviceWorkerStopped = False
+        #Key: Name of the function that was queued (string) | Value: How long the function took to execute (LatencyHistogram)
+        self.commandExecutionTimes = {}
 
     """
     This method should be called every time we connect to a new device for the fist time. If our device does not connect correctly
@@ -46,6 +56,7 @@ class DragonMasterDevice:
     """
     def start_device(self, deviceElement):
         self.deviceParentPath = self.fetch_parent_path(deviceElement)
+        self.start_device_worker()
         return False
 
     """
@@ -53,7 +64,12 @@ class DragonMasterDevice:
     such as disabling any hanging threads that no longer need to be active
     """
     def disconnect_device(self):
-        self.deviceEventQueue = queue.Queue()#Clear all remainging events from our queue if there are any
+        with self.deviceWorkerLock:
+            stoppedEventQueue = self.deviceEventQueue
+            self.deviceEventQueue = queue.Queue()#Clear all remainging events from our queue if there are any
+            self.deviceWorkerThread = None
+            self.deviceWorkerStopped = True
+        stoppedEventQueue.put(None)#Wakes up our worker so that it can see that it has been stopped
         return
 
     """
@@ -78,38 +94,119 @@ class DragonMasterDevice:
         return self.dragonMasterDeviceManager.get_player_station_hash_for_device(self)
 
     """
-    Queue up events to for our device to carry out
+    Publishes an event from this device to the event bus of our device manager. Our Unity application, along with any other subscriber,
+    will receive the event
+
+    @type eventType: byte
+    @param eventType: One of the event bytes that we send to Unity. (ex. DRAX_INPUT_EVENT)
+
+    @type eventData: list
+    @param eventData: The data of the event
+
+    @type playerStationHash: uint
+    @param playerStationHash: The player station of this device. None if this device does not belong to a player station
+    """
+    def publish_event(self, eventType, eventData, playerStationHash = None):
+        self.dragonMasterDeviceManager.deviceEventBus.publish(DragonMasterDeviceManager.DeviceEvent(eventType, eventData, playerStationHash))
+        return
+
+    """
+    Queue up events to for our device to carry out. Events are queued as [functionToPerform, args...]. An event that was queued while
+    tracing a Unity command is queued as [None, commandDispatch, functionToPerform, args...] so that the command is carried to our worker.
+    Events that are queued after our device has been disconnected are dropped
     """
     def add_event_to_queue(self, functionToPerform, *args):
-        functionItems = [functionToPerform]
+        commandDispatch = None
+        if DragonMasterDeviceManager.LatencyTracer.TRACING_ENABLED:
+            commandDispatch = DragonMasterDeviceManager.LATENCY_TRACER.get_command_dispatch()
+        if commandDispatch == None:
+            functionItems = [functionToPerform]
+        else:
+            functionItems = [None, commandDispatch, functionToPerform]
         functionItems += args
         
-        self.deviceEventQueue.put(functionItems)
+        with self.deviceWorkerLock:
+            if self.deviceWorkerStopped:
+                return
+            self.deviceEventQueue.put(functionItems)
+            if self.deviceWorkerThread == None:
+                self.start_device_worker_thread()#Events may be queued before our device has been started
+        return
 
-        if (not self.isPerformingQueuedEvents):
-            self.isPerformingQueuedEvents = True
+    """
+    Starts the worker thread that will carry out the events in our queue if it is not already running
+    """
+    def start_device_worker(self):
+        with self.deviceWorkerLock:
+            if self.deviceWorkerThread == None and not self.deviceWorkerStopped:
+                self.start_device_worker_thread()
+        return
 
-            eventThread = threading.Thread(target=DragonMasterDevice.threaded_perform_events, args=(self,))
-            eventThread.daemon = True
-            eventThread.start()
+    """
+    Starts a new worker thread for our event queue. deviceWorkerLock must be held when this is called
+    """
+    def start_device_worker_thread(self):
+        self.deviceWorkerThread = threading.Thread(target=self.device_worker_thread, args=(self.deviceEventQueue,))
+        self.deviceWorkerThread.daemon = True
+        self.deviceWorkerThread.start()
         return
 
     """
-    functions that performs threaded events for this particular device
+    Performs the events in our queue one at a time for as long as our device is connected. Our worker will stop once our device
+    has been disconnected, which replaces our event queue
+
+    @type workerEventQueue: Queue
+    @param workerEventQueue: The event queue that this worker was started for
     """
-    def threaded_perform_events(self):
-        while (not self.deviceEventQueue.empty()):
-            functionItems = self.deviceEventQueue.get()
-            uinputPath = functionItems[0]
+    def device_worker_thread(self, workerEventQueue):
+        latencyTracer = DragonMasterDeviceManager.LATENCY_TRACER
+        while True:
+            functionItems = workerEventQueue.get()
+            if functionItems == None or workerEventQueue is not self.deviceEventQueue:
+                break
+            self.isPerformingQueuedEvents = True
+            functionToPerform = functionItems[0]
+            argsStart = 1
+            if functionToPerform == None:#This event was queued by a Unity command that we are tracing
+                latencyTracer.set_worker_command_dispatch(functionItems[1])
+                functionToPerform = functionItems[2]
+                argsStart = 3
+            startTime = time.perf_counter_ns()
             try:
-                args = functionItems[1:]
-                uinputPath(*args)
+                args = functionItems[argsStart:]
+                functionToPerform(*args)
             except Exception as e:
                 print (e)
                 print ("There was an error executing a function in our event queue: " + self.to_string())
+            if argsStart == 3:
+                latencyTracer.set_worker_command_dispatch(None)
+            self.record_command_execution_time(functionToPerform, startTime)
+            self.isPerformingQueuedEvents = not workerEventQueue.empty()
         self.isPerformingQueuedEvents = False
         return
 
+    """
+    Records how long a function from our event queue took to execute
+
+    @type functionPerformed: function
+    @param functionPerformed: The function that was performed
+
+    @type startTime: int
+    @param startTime: The time.perf_counter_ns() value from right before the function was performed
+    """
+    def record_command_execution_time(self, functionPerformed, startTime):
+        commandName = getattr(functionPerformed, "__name__", str(functionPerformed))
+        if commandName not in self.commandExecutionTimes:
+            self.commandExecutionTimes[commandName] = DragonMasterDeviceManager.LatencyHistogram()
+        self.commandExecutionTimes[commandName].record_since(startTime)
+        return
+
+    """
+    Returns the number of events that are waiting to be performed by our device
+    """
+    def get_queue_depth(self):
+        return self.deviceEventQueue.qsize()
+
     
 #region joystick classes
 
@@ -117,6 +214,7 @@ class DragonMasterDevice:
 Joystick class. Sends events to our Unity application of the current state of the joystick
 """
 class Joystick(DragonMasterDevice):
+    __slots__ = ("joystickUInput", "currentAxes", "lastSentAxes", "collectJoystickAxisThread")
 
     def __init__(self, dragonMasterDeviceManager):
         super().__init__(dragonMasterDeviceManager)
@@ -192,7 +290,7 @@ class Joystick(DragonMasterDevice):
     def send_joystick_axes_if_updated(self):
         if self.currentAxes != self.lastSentAxes:
             eventData = [self.currentAxes[0], self.currentAxes[1]]
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT, eventData, self.dragonMasterDeviceManager.get_player_station_hash_for_device(self))
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT, eventData, self.dragonMasterDeviceManager.get_player_station_hash_for_device(self))
             self.lastSentAxes = self.currentAxes
     pass
 
@@ -210,6 +308,7 @@ class Joystick(DragonMasterDevice):
 Extension of Joystick class, with values specific to our Ulrimarc Ultra-Stik Joystick device
 """
 class UltimarcJoystick(Joystick):
+    __slots__ = ()
     JOYSTICK_DEVICE_NAME = "Ultimarc UltraStik Ultimarc Ultra-Stik Player 1"
 
     """
@@ -222,10 +321,10 @@ class UltimarcJoystick(Joystick):
             usbKey = physSplit[len(physSplit) - 1]
             usbKey = usbKey.split('/')[0]
 
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if "js" in dev.sys_name and usbKey in dev.device_path:
-                return dev.parent.parent.parent.parent.parent.device_path
-        return
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_joystick_device(usbKey)
+        if dev == None:
+            return
+        return dev.parent.parent.parent.parent.parent.device_path
 
     def to_string(self):
         return "Ultimarc Joystick"
@@ -240,6 +339,7 @@ This class is an extension of our Joystick class. All functions remain the same,
 as the product name of the joystick
 """
 class BaoLianJoystick(Joystick):
+    __slots__ = ()
     
     JOYSTICK_DEVICE_NAME = "Baolian industry Co., Ltd. BL digital joystick #1"
 
@@ -254,10 +354,10 @@ class BaoLianJoystick(Joystick):
             usbKey = physSplit[len(physSplit) - 1]
             usbKey = usbKey.split('/')[0]
 
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if "js" in dev.sys_name and usbKey in dev.device_path:
-                return dev.parent.parent.parent.parent.parent.parent.device_path
-        return 
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_joystick_device(usbKey)
+        if dev == None:
+            return
+        return dev.parent.parent.parent.parent.parent.parent.device_path
 
     def to_string(self):
         return "Bao Lian Joystick"
@@ -278,6 +378,7 @@ In General When using print commands in our printer we will want to send it as a
 accurate way to do this
 """
 class Printer(DragonMasterDevice):
+    __slots__ = ("printerObject", "currentState", "lastSentPrinterState")
     #The path of our Cross fire png image
     CROSS_FIRE_PNG_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "Cross-fire.png")
     #The file path to our dragon master logo png
@@ -344,7 +445,7 @@ class Printer(DragonMasterDevice):
 
     """
     def add_printer_state_to_send_queue(self):
-        self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINTER_STATE_EVENT, self.currentState[0].to_bytes(4, byteorder='big') + self.currentState[1].to_bytes(1, byteorder='big'), self.get_player_station_hash())
+        self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINTER_STATE_EVENT, self.currentState[0].to_bytes(4, byteorder='big') + self.currentState[1].to_bytes(1, byteorder='big'), self.get_player_station_hash())
         return
 
     
@@ -476,9 +577,9 @@ class Printer(DragonMasterDevice):
 
             self.printerObject.cut(feed=True)# Cut the page for removal.
 
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
         except Exception as e:
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
             print ("Printer Exception: " + str(e))
             return
 
@@ -612,12 +713,12 @@ class Printer(DragonMasterDevice):
 
             self.printerObject.textln('\n' * whiteSpaceUnderTicket)#Give a little bit of white space between tickets
 
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
 
 
         except Exception as e:
             print ("There was an error printing an audit ticket:" + str(e))
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
 
         return
 
@@ -719,11 +820,11 @@ class Printer(DragonMasterDevice):
             self.printerObject.textln(self.get_footer_string())
             self.printerObject.textln('\n' * whiteSpaceUnderTicket)
 
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_COMPLETE_EVENT, [], self.get_player_station_hash())
         except Exception as e:
             print ("There was an error printing our codex ticket")
             print (e)
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.PRINT_ERROR_EVENT, [], self.get_player_station_hash())
 
             return
 
@@ -772,6 +873,7 @@ class Printer(DragonMasterDevice):
 Extension of our printer object. This handles special properties for our Custom TG02 printer
 """
 class CustomTG02(Printer):
+    __slots__ = ()
     VENDOR_ID = 0x0dd4
     PRODUCT_ID = 0x0186
     IN_EP = 0x81
@@ -811,11 +913,10 @@ class CustomTG02(Printer):
             pathString += str(p) + "."
 
         pathString = pathString[:len(pathString) - 1]
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if dev.sys_name == pathString:
-                return dev.parent.device_path
-                
-        return None
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_device_by_sys_name(pathString)
+        if dev == None:
+            return None
+        return dev.parent.device_path
 
     """
     Sends a serial message to configure the text format of the custom printer
@@ -845,10 +946,12 @@ class CustomTG02(Printer):
 Extension of our printer class. Handles special properties for our NextGen Coupon printer
 """
 class NextGen(Printer):
+    __slots__ = ()
     
     pass
 
 class PyramidPrinter(CustomTG02):
+    __slots__ = ()
     VENDOR_ID = 0x0425
     PRODUCT_ID = 0x0412
     IN_EP = 0x81
@@ -889,6 +992,7 @@ class PyramidPrinter(CustomTG02):
 Extension of our printer class. This handles special properties for our Reliance Printer
 """
 class ReliancePrinter(Printer):
+    __slots__ = ("associatedRelianceSerial",)
     VENDOR_ID = 0x0425
     PRODUCT_ID = 0x8147
     IN_EP = 0x87
@@ -940,10 +1044,10 @@ class ReliancePrinter(Printer):
     def fetch_parent_path(self, deviceElement):
         pathString = self.port_numbers_to_usb_address(deviceElement)
 
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if dev.sys_name == pathString:
-                return dev.parent.device_path
-        return None
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_device_by_sys_name(pathString)
+        if dev == None:
+            return None
+        return dev.parent.device_path
 
     """
     Returns a tuple of the state and the paper availability of our printer
@@ -1002,7 +1106,11 @@ class ReliancePrinter(Printer):
     def get_matching_reliance_serial(self, deviceElement):
         pathString = self.port_numbers_to_usb_address(deviceElement)
         
-        allRelianceSerialList = DragonMasterSerialDevice.get_all_reliance_printer_serial_elements()
+        discoverySnapshot = self.dragonMasterDeviceManager.deviceDiscoverySnapshot
+        if discoverySnapshot != None:
+            allRelianceSerialList = discoverySnapshot.get_elements(DragonMasterSerialDevice.ReliancePrinterSerial)#We are in the middle of a search, so our comports were already listed
+        else:
+            allRelianceSerialList = DragonMasterSerialDevice.get_all_reliance_printer_serial_elements()
         for rSerial in allRelianceSerialList:
             try:
                 if rSerial.location.split(':')[0] == pathString:
@@ -1060,6 +1168,68 @@ class ReliancePrinter(Printer):
 
 
 ##Retrieve device methods
+"""
+Rules used to classify our input devices by name. Key: Input device name (string) | Value: Joystick class (type)
+"""
+JOYSTICK_DEVICE_RULES = {
+    UltimarcJoystick.JOYSTICK_DEVICE_NAME : UltimarcJoystick,
+    BaoLianJoystick.JOYSTICK_DEVICE_NAME : BaoLianJoystick,
+}
+
+"""
+Rules used to classify our usb devices by vid and pid. Key: (vid, pid) | Value: Printer class (type)
+"""
+USB_PRINTER_RULES = {
+    (CustomTG02.VENDOR_ID, CustomTG02.PRODUCT_ID) : CustomTG02,
+    (ReliancePrinter.VENDOR_ID, ReliancePrinter.PRODUCT_ID) : ReliancePrinter,
+    (PyramidPrinter.VENDOR_ID, PyramidPrinter.PRODUCT_ID) : PyramidPrinter,
+}
+
+"""
+Opens every input device that is connected to our machine. This is the only place that we should list our input devices, so that a search
+only opens each of them once
+"""
+def get_all_input_devices():
+    return [evdev.InputDevice(uinputPath) for uinputPath in evdev.list_devices()]
+
+"""
+Sorts the input devices that are passed in by the joystick class that should be created for them. Input devices that are not one of our
+joysticks are closed
+
+@rtype: dict
+@returns: Key: Joystick class (type) | Value: list of input devices
+"""
+def classify_input_devices(allConnectedUInputDevices):
+    inputDevicesByJoystickClass = {}
+    for uInputDevice in allConnectedUInputDevices:
+        joystickClass = get_joystick_class_for_input_device(uInputDevice)
+        if joystickClass == None:
+            uInputDevice.close()
+            continue
+        inputDevicesByJoystickClass.setdefault(joystickClass, []).append(uInputDevice)
+    return inputDevicesByJoystickClass
+
+"""
+Returns every usb device that is connected to our machine. This walks our usb bus once, rather than once for each type of printer
+"""
+def get_all_usb_elements():
+    return usb.core.find(find_all=True)
+
+"""
+Sorts the usb devices that are passed in by the printer class that should be created for them. Usb devices that are not one of our
+printers are left out
+
+@rtype: dict
+@returns: Key: Printer class (type) | Value: list of usb device elements
+"""
+def classify_usb_elements(allUSBElements):
+    elementsByPrinterClass = {}
+    for usbElement in allUSBElements:
+        printerClass = get_printer_class_for_usb_ids(usbElement.idVendor, usbElement.idProduct)
+        if printerClass != None:
+            elementsByPrinterClass.setdefault(printerClass, []).append(usbElement)
+    return elementsByPrinterClass
+
 """
 This method will retrieve all valid joysticks that are connected to our machine
 
@@ -1067,38 +1237,42 @@ Returns two lists. The first list is all connected Ultimarc joysticks
 The seconds list are connected Bao Lian Joysticks
 """
 def get_all_connected_joystick_devices():
-    allConnectedUInputDevices = [evdev.InputDevice(uinputPath) for uinputPath in evdev.list_devices()] #Creates a list of all connected input devices
-    listOfUltramarkJoysticks = []
-    listOfBoaLianJoysticks = []
-
-    for uInputDevice in allConnectedUInputDevices:
-        if (uInputDevice.name == UltimarcJoystick.JOYSTICK_DEVICE_NAME and "input0" in uInputDevice.phys):
-            listOfUltramarkJoysticks.append(uInputDevice)
-        if (uInputDevice.name == BaoLianJoystick.JOYSTICK_DEVICE_NAME and "input0" in uInputDevice.phys):
-            listOfBoaLianJoysticks.append(uInputDevice)
-
-    return listOfUltramarkJoysticks, listOfBoaLianJoysticks
+    inputDevicesByJoystickClass = classify_input_devices(get_all_input_devices())
+    return inputDevicesByJoystickClass.get(UltimarcJoystick, []), inputDevicesByJoystickClass.get(BaoLianJoystick, [])
 
 def get_all_connected_printers():
-    return get_all_connected_custom_tg02_printer_elements(), get_all_connected_reliance_printer_elements(), get_all_connected_pyramid_printer_elements()
+    elementsByPrinterClass = classify_usb_elements(get_all_usb_elements())
+    return elementsByPrinterClass.get(CustomTG02, []), elementsByPrinterClass.get(ReliancePrinter, []), elementsByPrinterClass.get(PyramidPrinter, [])
+
+"""
+Returns the joystick class that should be created for the input device that is passed in, using our JOYSTICK_DEVICE_RULES. Returns None if the input device is not one of our joysticks
+"""
+def get_joystick_class_for_input_device(uInputDevice):
+    if "input0" not in uInputDevice.phys:
+        return None
+    return JOYSTICK_DEVICE_RULES.get(uInputDevice.name)
 
 """
-Returns a list of all the connected custom TG02 printers. We do this by searching for a matching vid and pid
+Opens the input device at the node that is passed in and returns it if it is one of our joysticks. Otherwise the device is closed and we return None
 """
-def get_all_connected_custom_tg02_printer_elements():
-    return usb.core.find(idVendor=CustomTG02.VENDOR_ID, idProduct=CustomTG02.PRODUCT_ID, find_all=True)
+def get_joystick_input_device(deviceNode):
+    uInputDevice = evdev.InputDevice(deviceNode)
+    if get_joystick_class_for_input_device(uInputDevice) == None:
+        uInputDevice.close()
+        return None
+    return uInputDevice
 
 """
-Searches for a list of all connected reliance printers. This is done by searching for matching vid and pid
+Returns the printer class that matches the vid and pid that are passed in, using our USB_PRINTER_RULES. Returns None if the ids do not belong to one of our printers
 """
-def get_all_connected_reliance_printer_elements():
-    return usb.core.find(idVendor=ReliancePrinter.VENDOR_ID, idProduct=ReliancePrinter.PRODUCT_ID, find_all=True)
+def get_printer_class_for_usb_ids(vendorID, productID):
+    return USB_PRINTER_RULES.get((vendorID, productID))
 
 """
-Searches for a list of a connected phoenix printers. This is done by searching for matching vid and pid
+Returns the usb printer element at the bus and address that are passed in, rather than every printer with a matching vid and pid
 """
-def get_all_connected_pyramid_printer_elements():
-    return usb.core.find(idVendor=PyramidPrinter.VENDOR_ID, idProduct=PyramidPrinter.PRODUCT_ID, find_all=True)
+def get_usb_printer_element(vendorID, productID, busNumber, deviceAddress):
+    return usb.core.find(idVendor=vendorID, idProduct=productID, bus=busNumber, address=deviceAddress)
 
 
 ##End Retrieve device method
@@ -1,13 +1,21 @@
 #external lib imports
 from subprocess import check_output
 import socket
+import select
+import selectors
 import pyudev
 import sys
 from sys import stdin
 import re
+import struct
+import json
+import concurrent.futures
+import tempfile
 
 #std lib imports
 import queue
+import collections
+import asyncio
 import threading
 from time import sleep
 import os
@@ -48,6 +56,8 @@ class DragonMasterDeviceManager:
     SEND_MACHINE_NUMBER = 0X08
     ##############################################################################################################################################
 
+    BATCH_STATION_EVENT = 0x09 #Carries many player station commands in a single packet. Each command is prefixed by its length, which is 2 bytes like our outer frame so that ticket commands fit: [length(2), command, playerStationHash(4), data...]
+
     ##DRAX COMMANDS
     DRAX_ID = 0x10
 
@@ -113,6 +123,17 @@ class DragonMasterDeviceManager:
 
     #region const variables
     STATUS_MAX_SECONDS_TO_WAIT = 60
+
+    MAX_STARTUP_WORKERS = 8 #The number of devices that we will start at the same time during a search
+    DEVICE_STARTUP_DEADLINE_SECONDS = 20 #A device that takes longer than this to start is abandoned. It will be disconnected once its start returns and tried again in a later search
+
+    USE_TARGETED_HOTPLUG = True #When a device is plugged in, we only probe the device node from the udev event. Mark this false to search for all devices instead
+    HANDLE_UDEV_REMOVE_EVENTS = True #Removes a device as soon as udev tells us that it was unplugged. Our omnidongle and reliance serial will not poll to check that they are still connected while this is on
+
+    DATA_DIRECTORY = os.path.join(os.path.dirname(os.path.realpath(__file__)), "DeviceManagerData") #Files that our device manager keeps between runs. Only the user running our device manager may open this directory
+    USE_EVENT_JOURNAL = False #Mark this true to write every device event to our journal file
+    EVENT_JOURNAL_PATH = os.path.join(DATA_DIRECTORY, "DragonMasterEventJournal.log")
+    STATION_STATE_PATH = os.path.join(DATA_DIRECTORY, "DragonMasterStationState.json") #The last commanded state of each player station. Set this to None to only keep these states in memory
     #endregion const variables
 
     #region debug variables
@@ -131,27 +152,60 @@ class DragonMasterDeviceManager:
 
 
     def __init__(self,):
+        self.bootStartTime = time.perf_counter()
+        self.bootToAllReadySeconds = None#How long it took from launching our device manager until every device in our first search was ready
 
-        self.tcpManager = TCPManager(self)
+        if TCPManager.USE_ASYNCIO_ENGINE:
+            self.tcpManager = AsyncTCPManager(self)
+        else:
+            self.tcpManager = TCPManager(self)
         self.recievedStatusFromGameFlag = False
 
         self.CONNECTED_OMNIDONGLE = None #Since there should only be one omnidongle in our machine, we will only search until this value is no longer None
-        self.allConnectedDevices = [] #(DragonMasterDevice)
-        self.playerStationDictionary = {}#Key: Parent USB Device Path (string) | Value: Player Station (PlayerStation)
-        self.playerStationHashToParentDevicePath = {}#Key: Hash Value (uint) | Value: Parent USB Device Path (string)
+        self.deviceRegistry = DeviceRegistry()
+        self.allConnectedDevices = self.deviceRegistry.allDevices #(DragonMasterDevice)
+        self.playerStationRegistry = PlayerStationRegistry()
+        self.playerStationDictionary = self.playerStationRegistry.stationsByParentPath#Key: Parent USB Device Path (string) | Value: Player Station (PlayerStation)
+        self.playerStationHashToParentDevicePath = self.playerStationRegistry.parentPathsByStationHash#Key: Hash Value (uint) | Value: Parent USB Device Path (string)
         self.statusMessageReceived = False #As long as the variable is marked true before we check the status of the Unity application, it means that the game is functioning correctly and we will wait another minute
         
+        #Every event from our devices is published here. Sending to Unity happens on the publishing thread, every other subscriber has its own queue and thread
+        self.deviceEventBus = DeviceEventBus()
+        self.deviceEventBus.subscribe(self.send_device_event_to_unity)
+        self.eventCountSubscriber = EventCountSubscriber()
+        self.deviceEventBus.subscribe(self.eventCountSubscriber.put_event)
+        self.eventJournalSubscriber = None
+        if DragonMasterDeviceManager.USE_EVENT_JOURNAL:
+            self.eventJournalSubscriber = EventJournalSubscriber(DragonMasterDeviceManager.EVENT_JOURNAL_PATH)
+            self.deviceEventBus.subscribe(self.eventJournalSubscriber.put_event)
+
+        #Last commanded state of each player station. This must be created before we search for devices so that reconnected devices can be restored
+        self.stationStateStore = StationStateStore(DragonMasterDeviceManager.STATION_STATE_PATH)
 
         self.searchingForDevices = False
+        self.deviceDiscoveryLock = threading.Lock()#Held while we search for or probe devices, so that the same device is never started twice
+        self.deviceRemovalLock = threading.RLock()#Held while a device is removed, so that a device that is removed from two threads is only removed once
+        self.deviceDiscoverySnapshot = None#The devices that were enumerated for the search that is currently running. None outside of a search
+        self.deviceTopologyIndex = None#The udev device tree for the search or probe that is currently running. None outside of a search
+        self.isProbingHotpluggedDevice = False#While true, the topology index is only built once a device that we probe asks for it, and is kept for the rest of the probe
+        self.abandonedDeviceStartKeys = set()#Element keys of devices that missed their startup deadline and are still starting. Searches will skip these elements
+        self.devicesAnnouncedWithoutStation = set()#Devices whose connected event was sent before the draxboard of their station was added. These are announced again once it is
+        self.udevRemovedDeviceQueue = queue.Queue()#udev devices from remove events. These are handled on their own thread so that they never wait behind a device that is starting
         get_latest_firmware_version()
         #Start a thread to search for newly connected devices
         deviceAddedThread = threading.Thread(target=self.device_connected_thread,)
         deviceAddedThread.daemon = True
         deviceAddedThread.start()
 
+        deviceRemovedThread = threading.Thread(target=self.device_removed_thread,)
+        deviceRemovedThread.daemon = True
+        deviceRemovedThread.start()
+
         sleep(.1)
         print()
         self.search_for_devices()
+        self.bootToAllReadySeconds = time.perf_counter() - self.bootStartTime
+        print ("All devices were ready " + "{:.2f}".format(self.bootToAllReadySeconds) + " seconds after launching our device manager")
 
         periodicallySearchForNewDevicesThread = threading.Thread(target=self.periodically_poll_for_devices_thread)
         periodicallySearchForNewDevicesThread.daemon = True
@@ -182,12 +236,163 @@ class DragonMasterDeviceManager:
         context = pyudev.Context()
         monitor = pyudev.Monitor.from_netlink(context)
         monitor.filter_by(subsystem='usb')
+        monitor.filter_by(subsystem='tty')#Serial devices (draxboards, bill acceptors, omnidongle, reliance serial)
+        monitor.filter_by(subsystem='input')#Joysticks
 
         for device in iter(monitor.poll, None):
             if device.action == 'add':
-                self.search_for_devices()
+                if DragonMasterDeviceManager.USE_TARGETED_HOTPLUG:
+                    self.probe_hotplugged_device(device)
+                elif device.subsystem == 'usb':
+                    self.search_for_devices()
+            elif device.action == 'remove' and DragonMasterDeviceManager.HANDLE_UDEV_REMOVE_EVENTS:
+                self.udevRemovedDeviceQueue.put(device)
+        return
+
+    """
+    This thread removes our devices as their udev remove events come in. Adding a device can take as long as our startup deadline,
+    so removes are kept off of our device connected thread
+    """
+    def device_removed_thread(self):
+        while (True):
+            udevDevice = self.udevRemovedDeviceQueue.get()
+            try:
+                self.on_udev_device_removed(udevDevice)
+            except Exception as e:
+                print ("There was an error removing our disconnected device")
+                print (e)
+        return
+
+    """
+    Removes the device that owns the udev node that was unplugged, so that Unity is notified right away rather than when one of our
+    device threads fails to read from it. Nodes that do not belong to one of our devices are ignored
+
+    @type udevDevice: pyudev.Device
+    @param udevDevice: The device from our udev remove event
+    """
+    def on_udev_device_removed(self, udevDevice):
+        deviceToRemove = None
+        if udevDevice.subsystem == 'tty' and udevDevice.device_node != None:
+            deviceToRemove = self.deviceRegistry.devicesByComport.get(udevDevice.device_node)
+        elif udevDevice.subsystem == 'input' and udevDevice.device_node != None:
+            deviceToRemove = self.deviceRegistry.devicesByInputNode.get(udevDevice.device_node)
+        elif udevDevice.subsystem == 'usb' and udevDevice.device_type == 'usb_device':
+            deviceToRemove = self.deviceRegistry.devicesByUSBPort.get(DeviceRegistry.get_usb_port_key_from_sys_name(udevDevice.sys_name))
+
+        if deviceToRemove != None:
+            self.remove_device(deviceToRemove)
+        return
+
+    """
+    Adds the device that triggered a udev add event, if it is one of our devices. Only the driver class that matches the subsystem of the
+    event is probed, so connecting a single device does not require us to search through every device in our system. Any device that is
+    missed here will still be found by our periodic search
+
+    The device is started the same way as in a search, so it is held to our startup deadline
+
+    @type udevDevice: pyudev.Device
+    @param udevDevice: The device from our udev add event
+    """
+    def probe_hotplugged_device(self, udevDevice):
+        with self.deviceDiscoveryLock:
+            try:
+                self.deviceContext = pyudev.Context()
+                self.isProbingHotpluggedDevice = True#Most udev events are not for one of our devices, so we do not list every udev device unless we have to
+                deviceToStart = None
+                if udevDevice.subsystem == 'tty':
+                    deviceToStart = self.probe_serial_device_node(udevDevice)
+                elif udevDevice.subsystem == 'input':
+                    deviceToStart = self.probe_input_device_node(udevDevice)
+                elif udevDevice.subsystem == 'usb':
+                    deviceToStart = self.probe_usb_device_node(udevDevice)
+                if deviceToStart != None:
+                    self.start_devices_in_parallel([deviceToStart])
+            except Exception as e:
+                print ("There was an error probing our newly connected device")
+                print (e)
+            self.isProbingHotpluggedDevice = False
+            self.deviceTopologyIndex = None
         return
 
+    """
+    Returns the newly connected serial device if its comport matches one of our serial devices
+
+    @type udevDevice: pyudev.Device
+    @param udevDevice: udev device from the tty subsystem
+
+    @rtype: tuple
+    @returns: (DragonMasterDevice, device element) of the device that should be started. None if there is no new device to start
+    """
+    def probe_serial_device_node(self, udevDevice):
+        if udevDevice.device_node == None:
+            return None
+        portElement = DragonMasterSerialDevice.get_serial_port_element(udevDevice.device_node)
+        if portElement == None:
+            return None
+        deviceClass = DragonMasterSerialDevice.get_serial_device_class_for_element(portElement)
+        if deviceClass == None:
+            return None
+
+        if deviceClass == DragonMasterSerialDevice.ReliancePrinterSerial:
+            #Our reliance serial is started by its usb printer. The printer will fail to start if its serial node did not exist yet, so we probe it again here
+            return self.probe_usb_device_node(udevDevice.find_parent('usb', 'usb_device'))
+        if deviceClass == DragonMasterSerialDevice.Omnidongle:
+            if self.CONNECTED_OMNIDONGLE != None:
+                return None
+        elif deviceClass == DragonMasterSerialDevice.Draxboard:
+            if self.device_manager_contains_draxboard(portElement):
+                return None
+        elif self.device_manager_contains_bill_acceptor(portElement):
+            return None
+        return (deviceClass(self), portElement)
+
+    """
+    Returns the newly connected input device if it is one of our joysticks
+
+    @type udevDevice: pyudev.Device
+    @param udevDevice: udev device from the input subsystem
+
+    @rtype: tuple
+    @returns: (DragonMasterDevice, device element) of the device that should be started. None if there is no new device to start
+    """
+    def probe_input_device_node(self, udevDevice):
+        if udevDevice.device_node == None or not udevDevice.device_node.startswith("/dev/input/event"):
+            return None#Each joystick also creates input nodes that we do not read from
+        uInputDevice = DragonMasterDevice.get_joystick_input_device(udevDevice.device_node)
+        if uInputDevice == None:
+            return None
+        if self.device_manager_contains_joystick(uInputDevice):
+            uInputDevice.close()
+            return None
+        joystickClass = DragonMasterDevice.get_joystick_class_for_input_device(uInputDevice)
+        return (joystickClass(self), uInputDevice)
+
+    """
+    Returns the newly connected usb device if its vid and pid match one of our printers
+
+    @type udevDevice: pyudev.Device
+    @param udevDevice: udev device from the usb subsystem
+
+    @rtype: tuple
+    @returns: (DragonMasterDevice, device element) of the device that should be started. None if there is no new device to start
+    """
+    def probe_usb_device_node(self, udevDevice):
+        if udevDevice == None or udevDevice.device_type != 'usb_device':
+            return None#Every usb interface of a device creates its own event. We only look at the device itself
+        try:
+            vendorID = int(udevDevice.properties.get('ID_VENDOR_ID'), 16)
+            productID = int(udevDevice.properties.get('ID_MODEL_ID'), 16)
+        except (TypeError, ValueError):
+            return None
+        printerClass = DragonMasterDevice.get_printer_class_for_usb_ids(vendorID, productID)
+        if printerClass == None:
+            return None
+        printerElement = DragonMasterDevice.get_usb_printer_element(vendorID, productID, int(udevDevice.properties.get('BUSNUM')), \
+            int(udevDevice.properties.get('DEVNUM')))
+        if printerElement == None or self.device_manager_contains_printer(printerElement):
+            return None
+        return (printerClass(self), printerElement)
+
 
     """
     This thread will be used to periodically poll for newly connected devices. This is more used as a back up incase our
@@ -252,68 +457,80 @@ class DragonMasterDeviceManager:
             print ("We skipped searching for devices. We are already searching")
             return
         self.searchingForDevices = True
+        self.deviceDiscoveryLock.acquire()
 
         originalCountOfDevices = len(self.allConnectedDevices) #this is only used for debugging. can be ignored
         try:
+            discoverySnapshot = DeviceDiscoverySnapshot()#Enumerates each of our buses once for this entire search
+            self.deviceDiscoverySnapshot = discoverySnapshot
             #List of UInputs from evdev library
-            allConnectedUltimarcJoystickList, allConnectedBaoLianJoysticks = DragonMasterDevice.get_all_connected_joystick_devices()
+            allConnectedUltimarcJoystickList = discoverySnapshot.get_elements(DragonMasterDevice.UltimarcJoystick)
+            allConnectedBaoLianJoysticks = discoverySnapshot.get_elements(DragonMasterDevice.BaoLianJoystick)
             
-            allConnectedDraxboards = DragonMasterSerialDevice.get_all_connected_draxboard_elements()
-            allConnectedCustomTG02Printers, allConnectedReliancePrinters, allConnectedPyramidPrinters = DragonMasterDevice.get_all_connected_printers()
-            allConnectedDBV400Elements, allConnectediVizionElements, allConnectedDBV500Elements = DragonMasterSerialDevice.get_all_connected_bill_acceptors()
+            allConnectedDraxboards = discoverySnapshot.get_elements(DragonMasterSerialDevice.Draxboard)
+            allConnectedCustomTG02Printers = discoverySnapshot.get_elements(DragonMasterDevice.CustomTG02)
+            allConnectedReliancePrinters = discoverySnapshot.get_elements(DragonMasterDevice.ReliancePrinter)
+            allConnectedPyramidPrinters = discoverySnapshot.get_elements(DragonMasterDevice.PyramidPrinter)
+            allConnectedDBV400Elements = discoverySnapshot.get_elements(DragonMasterSerialDevice.DBV400)
+            allConnectediVizionElements = discoverySnapshot.get_elements(DragonMasterSerialDevice.iVizion)
+            allConnectedDBV500Elements = discoverySnapshot.get_elements(DragonMasterSerialDevice.DBV500)
 
 
             self.deviceContext = pyudev.Context() #we set our device context primarily to find the most up to date usb device paths
+            self.deviceTopologyIndex = DeviceTopologyIndex(self.deviceContext)#Lists our udev devices once, so that each device can find its parent path with a lookup
+            draxboardsToStart = []#Our draxboards are started before our other devices, as they are what give each player station its hash
+            devicesToStart = []
             #This is a special case. In which we will only look for omnidongle devices if there is not one that is already connected. We should only ever talk to one omnidongle device at a time 
             if self.CONNECTED_OMNIDONGLE == None:
-                omnidongleElement = DragonMasterSerialDevice.get_omnidongle_comports()
-                if omnidongleElement:
-                    self.add_new_device(DragonMasterSerialDevice.Omnidongle(self), omnidongleElement)
+                omnidongleElements = discoverySnapshot.get_elements(DragonMasterSerialDevice.Omnidongle)
+                if omnidongleElements:
+                    draxboardsToStart.append((DragonMasterSerialDevice.Omnidongle(self), omnidongleElements[0]))
 
             #Connects all instances of our Draxboard device
             for draxElement in allConnectedDraxboards:
                 if draxElement and not self.device_manager_contains_draxboard(draxElement):
-                    self.add_new_device(DragonMasterSerialDevice.Draxboard(self), draxElement)
+                    draxboardsToStart.append((DragonMasterSerialDevice.Draxboard(self), draxElement))
 
             #Add our Ultimarc joysticks here
             for joystick in allConnectedUltimarcJoystickList:
                 if (joystick != None and not self.device_manager_contains_joystick(joystick)):
-                    self.add_new_device(DragonMasterDevice.UltimarcJoystick(self), joystick)
+                    devicesToStart.append((DragonMasterDevice.UltimarcJoystick(self), joystick))
 
             #Add our Bao Lian Joysticks here
             for joystick in allConnectedBaoLianJoysticks:
                 if joystick != None and not self.device_manager_contains_joystick(joystick):
-                    self.add_new_device(DragonMasterDevice.BaoLianJoystick(self), joystick)
+                    devicesToStart.append((DragonMasterDevice.BaoLianJoystick(self), joystick))
 
             #Custom TG02 printers will be added here
             for printer in allConnectedCustomTG02Printers:
                 if (printer != None and not self.device_manager_contains_printer(printer)):
-                    self.add_new_device(DragonMasterDevice.CustomTG02(self), printer)
+                    devicesToStart.append((DragonMasterDevice.CustomTG02(self), printer))
 
             #Reliance printers will be added here
             for printer in allConnectedReliancePrinters:
                 if printer != None and not self.device_manager_contains_printer(printer):
-                    self.add_new_device(DragonMasterDevice.ReliancePrinter(self), printer)
+                    devicesToStart.append((DragonMasterDevice.ReliancePrinter(self), printer))
 
             for printer in allConnectedPyramidPrinters:
                 if printer != None and not self.device_manager_contains_printer(printer):
-                    self.add_new_device(DragonMasterDevice.PyramidPrinter(self), printer)
+                    devicesToStart.append((DragonMasterDevice.PyramidPrinter(self), printer))
 
             #Add our DBV 400 Bill Acceptors here
             for dbv in allConnectedDBV400Elements:
                 if dbv and not self.device_manager_contains_bill_acceptor(dbv):
-                    self.add_new_device(DragonMasterSerialDevice.DBV400(self), dbv)
+                    devicesToStart.append((DragonMasterSerialDevice.DBV400(self), dbv))
 
             #Add iVizion Bill Acceptors here
             for ivizion in allConnectediVizionElements:
                 if ivizion and not self.device_manager_contains_bill_acceptor(ivizion):
-                    self.add_new_device(DragonMasterSerialDevice.iVizion(self), ivizion)
+                    devicesToStart.append((DragonMasterSerialDevice.iVizion(self), ivizion))
 
             for dbv500 in allConnectedDBV500Elements:
                 if dbv500 and not self.device_manager_contains_bill_acceptor(dbv500):
-                    self.add_new_device(DragonMasterSerialDevice.DBV500(self), dbv500)
+                    devicesToStart.append((DragonMasterSerialDevice.DBV500(self), dbv500))
 
-            
+            self.start_devices_in_parallel(draxboardsToStart)
+            self.start_devices_in_parallel(devicesToStart)
         except Exception as e:
             print ("There was an error while searching for devices.")
             print (e)
@@ -321,6 +538,9 @@ class DragonMasterDeviceManager:
         if len(self.allConnectedDevices) != originalCountOfDevices:#For Debugging
             print('-' * 60)
             print ("Total Devices Connected: " + str(len(self.allConnectedDevices)))
+        self.deviceDiscoverySnapshot = None
+        self.deviceTopologyIndex = None
+        self.deviceDiscoveryLock.release()
         self.searchingForDevices = False
         return
 
@@ -333,20 +553,124 @@ class DragonMasterDeviceManager:
     @param deviceToAdd: The device that we are going to add to our device manager
     """
     def add_new_device(self, deviceToAdd, deviceElementNode):
-        if (self.allConnectedDevices.__contains__(deviceToAdd)):
+        if (self.deviceRegistry.contains_device(deviceToAdd)):
             print ("Device was already added to our device manager. Please double check how we added a device twice")
             return
         if (deviceToAdd.start_device(deviceElementNode)):
-            self.allConnectedDevices.append(deviceToAdd)
-            self.add_new_device_to_player_station_dictionary(deviceToAdd)
-            self.send_device_connected_event(deviceToAdd)
-            
-            print (deviceToAdd.to_string() + " was successfully ADDED to our device manager")
+            self.add_started_device(deviceToAdd)
         else:
             deviceToAdd.disconnect_device()#We will run a disconnect device to ensure that we fully disconnect all processes that may be running in our device
             print ("Device Failed Start")
         return
 
+    """
+    Adds a device that has already been started to our device manager and lets our Unity application know that it was connected
+
+    @type deviceToAdd: DragonMasterDevice
+    @param deviceToAdd: The device that was successfully started
+    """
+    def add_started_device(self, deviceToAdd):
+        self.deviceRegistry.add_device(deviceToAdd)
+        self.add_new_device_to_player_station_dictionary(deviceToAdd)
+        self.send_device_connected_event(deviceToAdd)
+        if isinstance(deviceToAdd, DragonMasterSerialDevice.Draxboard):
+            self.resend_connected_events_for_station(deviceToAdd)
+        self.restore_player_station_state(deviceToAdd)
+        
+        print (deviceToAdd.to_string() + " was successfully ADDED to our device manager")
+        return
+
+    """
+    Starts each of the devices that are passed in on a pool of worker threads, so that a slow device (such as a bill acceptor going through
+    its startup handshake) does not hold up the rest of our devices. Each device is added to our device manager as soon as its start
+    finishes, so devices are sent to Unity as they become ready. Devices are only ever added from this thread, so our registries are never
+    modified by more than one device at a time
+
+    A device that has not finished starting within DEVICE_STARTUP_DEADLINE_SECONDS is abandoned. We can not interrupt a start that is in
+    progress, so the device is disconnected once its start returns, and its element is skipped until then
+
+    @type devicesToStart: list
+    @param devicesToStart: list of (DragonMasterDevice, device element) for every device that should be started
+    """
+    def start_devices_in_parallel(self, devicesToStart):
+        devicesToStart = [(deviceToAdd, deviceElementNode) for deviceToAdd, deviceElementNode in devicesToStart \
+            if DeviceRegistry.get_element_key(deviceElementNode) not in self.abandonedDeviceStartKeys]
+        if len(devicesToStart) == 0:
+            return
+
+        deviceStartTimes = {}#Key: DragonMasterDevice | Value: The time.perf_counter() value from when the device began starting. Unset while the device waits for a worker
+        startupExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=min(DragonMasterDeviceManager.MAX_STARTUP_WORKERS, len(devicesToStart)))
+        devicesByFuture = {}
+        for deviceToAdd, deviceElementNode in devicesToStart:
+            startFuture = startupExecutor.submit(self.start_device_on_worker, deviceToAdd, deviceElementNode, deviceStartTimes)
+            devicesByFuture[startFuture] = (deviceToAdd, deviceElementNode)
+
+        pendingFutures = set(devicesByFuture.keys())
+        while pendingFutures:
+            currentTime = time.perf_counter()
+            waitTimeout = DragonMasterDeviceManager.DEVICE_STARTUP_DEADLINE_SECONDS
+            for startFuture in pendingFutures:
+                deviceStartTime = deviceStartTimes.get(devicesByFuture[startFuture][0])
+                if deviceStartTime != None:
+                    waitTimeout = min(waitTimeout, deviceStartTime + DragonMasterDeviceManager.DEVICE_STARTUP_DEADLINE_SECONDS - currentTime)
+            completedFutures, pendingFutures = concurrent.futures.wait(pendingFutures, timeout=max(waitTimeout, 0), return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for startFuture in completedFutures:
+                deviceToAdd, deviceElementNode = devicesByFuture[startFuture]
+                if startFuture.result():
+                    self.add_started_device(deviceToAdd)
+                else:
+                    deviceToAdd.disconnect_device()#We will run a disconnect device to ensure that we fully disconnect all processes that may be running in our device
+                    print ("Device Failed Start")
+
+            currentTime = time.perf_counter()
+            for startFuture in list(pendingFutures):
+                deviceStartTime = deviceStartTimes.get(devicesByFuture[startFuture][0])
+                if deviceStartTime != None and currentTime - deviceStartTime >= DragonMasterDeviceManager.DEVICE_STARTUP_DEADLINE_SECONDS:
+                    pendingFutures.remove(startFuture)
+                    self.abandon_device_start(startFuture, devicesByFuture[startFuture])
+
+        startupExecutor.shutdown(wait=False)#Abandoned devices will finish on their worker threads
+        return
+
+    """
+    Starts a single device. This is run on one of our startup workers
+
+    @rtype: bool
+    @returns: True if our device started successfully
+    """
+    def start_device_on_worker(self, deviceToAdd, deviceElementNode, deviceStartTimes):
+        deviceStartTimes[deviceToAdd] = time.perf_counter()
+        try:
+            return deviceToAdd.start_device(deviceElementNode)
+        except Exception as e:
+            print ("There was an error starting " + deviceToAdd.to_string())
+            print (e)
+            return False
+
+    """
+    Gives up on waiting for a device that missed its startup deadline. Once its start returns, the device is disconnected rather than added,
+    and a later search will try to start it again
+
+    @type startFuture: concurrent.futures.Future
+    @param startFuture: The future of our device's start
+
+    @type deviceAndElement: tuple
+    @param deviceAndElement: (DragonMasterDevice, device element) of the device that we are abandoning
+    """
+    def abandon_device_start(self, startFuture, deviceAndElement):
+        deviceToAbandon, deviceElementNode = deviceAndElement
+        deviceElementKey = DeviceRegistry.get_element_key(deviceElementNode)
+        print ("Warning: A device did not start within " + str(DragonMasterDeviceManager.DEVICE_STARTUP_DEADLINE_SECONDS) + " seconds. We will try again later")
+        self.abandonedDeviceStartKeys.add(deviceElementKey)
+
+        def on_abandoned_start_finished(completedFuture):
+            deviceToAbandon.disconnect_device()
+            self.abandonedDeviceStartKeys.discard(deviceElementKey)
+            return
+        startFuture.add_done_callback(on_abandoned_start_finished)#Called immediately if our start has already finished
+        return
+
 
 
     """
@@ -385,10 +709,34 @@ class DragonMasterDeviceManager:
             deviceData.append(DragonMasterDeviceManager.OMNI_EVENT)#DeviceTypeID
             pass
         
-        self.add_event_to_send(DragonMasterDeviceManager.DEVICE_CONNECTED, deviceData, self.get_player_station_hash_for_device(deviceThatWasAdded))
+        playerStationHash = self.get_player_station_hash_for_device(deviceThatWasAdded)
+        if playerStationHash == 0 and deviceThatWasAdded.deviceParentPath != None:
+            self.devicesAnnouncedWithoutStation.add(deviceThatWasAdded)
+        else:
+            self.devicesAnnouncedWithoutStation.discard(deviceThatWasAdded)
+        self.add_event_to_send(DragonMasterDeviceManager.DEVICE_CONNECTED, deviceData, playerStationHash)
         return
         # print ("Device Added ID: " + str(deviceTypeID))
 
+    """
+    Sends the connected event again for every device in the station of a draxboard that was announced before the draxboard was added.
+    Hotplugged devices are started in the order that udev reports them, so a station's bill acceptor, joystick or printer is often added
+    before its draxboard and is sent to Unity with a player station hash of 0
+
+    @type draxboard: Draxboard
+    @param draxboard: The draxboard that was just added
+    """
+    def resend_connected_events_for_station(self, draxboard):
+        if not self.devicesAnnouncedWithoutStation:
+            return
+        playerStation = self.playerStationRegistry.get_station_for_device(draxboard)
+        if playerStation == None:
+            return
+        for stationDevice in (playerStation.connectedBillAcceptor, playerStation.connectedJoystick, playerStation.connectedPrinter):
+            if stationDevice != None and stationDevice in self.devicesAnnouncedWithoutStation:
+                self.send_device_connected_event(stationDevice)
+        return
+
     """
     If a device was removed we should call this method, so that we appropriately notify our Unity Applcation
 
@@ -417,6 +765,42 @@ class DragonMasterDeviceManager:
         return
 
 
+    """
+    Returns the topology index of the search or probe that is currently running. If a device is started outside of a search, we will
+    build a new index from our current device context. The index for a probe is built the first time that it is asked for
+
+    @rtype: DeviceTopologyIndex
+    """
+    def get_device_topology_index(self):
+        deviceTopologyIndex = self.deviceTopologyIndex
+        if deviceTopologyIndex == None:
+            deviceTopologyIndex = DeviceTopologyIndex(self.deviceContext)
+            if self.isProbingHotpluggedDevice:
+                self.deviceTopologyIndex = deviceTopologyIndex
+        return deviceTopologyIndex
+
+    """
+    Re-applies the last state that Unity commanded for the player station of a device that was just added. Our draxboard restores its own
+    outputs in start_device, so that it only writes its outputs once. Our bill acceptor can only find its player station once the draxboard
+    of that station is connected, so we check for it when either device is added
+
+    @type deviceThatWasAdded: DragonMasterDevice
+    @param deviceThatWasAdded: The newly connected device
+    """
+    def restore_player_station_state(self, deviceThatWasAdded):
+        if not isinstance(deviceThatWasAdded, DragonMasterSerialDevice.Draxboard) and not isinstance(deviceThatWasAdded, DragonMasterSerialDevice.DBV400):
+            return
+        playerStationHash = self.get_player_station_hash_for_device(deviceThatWasAdded)
+        if playerStationHash == 0:
+            return
+        
+        billAcceptor = self.get_bill_acceptor_from_player_station_hash(playerStationHash)
+        if billAcceptor == None:
+            return
+        if self.stationStateStore.get_station_state(playerStationHash, StationStateStore.BILL_ACCEPTOR_IDLE):
+            billAcceptor.restore_idle_state()#Our bill acceptor is idled once its startup inhibit has completed
+        return
+
     """
     Adds a device to the player station dictionary and our device list
 
@@ -428,27 +812,7 @@ class DragonMasterDeviceManager:
                 if not isinstance(deviceToAdd, DragonMasterSerialDevice.Omnidongle):#The omnidongle is the only device where we don't care what the parent path is set to
                     print ("Error: " + deviceToAdd.to_string() + " does not contain a parent device path. Please be sure to set one up")
         else:
-            if deviceToAdd.deviceParentPath not in self.playerStationDictionary:
-                self.playerStationDictionary[deviceToAdd.deviceParentPath] = PlayerStationContainer()
-            
-            previouslyConnectedDevice = None#Used to warn us that there was already a device connected to this player station
-            if isinstance(deviceToAdd, DragonMasterDevice.Joystick):
-                previouslyConnectedDevice = self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedJoystick
-                self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedJoystick = deviceToAdd
-            elif isinstance(deviceToAdd, DragonMasterDevice.Printer):
-                previouslyConnectedDevice = self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedPrinter
-                self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedPrinter = deviceToAdd
-            elif isinstance(deviceToAdd, DragonMasterSerialDevice.DBV400):
-                previouslyConnectedDevice = self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedBillAcceptor
-                self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedBillAcceptor = deviceToAdd
-            elif isinstance(deviceToAdd, DragonMasterSerialDevice.Draxboard):
-                previouslyConnectedDevice = self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedDraxboard
-                self.playerStationDictionary[deviceToAdd.deviceParentPath].connectedDraxboard = deviceToAdd
-                self.playerStationDictionary[deviceToAdd.deviceParentPath].persistedPlayerStationHash = deviceToAdd.playerStationHash
-                self.playerStationHashToParentDevicePath[deviceToAdd.playerStationHash] = deviceToAdd.deviceParentPath
-
-            # print (deviceToAdd.deviceParentPath)
-            #print (self.playerStationDictionary[deviceToAdd.deviceParentPath].to_string())
+            previouslyConnectedDevice = self.playerStationRegistry.add_device(deviceToAdd)#Used to warn us that there was already a device connected to this player station
 
             if previouslyConnectedDevice != None:
                 print ("Warning: There are two or more of the same devices connected to our our player station")
@@ -467,15 +831,17 @@ class DragonMasterDeviceManager:
         if deviceToRemove == None:
             return
 
-        if self.allConnectedDevices.__contains__(deviceToRemove):
-            deviceToRemove.disconnect_device()
-            self.remove_device_from_player_station_dictionary(deviceToRemove)
-            self.allConnectedDevices.remove(deviceToRemove)
-            self.send_device_disconnected_event(deviceToRemove)
-            print (deviceToRemove.to_string() + " was successfully REMOVED")
-        else:
-            if not isinstance(deviceToRemove, DragonMasterSerialDevice.ReliancePrinterSerial):#reliance serial is the one excpetion where we don't remove it normally
-                print (deviceToRemove.to_string() + " was not found in our device list. Perhaps it was already removed")
+        with self.deviceRemovalLock:#A device can be removed by its udev remove event and by its polling thread at the same time. Only one of them should remove it
+            if self.deviceRegistry.contains_device(deviceToRemove):
+                deviceToRemove.disconnect_device()
+                self.remove_device_from_player_station_dictionary(deviceToRemove)
+                self.deviceRegistry.remove_device(deviceToRemove)
+                self.devicesAnnouncedWithoutStation.discard(deviceToRemove)
+                self.send_device_disconnected_event(deviceToRemove)
+                print (deviceToRemove.to_string() + " was successfully REMOVED")
+            else:
+                if not isinstance(deviceToRemove, DragonMasterSerialDevice.ReliancePrinterSerial):#reliance serial is the one excpetion where we don't remove it normally
+                    print (deviceToRemove.to_string() + " was not found in our device list. Perhaps it was already removed")
 
 
         return
@@ -496,22 +862,9 @@ class DragonMasterDeviceManager:
                 print ("The device path was None. Something was not properly set up...")
             return
 
-        if deviceToRemove.deviceParentPath not in self.playerStationDictionary:
+        if not self.playerStationRegistry.remove_device(deviceToRemove):
             print ("Warning: Parent path was not found in playerstation dictionary...")
             return
-        
-        if isinstance(deviceToRemove, DragonMasterDevice.Joystick):
-            self.playerStationDictionary[deviceToRemove.deviceParentPath].connectedJoystick = None
-            return
-        elif isinstance(deviceToRemove, DragonMasterDevice.Printer):
-            self.playerStationDictionary[deviceToRemove.deviceParentPath].connectedPrinter = None
-            return
-        elif isinstance(deviceToRemove, DragonMasterSerialDevice.Draxboard):
-            self.playerStationDictionary[deviceToRemove.deviceParentPath].connectedDraxboard = None
-            return
-        elif isinstance(deviceToRemove, DragonMasterSerialDevice.DBV400):
-            self.playerStationDictionary[deviceToRemove.deviceParentPath].connectedBillAcceptor = None
-            return
         return
 
 
@@ -523,12 +876,9 @@ class DragonMasterDeviceManager:
     @param device: a DragonMasterDevice that will return a playerstation hash if one is valid
     """
     def get_player_station_hash_for_device(self, device):
-        playerStationParentPath = device.deviceParentPath
-
-        if playerStationParentPath == None or playerStationParentPath not in self.playerStationDictionary:
+        playerStation = self.playerStationRegistry.get_station_for_device(device)
+        if playerStation == None:
             return 0
-
-        playerStation = self.playerStationDictionary[playerStationParentPath]
         
         return playerStation.persistedPlayerStationHash
 
@@ -543,9 +893,19 @@ class DragonMasterDeviceManager:
     hash that is passed in
     """
     def get_parent_usb_path_from_player_station_hash(self, playerStationHash):
-        if playerStationHash in self.playerStationHashToParentDevicePath:
-            return self.playerStationHashToParentDevicePath[playerStationHash]
-        return None
+        return self.playerStationRegistry.parentPathsByStationHash.get(playerStationHash)
+
+    """
+    Returns the player station container that is tied to the player station hash. This is a single lookup in our station registry
+
+    @type playerStationHash: uint
+    @param playerStationHash: The hash of the player station
+
+    @rtype: PlayerStationContainer
+    @returns: The player station associated with the hash. None if no draxboard has been connected with that hash
+    """
+    def get_player_station_from_player_station_hash(self, playerStationHash):
+        return self.playerStationRegistry.stationsByStationHash.get(playerStationHash)
 
     #endregion Device Management
 
@@ -553,7 +913,11 @@ class DragonMasterDeviceManager:
     #region TCP Received Data Events
 
     """
-    This method will be called to interpret all the packets that we receive from our Unity application
+    This method will be called to interpret all the packets that we receive from our Unity application. The command byte is looked up
+    in our UNITY_COMMAND_REGISTRY, which tells us which handler to call and how the rest of the packet should be decoded into its arguments
+
+    Packets that are received will contain the following layout:
+    [Function, playerStationID(optional), data....]
 
     @type eventMessage: bytes
     @param eventMessage: A list of bytes that will decipher what our DeviceManager should do
@@ -564,91 +928,81 @@ class DragonMasterDeviceManager:
             return
 
         if DragonMasterDeviceManager.DEBUG_PRINT_EVENTS_RECEIVED_FROM_UNITY:
-            print ("Message From Unity: " + eventMessage.hex())
-
-        eventCommandByte = eventMessage[0]#This is the byte that identifies what type of packet we are using
-
-        if eventCommandByte == DragonMasterDeviceManager.RETRIEVE_CONNECTED_DEVICES:
-            self.on_retrieve_connected_devices()
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.STATUS_FROM_UNITY:
-            self.on_status_from_unity()
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.OMNI_EVENT:
-            self.on_omnidongle_event_received(eventMessage)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.KILL_APPLICATION_EVENT:
-            DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION = True #This will kill the main thread at the next available time. Just keep in mind, this may not be an immediate termination
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.SEND_DM_VERSION_NUMBER:
-
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.SEND_LOCATION_NAME:
+            if DragonMasterDeviceManager.DEBUG_TRANSLATE_PACKETS:
+                print ("Message From Unity: " + byte_command_to_string(eventMessage[0]) + " " + eventMessage[1:].hex())
+            else:
+                print ("Message From Unity: " + eventMessage.hex())
 
+        unityCommand = UNITY_COMMAND_REGISTRY.get(eventMessage[0])#The first byte identifies what type of packet we are using
+        if unityCommand != None and unityCommand.handler != None and len(eventMessage) >= unityCommand.minimumLength:
+            if LatencyTracer.TRACING_ENABLED:
+                LATENCY_TRACER.dispatchingCommandType = eventMessage[0]#Set directly rather than through a method, as this is done for every command
+                try:
+                    unityCommand.handler(self, *unityCommand.decode_arguments(eventMessage))
+                finally:
+                    LATENCY_TRACER.dispatchingCommandType = None#Otherwise events that this thread queues later would be traced against this command
+            else:
+                unityCommand.handler(self, *unityCommand.decode_arguments(eventMessage))
             return
-        elif eventCommandByte == DragonMasterDeviceManager.SEND_MACHINE_NUMBER:
 
-            return
-        #All event functions below this point need to have a playerStationHash as they are specific to a specific player station
+        #All commands that are specific to a player station need to have a playerStationHash
         if len(eventMessage) < 5:
             print (eventMessage.hex())
             print ("The event message was too short...")
-            return 
-        # playerStationHash = convert_byte_array_to_value(eventMessage[1:4])
-        playerStationHash = int.from_bytes(eventMessage[1:5], byteorder='big')
-        #General Event Messages
-        
-        #Drax Outputs
-        if eventCommandByte == DragonMasterDeviceManager.DRAX_HARD_METER_EVENT:
-            self.on_drax_hard_meter_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.DRAX_OUTPUT_EVENT:
-            self.on_drax_output_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.DRAX_OUTPUT_BIT_ENABLE_EVENT:
-            self.on_drax_output_bit_enable_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.DRAX_OUTPUT_BIT_DISABLE_EVENT:
-            self.on_drax_output_bit_disable_event(playerStationHash, eventMessage[5:])
-            return
-
-        #Printer Outputs
-        elif eventCommandByte == DragonMasterDeviceManager.PRINTER_CASHOUT_TICKET:
-            self.on_print_cashout_ticket_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.PRINTER_AUDIT_TICKET:
-            self.on_print_audit_ticket_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.PRINTER_CODEX_TICKET:
-            self.on_print_codex_ticket_event(playerStationHash, eventMessage[5:])
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.PRINTER_TEST_TICKET:
-            self.on_print_test_ticket_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.PRINTER_STATE_EVENT:
-            self.on_printer_state_request(playerStationHash)
-            
-        #Bill Acceptor Outputs
-        elif eventCommandByte == DragonMasterDeviceManager.BA_IDLE_EVENT:
-            self.on_ba_idle_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.BA_INHIBIT_EVENT:
-            self.on_ba_inhibit_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.BA_RESET_EVENT:
-            self.on_ba_reset_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.BA_ACCEPT_BILL_EVENT:
-            self.on_ba_stack_bill_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.BA_REJECT_BILL_EVENT:
-            self.on_ba_reject_bill_event(playerStationHash)
-            return
-        elif eventCommandByte == DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT:
-            self.on_ba_request_state_event(playerStationHash)
             return
+        if unityCommand == None or unityCommand.handler == None:
+            print (str(eventMessage[0]) + " has not been set up")
         else:
-            print (str(eventCommandByte) + " has not been set up")
+            print (eventMessage.hex())
+            print (byte_command_to_string(eventMessage[0]) + " was too short...")
+        return
+
+    """
+    Called when Unity sends a batch of player station commands in one packet, such as when setting the lights of every station at once.
+    Each command is decoded and handed to the same handler it would have been sent to if it arrived on its own, which queues it on its
+    device's worker thread, so all stations are updated in parallel. Only commands that target a player station are allowed in a batch
+
+    @type batchData: bytes
+    @param batchData: Packed commands in the form [length(2), command, playerStationHash(4), data...] repeated until the end of the packet
+    """
+    def on_batch_station_event(self, batchData):
+        batchView = memoryview(batchData)
+        batchLength = len(batchView)
+        getUnityCommand = UNITY_COMMAND_REGISTRY.get
+        offset = 0
+        while offset < batchLength:
+            if offset + 2 > batchLength:
+                print ("The batch station event was cut off in the middle of a command length")
+                return
+            commandLength = (batchView[offset] << 8) | batchView[offset + 1]
+            offset += 2
+            if offset + commandLength > batchLength:
+                print ("The batch station event was cut off. " + str(batchLength - offset) + " bytes remaining for a " + str(commandLength) + " byte command")
+                return
+            if commandLength == 0:
+                continue
+            commandMessage = batchView[offset:offset + commandLength]
+            offset += commandLength
+
+            unityCommand = getUnityCommand(commandMessage[0])
+            if unityCommand == None or unityCommand.handler == None or not unityCommand.requiresPlayerStation:
+                print (str(commandMessage[0]) + " can not be sent in a batch station event")
+                continue
+            if commandLength < unityCommand.minimumLength:
+                print (byte_command_to_string(commandMessage[0]) + " in the batch station event was too short...")
+                continue
+            try:
+                if LatencyTracer.TRACING_ENABLED:
+                    LATENCY_TRACER.dispatchingCommandType = commandMessage[0]#Each command in the batch is traced as its own command type
+                unityCommand.handler(self, *unityCommand.decode_arguments(commandMessage))
+            except Exception as e:
+                #One station failing to handle its command should not stop the rest of the stations in our batch
+                print ("There was an error handling " + byte_command_to_string(commandMessage[0]) + " in the batch station event")
+                print (e)
+            finally:
+                if LatencyTracer.TRACING_ENABLED:
+                    LATENCY_TRACER.dispatchingCommandType = None
+        return
 
     """
     This will send all the currently connected devices to our unity application. Helpful if our game restarts while the machine is still running
@@ -665,6 +1019,20 @@ class DragonMasterDeviceManager:
         self.recievedStatusFromGameFlag = True
         return
 
+    """
+    Called when Unity would like our device manager to shut down. This will kill the main thread at the next available time.
+    Just keep in mind, this may not be an immediate termination
+    """
+    def on_kill_application_event(self):
+        DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION = True
+        return
+
+    """
+    Called for commands that Unity may still send us, but that our device manager no longer does anything with
+    """
+    def on_ignored_unity_command(self):
+        return
+
     #STUFF TO REMOVE LATER###############################################################################################################
     """
     This will set the dragon master version that we are using from our dragon master game
@@ -694,27 +1062,35 @@ class DragonMasterDeviceManager:
     """
     Sends an event to the current connected Omnidongle device
 
-    @type eventMessage: bytes
-    @param eventMessage: a list of bytes that will be sent to our omnidongle device
+    @type eventData: bytes
+    @param eventData: a list of bytes that will be sent to our omnidongle device
     """
-    def on_omnidongle_event_received(self, eventMessage):
+    def on_omnidongle_event_received(self, eventData):
         if self.CONNECTED_OMNIDONGLE != None:
-            self.CONNECTED_OMNIDONGLE.add_event_to_queue(self.CONNECTED_OMNIDONGLE.send_data_to_omnidongle_wait_for_response, eventMessage[1:])
+            #Our event may be a view into our tcp receive buffer, so we copy it before queueing it up to be sent later
+            self.CONNECTED_OMNIDONGLE.add_event_to_queue(self.CONNECTED_OMNIDONGLE.send_data_to_omnidongle_wait_for_response, bytes(eventData))
         return
 
     #region draxboard tcp events
 
     """
+    Increments one of the hard meters that is attached to the draxboard of our player station
 
+    @type playerStationHash: uint
+    @param playerStationHash: The player station hash that indicates which draxboard will increment its meter
+
+    @type meterID: byte
+    @param meterID: The meter that we will increment
+
+    @type numberOfTicks: ushort
+    @param numberOfTicks: The number of times the meter will be incremented
     """
-    def on_drax_hard_meter_event(self, playerStationHash, eventData):
+    def on_drax_hard_meter_event(self, playerStationHash, meterID, numberOfTicks):
         draxboard = self.get_draxboard_from_player_station_hash(playerStationHash)
         if draxboard == None:
             return
-        if len(eventData) < 2:
-            return
         
-        draxboard.add_event_to_queue(draxboard.increment_meter_ticks, eventData[0], (eventData[1] << 8) + eventData[2])        
+        draxboard.add_event_to_queue(draxboard.increment_meter_ticks, meterID, numberOfTicks)        
         return
 
     """
@@ -723,16 +1099,14 @@ class DragonMasterDeviceManager:
     @type playerStationHash: uint
     @param playerStationHash: The player station hash that indicates which draxboard will have its outputs toggled
 
-    @type eventData: bytes
-    @param eventData: list of bytes that indicate which outputs will be toggled in our Draxboard
+    @type outputState: ushort
+    @param outputState: value that indicates which outputs will be on in our Draxboard
     """
-    def on_drax_output_event(self, playerStationHash, eventData):
+    def on_drax_output_event(self, playerStationHash, outputState):
         draxboard = self.get_draxboard_from_player_station_hash(playerStationHash)
         if draxboard == None:
             return
-        if len(eventData) < 2:
-            return
-        draxboard.add_event_to_queue(draxboard.toggle_output_state_of_drax, (eventData[0] << 8) + eventData[1], 0)
+        draxboard.queue_output_state_change(outputState, 0)
         return
 
     """
@@ -741,16 +1115,14 @@ class DragonMasterDeviceManager:
     @type playerStationHash: uint
     @param playerStationHash: The player station hash that indicates which draxboard will outputs toggled
 
-    @type eventData: bytes
-    @param eventData: The data that will indicate the bit that we will toggle on
+    @type outputBits: ushort
+    @param outputBits: The bits that we will toggle on
     """
-    def on_drax_output_bit_enable_event(self, playerStationHash, eventData):
+    def on_drax_output_bit_enable_event(self, playerStationHash, outputBits):
         draxboard = self.get_draxboard_from_player_station_hash(playerStationHash)
         if draxboard == None:
             return
-        if len(eventData) < 2:
-            return
-        draxboard.add_event_to_queue(draxboard.toggle_output_state_of_drax, (eventData[0] << 8) + eventData[1], 1)
+        draxboard.queue_output_state_change(outputBits, 1)
 
         return
 
@@ -760,17 +1132,15 @@ class DragonMasterDeviceManager:
     @type playerStationHash: uint
     @param playerStationHash: 
 
-    @type eventData: bytes
-    @param eventData:
+    @type outputBits: ushort
+    @param outputBits: The bits that we will toggle off
     """
-    def on_drax_output_bit_disable_event(self, playerStationHash, eventData):
+    def on_drax_output_bit_disable_event(self, playerStationHash, outputBits):
         draxboard = self.get_draxboard_from_player_station_hash(playerStationHash)
         if draxboard == None:
             return
-        if not len(eventData):
-            return
         
-        draxboard.add_event_to_queue(draxboard.toggle_output_state_of_drax, (eventData[0] << 8) + eventData[1], 2)
+        draxboard.queue_output_state_change(outputBits, 2)
         return
     #endregion draxboard tcp events
 
@@ -779,11 +1149,13 @@ class DragonMasterDeviceManager:
     This method should be called when a bill acceptor idle event is triggered from Unity
     """
     def on_ba_idle_event(self, playerStationHash):
+        self.stationStateStore.set_station_state(playerStationHash, StationStateStore.BILL_ACCEPTOR_IDLE, True)
         billAcceptor = self.get_bill_acceptor_from_player_station_hash(playerStationHash)
 
         if billAcceptor == None:
             return
         
+        billAcceptor.cancel_idle_restore()#Unity's command replaces the idle state that we were restoring
         billAcceptor.add_event_to_queue(billAcceptor.idle_dbv)
         return
 
@@ -791,11 +1163,13 @@ class DragonMasterDeviceManager:
     This method should be called when a bill acceptor inhibit event is called from Unity
     """
     def on_ba_inhibit_event(self, playerStationHash):
+        self.stationStateStore.set_station_state(playerStationHash, StationStateStore.BILL_ACCEPTOR_IDLE, False)
         billAcceptor = self.get_bill_acceptor_from_player_station_hash(playerStationHash)
 
         if billAcceptor == None:
             return
         
+        billAcceptor.cancel_idle_restore()#Unity's command replaces the idle state that we were restoring
         billAcceptor.add_event_to_queue(billAcceptor.inhibit_dbv)
         return
 
@@ -918,8 +1292,8 @@ class DragonMasterDeviceManager:
 
     #region TCP Communication
     """
-    Queue up an event to send to our Unity Application. This should always be of the type
-    byteArray
+    Publishes an event to our device event bus. Every subscriber of our bus will receive it, including our Unity subscriber, which will
+    queue it up to send to our Unity Application as a byteArray
 
     @type eventID: byte
     @param eventID - the event id of the packet. This is the byte that defines the action that will be taken upon being received by our unity application
@@ -931,13 +1305,23 @@ class DragonMasterDeviceManager:
     @param playerStationHash - if value is left as none it will not be added to the packet. But devices that are associated with a specific player station
     """
     def add_event_to_send(self, eventID, eventData, playerStationHash = None):
-        messageToSend = []
-        messageToSend.append(eventID)
-        if playerStationHash != None:
-            messageToSend += int.to_bytes(playerStationHash, 4, byteorder='big')
-        messageToSend += eventData
+        self.deviceEventBus.publish(DeviceEvent(eventID, eventData, playerStationHash))
+        return
+
+    """
+    Our Unity subscriber to the device event bus. Converts the event into the packet that Unity expects and adds it to our TCP queue.
+    This is called on the thread that published the event, so that nothing else subscribed to our bus can delay events sent to Unity
+
+    @type deviceEvent: DeviceEvent
+    @param deviceEvent: The event that was published
+    """
+    def send_device_event_to_unity(self, deviceEvent):
+        messageToSend = deviceEvent.to_unity_message()
         
-        self.tcpManager.add_event_to_send(messageToSend)
+        serialReadTime = LATENCY_TRACER.get_serial_read_time()#Only set if this event was created while processing bytes read from a serial device
+        if serialReadTime != None:
+            LATENCY_TRACER.record(LatencyTracer.SERIAL_READ_TO_ENQUEUE, deviceEvent.eventType, serialReadTime)
+        self.tcpManager.add_event_to_send(messageToSend, serialReadTime)
         return
 
     """
@@ -946,13 +1330,11 @@ class DragonMasterDeviceManager:
     Packets that are received will contain the following layout:
     [Function, playerStationID(optional), data....]
 
-    @type eventList: list
-    @param eventList: list of events that have been received from our unity application and will be interpreted
+    @type eventList: iterable
+    @param eventList: list of events that have been received from our unity application and will be interpreted. This may also
+    be the generator that is returned by our TCPFrameDecoder, in which case each event is processed as soon as it is decoded
     """
     def execute_all_events_processed_from_tcp(self, eventList):
-        if (len(eventList) <= 0):
-            return
-
         for event in eventList:
             if not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
                 self.interpret_and_process_event_from_unity(event)
@@ -972,45 +1354,37 @@ class DragonMasterDeviceManager:
     @returns: the connected draxboard
     """
     def get_draxboard_from_player_station_hash(self, playerStationHash):
-        parentUSBPath = self.get_parent_usb_path_from_player_station_hash(playerStationHash)
-        if  parentUSBPath == None:
-            return None
-        if parentUSBPath not in self.playerStationDictionary:
+        playerStation = self.playerStationRegistry.stationsByStationHash.get(playerStationHash)
+        if playerStation == None:
             return None
-        return self.playerStationDictionary[parentUSBPath].connectedDraxboard
+        return playerStation.connectedDraxboard
 
     """
     Returns a bill acceptor object using the player station hash
     """
     def get_bill_acceptor_from_player_station_hash(self, playerStationHash):
-        parentUSBPath = self.get_parent_usb_path_from_player_station_hash(playerStationHash)
-        if  parentUSBPath == None:
+        playerStation = self.playerStationRegistry.stationsByStationHash.get(playerStationHash)
+        if playerStation == None:
             return None
-        if parentUSBPath not in self.playerStationDictionary:
-            return None
-        return self.playerStationDictionary[parentUSBPath].connectedBillAcceptor
+        return playerStation.connectedBillAcceptor
 
     """
     Returns a printer device object using the player station hash
     """
     def get_printer_from_player_station_hash(self, playerStationHash):
-        parentUSBPath = self.get_parent_usb_path_from_player_station_hash(playerStationHash)
-        if  parentUSBPath == None:
-            return None
-        if parentUSBPath not in self.playerStationDictionary:
+        playerStation = self.playerStationRegistry.stationsByStationHash.get(playerStationHash)
+        if playerStation == None:
             return None
-        return self.playerStationDictionary[parentUSBPath].connectedPrinter
+        return playerStation.connectedPrinter
 
     """
     Returns a joystick device object using the palyer station hash
     """
     def get_joystick_from_player_station_hash(self, playerStationHash):
-        parentUSBPath = self.get_parent_usb_path_from_player_station_hash(playerStationHash)
-        if  parentUSBPath == None:
+        playerStation = self.playerStationRegistry.stationsByStationHash.get(playerStationHash)
+        if playerStation == None:
             return None
-        if parentUSBPath not in self.playerStationDictionary:
-            return None
-        return self.playerStationDictionary[parentUSBPath].connectedJoystick
+        return playerStation.connectedJoystick
         
     #endregion get device methods
 
@@ -1021,22 +1395,14 @@ class DragonMasterDeviceManager:
     device manager list
     """
     def device_manager_contains_joystick(self, joystickUInputElement):
-        for dev in self.allConnectedDevices:
-            if isinstance(dev, DragonMasterDevice.Joystick):
-                if dev.joystickUInput.phys == joystickUInputElement.phys:
-                    return True
-        return False
+        return isinstance(self.deviceRegistry.devicesByPhys.get(joystickUInputElement.phys), DragonMasterDevice.Joystick)
 
     """
     Returns whether or not the draxboard that was passed into the method was already added to our
     device manager list
     """
     def device_manager_contains_draxboard(self, draxboardElement):
-        for dev in self.allConnectedDevices:
-            if isinstance(dev, DragonMasterSerialDevice.Draxboard):
-                if dev.comport == draxboardElement.device:
-                    return True
-        return False
+        return isinstance(self.deviceRegistry.devicesByComport.get(draxboardElement.device), DragonMasterSerialDevice.Draxboard)
 
 
     """
@@ -1044,22 +1410,14 @@ class DragonMasterDeviceManager:
     device manager list
     """
     def device_manager_contains_bill_acceptor(self, dbvElement):
-        for dev in self.allConnectedDevices:
-            if isinstance(dev, DragonMasterSerialDevice.BillAcceptor):
-                if dev.comport == dbvElement.device:
-                    return True
-        return False
+        return isinstance(self.deviceRegistry.devicesByComport.get(dbvElement.device), DragonMasterSerialDevice.BillAcceptor)
 
     """
     Returns whether or not the printer that is passed through was already added to our device manager
     """
     def device_manager_contains_printer(self, printerElement):
-        for dev in self.allConnectedDevices:
-            if isinstance(dev, DragonMasterDevice.Printer):
-                if dev.printerObject != None and dev.printerObject.device.port_numbers == printerElement.port_numbers\
-                    and dev.printerObject.device.bus == printerElement.bus:
-                    return True
-        return False
+        usbPortKey = DeviceRegistry.get_usb_port_key(printerElement)
+        return isinstance(self.deviceRegistry.devicesByUSBPort.get(usbPortKey), DragonMasterDevice.Printer)
 #endregion Contains Methods
 
 #region helper classes
@@ -1070,9 +1428,9 @@ class DragonMasterDeviceManager:
     to prevent having 5-10 messages per joystick every time we send a new message
     """
     def check_for_joystick_events(self):
-        for key in self.playerStationDictionary:
-            if self.playerStationDictionary[key].connectedJoystick != None:
-                self.playerStationDictionary[key].connectedJoystick.send_joystick_axes_if_updated()
+        for playerStation in self.playerStationRegistry.allStations:
+            if playerStation.connectedJoystick != None:
+                playerStation.connectedJoystick.send_joystick_axes_if_updated()
         return
 
 
@@ -1083,6 +1441,7 @@ TODO: Add a way to store multiple devices in the event that there are perhaps 2
 This has been an issue in the past where we will try to remove a device
 """
 class PlayerStationContainer:
+    __slots__ = ("persistedPlayerStationHash", "connectedDraxboard", "connectedBillAcceptor", "connectedJoystick", "connectedPrinter")
     
     def __init__(self):
         #Whenever we connect to a new draxboard, this value will be set. As long as the drax is reconnected to the same usb port, this path should remain the same
@@ -1124,205 +1483,2338 @@ class PlayerStationContainer:
             playerStationString += "\nDBV   |MISSING" 
         playerStationString += '\n' + '-' * 60
         return playerStationString
-        
 
-#endregion helper classes
+    """
+    Returns a copy of this player station. Used when we want a view of the station that will not change underneath us while we read it
 
+    @rtype: PlayerStationContainer
+    """
+    def copy(self):
+        stationCopy = PlayerStationContainer()
+        stationCopy.persistedPlayerStationHash = self.persistedPlayerStationHash
+        stationCopy.connectedDraxboard = self.connectedDraxboard
+        stationCopy.connectedBillAcceptor = self.connectedBillAcceptor
+        stationCopy.connectedJoystick = self.connectedJoystick
+        stationCopy.connectedPrinter = self.connectedPrinter
+        return stationCopy
 
-#######################################################################################################################################################
-"""
-Class that handles all of our TCP communication. This will send and receive packets between our Unity application
 
-Note: Packets should be sent in the form of [Function, playerStationID, Data.....]
 """
-class TCPManager:
-    MAX_THREADING_COUNT = 500
-    HOST_ADDRESS = "127.0.0.1"
-    SEND_PORT = 25001
-    RECEIVE_PORT = 35001
-
-    MAX_RECV_BUFFER = 1024
+Keeps track of all of our player stations. Stations are indexed by their parent usb path, by the player station hash of the draxboard that
+was connected to them, and by every device that is currently connected to them, so that each of our lookups is a single dictionary access.
+All changes go through this class under a lock. Readers may use the dictionaries directly for single lookups, or snapshot() when they need a
+consistent view of every station
+"""
+class PlayerStationRegistry:
 
-    def __init__(self, deviceManager):
-        self.sendingEventsToOurUnityApplication = False
-        self.tcpEventQueue = queue.Queue()#Queue of events that we want to send to Unity
+    def __init__(self):
+        self.registryLock = threading.Lock()
+        self.stationsByParentPath = {}#Key: Parent USB Device Path (string) | Value: Player Station (PlayerStationContainer)
+        self.parentPathsByStationHash = {}#Key: Hash Value (uint) | Value: Parent USB Device Path (string)
+        self.stationsByStationHash = {}#Key: Hash Value (uint) | Value: Player Station (PlayerStationContainer)
+        self.stationsByDevice = {}#Key: Device (DragonMasterDevice) | Value: Player Station (PlayerStationContainer)
+        self.allStations = ()#Rebuilt whenever a station is added, so that it can be iterated without holding the lock
+        return
 
-        self.start_new_socket_receive_thread()
-        self.start_new_socket_send_thread()
-        self.deviceManager = deviceManager
-        
+    """
+    Adds a device to the player station that matches its parent path. A new player station will be created if this is the first
+    device that we have found for that path. Draxboards will also register the player station under their hash
 
+    @type deviceToAdd: DragonMasterDevice
+    @param deviceToAdd: The device that we are adding. Its parent path should already be set
 
+    @rtype: DragonMasterDevice
+    @returns: The device of the same type that was previously connected to the station. None if the slot was empty
     """
-    This enqueues an event to send to our unity application
+    def add_device(self, deviceToAdd):
+        with self.registryLock:
+            playerStation = self.stationsByParentPath.get(deviceToAdd.deviceParentPath)
+            if playerStation == None:
+                playerStation = PlayerStationContainer()
+                self.stationsByParentPath[deviceToAdd.deviceParentPath] = playerStation
+                self.allStations = self.allStations + (playerStation,)
+
+            previouslyConnectedDevice = None
+            if isinstance(deviceToAdd, DragonMasterDevice.Joystick):
+                previouslyConnectedDevice = playerStation.connectedJoystick
+                playerStation.connectedJoystick = deviceToAdd
+            elif isinstance(deviceToAdd, DragonMasterDevice.Printer):
+                previouslyConnectedDevice = playerStation.connectedPrinter
+                playerStation.connectedPrinter = deviceToAdd
+            elif isinstance(deviceToAdd, DragonMasterSerialDevice.DBV400):
+                previouslyConnectedDevice = playerStation.connectedBillAcceptor
+                playerStation.connectedBillAcceptor = deviceToAdd
+            elif isinstance(deviceToAdd, DragonMasterSerialDevice.Draxboard):
+                previouslyConnectedDevice = playerStation.connectedDraxboard
+                playerStation.connectedDraxboard = deviceToAdd
+                if playerStation.persistedPlayerStationHash != deviceToAdd.playerStationHash:
+                    self.stationsByStationHash.pop(playerStation.persistedPlayerStationHash, None)
+                    self.parentPathsByStationHash.pop(playerStation.persistedPlayerStationHash, None)
+                playerStation.persistedPlayerStationHash = deviceToAdd.playerStationHash
+                self.stationsByStationHash[deviceToAdd.playerStationHash] = playerStation
+                self.parentPathsByStationHash[deviceToAdd.playerStationHash] = deviceToAdd.deviceParentPath
+
+            if previouslyConnectedDevice != None:
+                self.stationsByDevice.pop(previouslyConnectedDevice, None)
+            self.stationsByDevice[deviceToAdd] = playerStation
+        return previouslyConnectedDevice
 
-    @type messageToQueueForSend: bytes
-    @param messageToQueuForSend: This is the byte packet that we want to enqueue and deliver to Unity as soon as possible
     """
-    def add_event_to_send(self, messageToQueueForSend):
-        if messageToQueueForSend == None:
-            print("message to send was none... what happened")
-            return
-        self.tcpEventQueue.put(messageToQueueForSend)
-        return
+    Removes a device from the player station that it was added to. The player station itself and its hash are kept, so that the
+    station will keep the same hash if the device is reconnected to the same usb port
+
+    @type deviceToRemove: DragonMasterDevice
+    @param deviceToRemove: The device that we are removing
 
+    @rtype: bool
+    @returns: True if the device was found in one of our player stations
     """
-    Start a new instance of a socket thread that will send data to our Unity Application
+    def remove_device(self, deviceToRemove):
+        with self.registryLock:
+            playerStation = self.stationsByDevice.pop(deviceToRemove, None)
+            if playerStation == None:
+                return False
+
+            if playerStation.connectedJoystick is deviceToRemove:
+                playerStation.connectedJoystick = None
+            elif playerStation.connectedPrinter is deviceToRemove:
+                playerStation.connectedPrinter = None
+            elif playerStation.connectedDraxboard is deviceToRemove:
+                playerStation.connectedDraxboard = None
+            elif playerStation.connectedBillAcceptor is deviceToRemove:
+                playerStation.connectedBillAcceptor = None
+        return True
+
+    """
+    Returns the player station that the device was added to
+
+    @type device: DragonMasterDevice
+    @param device: The device whose player station we want
+
+    @rtype: PlayerStationContainer
+    @returns: The player station of the device. None if there is no player station for the device's parent path
+    """
+    def get_station_for_device(self, device):
+        playerStation = self.stationsByDevice.get(device)
+        if playerStation == None and device.deviceParentPath != None:
+            playerStation = self.stationsByParentPath.get(device.deviceParentPath)#Devices that were just removed still report the hash of the station they were in
+        return playerStation
+
+    """
+    Returns a consistent copy of all of our player stations. Changes that are made to the registry after this call will not show up
+    in the returned stations
+
+    @rtype: dict
+    @returns: Key: Parent USB Device Path (string) | Value: Copy of the Player Station (PlayerStationContainer)
+    """
+    def snapshot(self):
+        with self.registryLock:
+            return {parentPath : playerStation.copy() for parentPath, playerStation in self.stationsByParentPath.items()}
+
+
+"""
+Keeps track of every device that is connected to our device manager. Along with the list of all devices, devices are indexed by the comport,
+evdev phys path or usb (bus, port numbers) that they were started with, so that checking whether an enumerated element was already added
+is a single dictionary lookup rather than a scan of all of our devices. The keys of each device are stored when it is added, since a device
+may clear its elements when it is disconnected
+"""
+class DeviceRegistry:
+
+    def __init__(self):
+        self.registryLock = threading.Lock()
+        self.allDevices = []#(DragonMasterDevice)
+        self.devicesByComport = {}#Key: Comport (string) | Value: Serial Device (DragonMasterDevice)
+        self.devicesByPhys = {}#Key: Evdev phys path (string) | Value: Joystick (DragonMasterDevice)
+        self.devicesByUSBPort = {}#Key: (bus, port numbers) (tuple) | Value: Printer (DragonMasterDevice)
+        self.devicesByInputNode = {}#Key: Evdev device node (string) (ex. /dev/input/event3) | Value: Joystick (DragonMasterDevice)
+        self.deviceKeys = {}#Key: Device (DragonMasterDevice) | Value: list of (index, key) that the device was added under
+        return
+
+    """
+    Returns the key of a device element that we found in a search, before a device has been created for it. This is the same key that the
+    device will be indexed by once it is started
+
+    @type deviceElement: object
+    @param deviceElement: A comport element, evdev input device or pyusb device
+
+    @rtype: object
+    """
+    @staticmethod
+    def get_element_key(deviceElement):
+        if hasattr(deviceElement, 'phys'):
+            return deviceElement.phys#evdev input device
+        if hasattr(deviceElement, 'port_numbers'):
+            return DeviceRegistry.get_usb_port_key(deviceElement)#pyusb device
+        return deviceElement.device#comport element
+
+    """
+    Returns the (bus, port numbers) key that is used to index a usb device. Port numbers are returned as a list from pyusb, so they are converted
+    to a tuple so that they can be used as a dictionary key
+
+    @type usbDevice: usb.core.Device
+    @param usbDevice: The usb device that we are creating a key for
+
+    @rtype: tuple
+    """
+    @staticmethod
+    def get_usb_port_key(usbDevice):
+        portNumbers = usbDevice.port_numbers
+        if portNumbers != None:
+            portNumbers = tuple(portNumbers)
+        return (usbDevice.bus, portNumbers)
+
+    """
+    Returns the (bus, port numbers) key of a usb device from its udev sys name (ex. '1-2.3' returns (1, (2, 3))). This is the same key that
+    is returned by get_usb_port_key, and lets us find a usb device after it has been unplugged, when pyusb can no longer read it
+
+    @type usbSysName: string
+    @param usbSysName: The sys name of our usb udev device
+
+    @rtype: tuple
+    @returns: The usb port key. None if the name is not a usb port (ex. 'usb1' for a root hub)
+    """
+    @staticmethod
+    def get_usb_port_key_from_sys_name(usbSysName):
+        nameSplit = usbSysName.split('-')
+        if len(nameSplit) != 2:
+            return None
+        try:
+            return (int(nameSplit[0]), tuple(int(portNumber) for portNumber in nameSplit[1].split('.')))
+        except ValueError:
+            return None
+
+    """
+    Returns the list of indexes and keys that a device should be added under. This should be called after the device has been started
+    so that its comport or device elements have been set
+
+    @type device: DragonMasterDevice
+    @param device: The device that we want the keys of
+
+    @rtype: list
+    @returns: list of (index dictionary, key) pairs
+    """
+    def get_index_keys_for_device(self, device):
+        indexKeys = []
+        if isinstance(device, DragonMasterSerialDevice.SerialDevice):
+            if device.comport != None:
+                indexKeys.append((self.devicesByComport, device.comport))
+        elif isinstance(device, DragonMasterDevice.Joystick):
+            if device.joystickUInput != None:
+                indexKeys.append((self.devicesByPhys, device.joystickUInput.phys))
+                indexKeys.append((self.devicesByInputNode, device.joystickUInput.path))
+        elif isinstance(device, DragonMasterDevice.Printer):
+            if device.printerObject != None:
+                indexKeys.append((self.devicesByUSBPort, DeviceRegistry.get_usb_port_key(device.printerObject.device)))
+        return indexKeys
+
+    """
+    Adds a device to our list of devices and to each of the indexes that it belongs in
+
+    @type device: DragonMasterDevice
+    @param device: The device that was successfully started
+    """
+    def add_device(self, device):
+        with self.registryLock:
+            if device in self.deviceKeys:
+                return
+            indexKeys = self.get_index_keys_for_device(device)
+            for index, key in indexKeys:
+                index[key] = device
+            self.deviceKeys[device] = indexKeys
+            self.allDevices.append(device)
+        return
+
+    """
+    Removes a device from our list of devices and from all of the indexes that it was added to
+
+    @type device: DragonMasterDevice
+    @param device: The device that we are removing
+
+    @rtype: bool
+    @returns: True if the device was found in our registry
+    """
+    def remove_device(self, device):
+        with self.registryLock:
+            indexKeys = self.deviceKeys.pop(device, None)
+            if indexKeys == None:
+                return False
+            for index, key in indexKeys:
+                if index.get(key) is device:
+                    del index[key]
+            self.allDevices.remove(device)
+        return True
+
+    """
+    Returns whether or not the device object has been added to our registry
+
+    @type device: DragonMasterDevice
+    @param device: The device that we are checking
+
+    @rtype: bool
+    """
+    def contains_device(self, device):
+        return device in self.deviceKeys
+
+"""
+Remembers the last state that Unity commanded for each of our player stations, so that it can be re-applied when a device reconnects after
+a USB glitch or after our device manager restarts, instead of waiting for Unity to replay every command. States are saved to a json file.
+Saves are debounced, so a burst of commands from Unity is written to disk once
+
+Station states are keyed by the player station hash, which is built from the usb location of the draxboard and does not change between restarts
+"""
+class StationStateStore:
+    SAVE_DELAY_SECONDS = .5 #How long we wait after a state change before writing our file. Any changes in that time are saved in the same write
+
+    DRAX_OUTPUT_STATE = "draxOutputState"
+    BILL_ACCEPTOR_IDLE = "billAcceptorIdle"
+
+    """
+    @type stationStateFilePath: string
+    @param stationStateFilePath: The json file that our station states are loaded from and saved to. Pass None to keep our states in memory only
+    """
+    def __init__(self, stationStateFilePath):
+        self.stationStateFilePath = stationStateFilePath
+        self.stationStateLock = threading.Lock()
+        self.stationStates = {}#Key: Player Station Hash (uint) | Value: dict of the last commanded states for that station
+        self.saveRequestedSignal = threading.Event()
+        self.saveCount = 0
+        if self.stationStateFilePath == None:
+            return
+
+        create_private_directory(os.path.dirname(self.stationStateFilePath))
+        self.load_station_states()
+        saveThread = threading.Thread(target=self.save_station_states_thread)
+        saveThread.daemon = True
+        saveThread.start()
+        return
+
+    """
+    Loads the station states that were saved the last time our device manager ran. If the file is missing or can not be read, we will
+    start with no saved states
+    """
+    def load_station_states(self):
+        if not os.path.exists(self.stationStateFilePath):
+            return
+        try:
+            with open(self.stationStateFilePath, 'r') as stationStateFile:
+                savedStates = json.load(stationStateFile)
+            for playerStationHash, stationState in savedStates.items():
+                self.stationStates[int(playerStationHash)] = stationState#json keys are always strings
+        except Exception as e:
+            print ("There was an error loading our saved station states")
+            print (e)
+        return
+
+    """
+    Waits for a save to be requested and writes our station states. We write to a new temporary file first and replace our saved file with it,
+    so a crash in the middle of a write will never leave us with a partial file. The temporary file is created with a random name, so it can
+    not be replaced by a file or link that was made ahead of time
+    """
+    def save_station_states_thread(self):
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            self.saveRequestedSignal.wait()
+            sleep(StationStateStore.SAVE_DELAY_SECONDS)
+            self.saveRequestedSignal.clear()
+            with self.stationStateLock:
+                statesToSave = {str(playerStationHash) : dict(stationState) for playerStationHash, stationState in self.stationStates.items()}
+            temporaryFilePath = None
+            try:
+                stationStateDirectory, stationStateFileName = os.path.split(self.stationStateFilePath)
+                temporaryFileDescriptor, temporaryFilePath = tempfile.mkstemp(prefix=stationStateFileName + ".", suffix=".tmp", dir=stationStateDirectory)
+                with os.fdopen(temporaryFileDescriptor, 'w') as stationStateFile:
+                    json.dump(statesToSave, stationStateFile)
+                os.replace(temporaryFilePath, self.stationStateFilePath)
+                self.saveCount += 1
+            except Exception as e:
+                print ("There was an error saving our station states")
+                print (e)
+                if temporaryFilePath != None and os.path.exists(temporaryFilePath):
+                    try:
+                        os.remove(temporaryFilePath)
+                    except OSError as e:
+                        print (e)
+        return
+
+    """
+    Sets a single value in the state of our player station and requests a save if the value has changed
+
+    @type playerStationHash: uint
+    @param playerStationHash: The player station that was commanded
+
+    @type stateName: string
+    @param stateName: One of our state names (ex. DRAX_OUTPUT_STATE)
+    """
+    def set_station_state(self, playerStationHash, stateName, stateValue):
+        if playerStationHash == None or playerStationHash == 0:
+            return#0 is an invalid player station hash
+        with self.stationStateLock:
+            stationState = self.stationStates.setdefault(playerStationHash, {})
+            if stationState.get(stateName) == stateValue:
+                return
+            stationState[stateName] = stateValue
+        if self.stationStateFilePath != None:
+            self.saveRequestedSignal.set()
+        return
+
+    """
+    Returns a value from the saved state of our player station
+
+    @rtype: object
+    @returns: The last value that was set. None if nothing has been set for this station
+    """
+    def get_station_state(self, playerStationHash, stateName):
+        with self.stationStateLock:
+            stationState = self.stationStates.get(playerStationHash)
+            if stationState == None:
+                return None
+            return stationState.get(stateName)
+
+    """
+    Returns a string that displays the saved states of each player station
+    """
+    def to_string(self):
+        with self.stationStateLock:
+            stationStates = {playerStationHash : dict(stationState) for playerStationHash, stationState in self.stationStates.items()}
+        stationStateString = set_string_length_multiple("station states", "saves: " + str(self.saveCount))
+        for playerStationHash in sorted(stationStates):
+            stationStateString += "\n    " + str(playerStationHash) + ": " + str(stationStates[playerStationHash])
+        return stationStateString
+
+"""
+Every device that was found during a single search for devices. Our comports, usb devices and input devices are each enumerated once when
+the snapshot is created, and each element is classified through the rules tables of our device modules. Every part of our search should
+read from the snapshot rather than enumerating devices on its own
+"""
+class DeviceDiscoverySnapshot:
+
+    def __init__(self):
+        self.elementsByDeviceClass = {}#Key: Device class (type) | Value: list of device elements that should be started with that class
+        self.elementsByDeviceClass.update(DragonMasterSerialDevice.classify_serial_port_elements(DragonMasterSerialDevice.get_all_serial_port_elements()))
+        self.elementsByDeviceClass.update(DragonMasterDevice.classify_usb_elements(DragonMasterDevice.get_all_usb_elements()))
+        self.elementsByDeviceClass.update(DragonMasterDevice.classify_input_devices(DragonMasterDevice.get_all_input_devices()))
+        return
+
+    """
+    Returns every element that was classified as the device class that is passed in
+
+    @type deviceClass: type
+    @param deviceClass: The class of device that we are looking for (ex. DragonMasterSerialDevice.Draxboard)
+
+    @rtype: list
+    """
+    def get_elements(self, deviceClass):
+        return self.elementsByDeviceClass.get(deviceClass, [])
+
+"""
+An index of our udev device tree that is built once per search. Our devices find the udev node that they belong to through this index,
+and walk up from that node to find their parent path, rather than searching through every udev device in our system each time that a device is started
+"""
+class DeviceTopologyIndex:
+
+    """
+    @type deviceContext: pyudev.Context
+    @param deviceContext: The context that we will list our udev devices from
+    """
+    def __init__(self, deviceContext):
+        self.devicesBySysName = {}#Key: sys_name (string) | Value: The first udev device that we found with that name (pyudev.Device)
+        self.serialDevicesBySysName = {}#Key: sys_name (string) | Value: The last tty udev device that we found with that name (pyudev.Device)
+        self.joystickDevicesByUSBPort = {}#Key: usb port path of the joystick (ex. "1.2") | Value: The js udev device of our joystick (pyudev.Device)
+        for dev in deviceContext.list_devices():
+            sysName = dev.sys_name
+            if sysName not in self.devicesBySysName:
+                self.devicesBySysName[sysName] = dev
+            #A ttyUSB comport has both a usb-serial node and a tty node with the same name. Our serial devices count their parents up from the tty node
+            if dev.subsystem == 'tty':
+                self.serialDevicesBySysName[sysName] = dev
+            if "js" in sysName:
+                usbDevice = dev.find_parent('usb', 'usb_device')
+                if usbDevice != None:
+                    self.joystickDevicesByUSBPort.setdefault(DeviceTopologyIndex.get_usb_port_path(usbDevice.sys_name), dev)
+        return
+
+    """
+    Returns the port path of a usb device name, which is the part of the name that follows the bus number. This is the same value
+    that is found at the end of an evdev phys (ex. '1-2.3' returns '2.3')
+
+    @rtype: string
+    """
+    @staticmethod
+    def get_usb_port_path(usbSysName):
+        return usbSysName.split('-')[-1]
+
+    """
+    Returns the udev device with the sys name that is passed in. None if there is no device with that name
+
+    @type sysName: string
+    @param sysName: The sys name of our udev device (ex. '1-2.3' for a usb device or 'ttyACM0' for a serial device)
+
+    @rtype: pyudev.Device
+    """
+    def get_device_by_sys_name(self, sysName):
+        return self.devicesBySysName.get(sysName)
+
+    """
+    Returns the tty udev device of a serial comport element. None if our comport was not found
+
+    @type location: string
+    @param location: The usb location of our comport element
+
+    @type name: string
+    @param name: The name of our comport element (ex. 'ttyACM0')
+
+    @rtype: pyudev.Device
+    """
+    def get_serial_device(self, location, name):
+        dev = self.serialDevicesBySysName.get(name)
+        if dev == None or location == None or not dev.device_path.__contains__(location):
+            return None
+        return dev
+
+    """
+    Returns the js udev device of the joystick that is connected to the usb port that is passed in. None if no joystick was found
+
+    @type usbPortPath: string
+    @param usbPortPath: The usb port path that is found at the end of our evdev phys (ex. '2.3')
+
+    @rtype: pyudev.Device
+    """
+    def get_joystick_device(self, usbPortPath):
+        return self.joystickDevicesByUSBPort.get(usbPortPath)
+
+"""
+An event that was produced by one of our devices or our device manager, such as a button press or a bill being inserted. Events are
+published to our DeviceEventBus, which passes the same event object to every subscriber, so subscribers should not modify it
+"""
+class DeviceEvent:
+    __slots__ = ("eventType", "eventData", "playerStationHash")
+
+    STATION_HEADER_STRUCT = struct.Struct('>BI')#[eventType, playerStationHash(4)]
+    STATION_HEADER_SIZE = STATION_HEADER_STRUCT.size
+
+    """
+    @type eventType: byte
+    @param eventType: One of the event bytes that we send to Unity. (ex. DRAX_INPUT_EVENT)
+
+    @type eventData: list
+    @param eventData: The data of the event. Any iterable of byte values
+
+    @type playerStationHash: uint
+    @param playerStationHash: The player station that the event came from. None if the event does not belong to a player station
+    """
+    def __init__(self, eventType, eventData, playerStationHash = None):
+        self.eventType = eventType
+        self.eventData = eventData
+        self.playerStationHash = playerStationHash
+        return
+
+    """
+    Packs our event into the message that we send to Unity. The message is allocated once at its final size and the header is written
+    directly into it, rather than building up a list of ints one byte at a time
+
+    Messages will contain the following layout:
+    [eventType, playerStationHash(4, optional), data....]
+
+    @rtype: bytearray
+    @returns: The packed event
+    """
+    def to_unity_message(self):
+        if self.playerStationHash == None:
+            unityMessage = bytearray(1 + len(self.eventData))
+            unityMessage[0] = self.eventType
+            unityMessage[1:] = self.eventData
+            return unityMessage
+        unityMessage = bytearray(DeviceEvent.STATION_HEADER_SIZE + len(self.eventData))
+        DeviceEvent.STATION_HEADER_STRUCT.pack_into(unityMessage, 0, self.eventType, self.playerStationHash)
+        unityMessage[DeviceEvent.STATION_HEADER_SIZE:] = self.eventData
+        return unityMessage
+
+"""
+Passes every event that our devices publish to each of our subscribers. Subscribers are functions that take a DeviceEvent. Our list of subscribers
+is replaced rather than modified whenever a subscriber is added or removed, so publishing never needs to take a lock. Subscribers are called on the
+thread that published the event, so any subscriber that may be slow should queue the event and return, as our ThreadedEventSubscriber does
+"""
+class DeviceEventBus:
+
+    def __init__(self):
+        self.subscriberLock = threading.Lock()
+        self.subscribers = ()
+        return
+
+    """
+    Adds a function that will be called with every event that is published
+
+    @type subscriber: function
+    @param subscriber: function that takes a DeviceEvent
+    """
+    def subscribe(self, subscriber):
+        with self.subscriberLock:
+            self.subscribers = self.subscribers + (subscriber,)
+        return
+
+    """
+    Removes a function that was added with subscribe
+
+    @type subscriber: function
+    @param subscriber: The function that was subscribed
+    """
+    def unsubscribe(self, subscriber):
+        with self.subscriberLock:
+            self.subscribers = tuple(currentSubscriber for currentSubscriber in self.subscribers if currentSubscriber != subscriber)
+        return
+
+    """
+    Passes the event to each of our subscribers. An error in one subscriber will not stop the event from reaching the others
+
+    @type deviceEvent: DeviceEvent
+    @param deviceEvent: The event that we are publishing
+    """
+    def publish(self, deviceEvent):
+        for subscriber in self.subscribers:
+            try:
+                subscriber(deviceEvent)
+            except Exception as e:
+                print ("There was an error passing an event to one of our subscribers")
+                print (e)
+        return
+
+"""
+Base class for subscribers of our DeviceEventBus that should not run on the thread that published the event. Events are added to a bounded
+queue and handled by our own thread. If our queue is full, the oldest event is dropped, so a slow subscriber can never hold up the thread
+that is publishing. Subscribe put_event to our bus and override handle_device_event
+"""
+class ThreadedEventSubscriber:
+    MAX_QUEUED_EVENTS = 1024
+    KILL_CHECK_INTERVAL_SECONDS = 1
+
+    """
+    @type subscriberName: string
+    @param subscriberName: Name that is displayed in our stats
+
+    @type maxQueuedEvents: int
+    @param maxQueuedEvents: The number of events that we will hold before dropping the oldest event
+    """
+    def __init__(self, subscriberName, maxQueuedEvents = MAX_QUEUED_EVENTS):
+        self.subscriberName = subscriberName
+        self.queuedEvents = collections.deque(maxlen=maxQueuedEvents)
+        self.eventQueuedSignal = threading.Event()
+        self.handledEventCount = 0
+        self.droppedEventCount = 0
+
+        subscriberThread = threading.Thread(target=self.subscriber_thread)
+        subscriberThread.daemon = True
+        subscriberThread.start()
+        return
+
+    """
+    The function that should be subscribed to our DeviceEventBus. Queues the event and wakes up our thread
+
+    @type deviceEvent: DeviceEvent
+    @param deviceEvent: The event that was published
+    """
+    def put_event(self, deviceEvent):
+        if len(self.queuedEvents) == self.queuedEvents.maxlen:
+            self.droppedEventCount += 1#Our deque will remove the oldest event on its own when we append
+        self.queuedEvents.append(deviceEvent)
+        if not self.eventQueuedSignal.is_set():#Setting the signal takes a lock, so we skip it if our thread is already awake
+            self.eventQueuedSignal.set()
+        return
+
+    """
+    Handles every event that is queued until our application is killed
+    """
+    def subscriber_thread(self):
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            if not self.eventQueuedSignal.wait(ThreadedEventSubscriber.KILL_CHECK_INTERVAL_SECONDS):
+                continue#We wake up every so often to check if our application has been killed
+            self.eventQueuedSignal.clear()
+            while self.queuedEvents:
+                deviceEvent = self.queuedEvents.popleft()
+                try:
+                    self.handle_device_event(deviceEvent)
+                except Exception as e:
+                    print ("There was an error in our " + self.subscriberName + " subscriber")
+                    print (e)
+                self.handledEventCount += 1
+            self.on_queued_events_handled()
+        self.on_subscriber_stopped()
+        return
+
+    """
+    Override this to handle each event that was published. This is called on our subscriber thread
+
+    @type deviceEvent: DeviceEvent
+    @param deviceEvent: The event that was published
+    """
+    def handle_device_event(self, deviceEvent):
+        return
+
+    """
+    Called after every event that was waiting in our queue has been handled. Override this if you would like to batch up work, such as flushing a file
+    """
+    def on_queued_events_handled(self):
+        return
+
+    """
+    Called once our subscriber thread has stopped. Override this to release anything that our subscriber holds open, such as a file
+    """
+    def on_subscriber_stopped(self):
+        return
+
+    """
+    Returns a string that displays the number of events that were handled, dropped and are still waiting
+    """
+    def to_string(self):
+        return set_string_length_multiple(self.subscriberName, "handled: " + str(self.handledEventCount) + "  queued: " + str(len(self.queuedEvents)) + \
+            "  dropped: " + str(self.droppedEventCount))
+
+"""
+Keeps count of the number of events of each type that our devices have published
+"""
+class EventCountSubscriber(ThreadedEventSubscriber):
+
+    def __init__(self):
+        self.eventCounts = {}#Key: Event Type (byte) | Value: Number of events published (int)
+        super().__init__("event counts")
+        return
+
+    def handle_device_event(self, deviceEvent):
+        self.eventCounts[deviceEvent.eventType] = self.eventCounts.get(deviceEvent.eventType, 0) + 1
+        return
+
+    """
+    Returns a string that displays the number of events of each type that have been published
+    """
+    def to_string(self):
+        eventCountString = super().to_string()
+        eventCounts = dict(self.eventCounts)
+        for eventType in sorted(eventCounts):
+            eventCountString += "\n    " + byte_command_to_string(eventType) + ": " + str(eventCounts[eventType])
+        return eventCountString
+
+"""
+Writes every event that our devices publish to a journal file, one line per event. This is helpful for tracking down what happened on a machine
+after the fact
+"""
+class EventJournalSubscriber(ThreadedEventSubscriber):
+
+    """
+    @type journalFilePath: string
+    @param journalFilePath: The file that we will append our events to. Its directory is created if it does not exist
+    """
+    def __init__(self, journalFilePath):
+        self.journalFilePath = journalFilePath
+        create_private_directory(os.path.dirname(journalFilePath))
+        #O_NOFOLLOW will fail to open our journal if it has been replaced with a link, rather than appending to the file that it links to
+        journalFileDescriptor = os.open(journalFilePath, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        self.journalFile = os.fdopen(journalFileDescriptor, 'a')
+        super().__init__("event journal")
+        return
+
+    def handle_device_event(self, deviceEvent):
+        playerStationString = ""
+        if deviceEvent.playerStationHash != None:
+            playerStationString = str(deviceEvent.playerStationHash)
+        self.journalFile.write(str(datetime.datetime.now()) + " " + byte_command_to_string(deviceEvent.eventType) + " " + playerStationString + " " + \
+            bytes(deviceEvent.eventData).hex() + "\n")
+        return
+
+    def on_queued_events_handled(self):
+        self.journalFile.flush()
+        return
+
+    def on_subscriber_stopped(self):
+        self.journalFile.close()
+        return
+
+"""
+Describes one of the commands that is passed between our device manager and our Unity application. For commands that we receive from
+Unity, this holds the handler that should be called along with the layout of the packet, so that the packet can be decoded into the
+arguments of the handler. Commands that we only send to Unity have no handler and are only used to translate our packets for debugging
+"""
+class UnityCommand:
+    __slots__ = ("commandName", "handler", "requiresPlayerStation", "hasRawPayload", "argumentStruct", "minimumLength")
+
+    """
+    @type commandName: string
+    @param commandName: The name that is displayed when translating our packets
+
+    @type handler: function
+    @param handler: The DragonMasterDeviceManager method that is called when this command is received. None if we never receive this command
+
+    @type requiresPlayerStation: bool
+    @param requiresPlayerStation: True if the command byte is followed by a 4 byte player station hash. The hash will be the first argument
+
+    @type payloadFormat: string
+    @param payloadFormat: struct format (without a byte order) of the values that follow. Each value will be passed to our handler as an argument
+
+    @type hasRawPayload: bool
+    @param hasRawPayload: True if every byte that follows should be passed to our handler as a single argument
+    """
+    def __init__(self, commandName, handler=None, requiresPlayerStation=False, payloadFormat="", hasRawPayload=False):
+        self.commandName = commandName
+        self.handler = handler
+        self.requiresPlayerStation = requiresPlayerStation
+        self.hasRawPayload = hasRawPayload
+        if requiresPlayerStation:
+            payloadFormat = "I" + payloadFormat
+        self.argumentStruct = struct.Struct('>' + payloadFormat)#Compiled once so that decoding a packet is a single unpack
+        self.minimumLength = 1 + self.argumentStruct.size
+        return
+
+    """
+    Decodes the packet that was received into the arguments that will be passed to our handler
+
+    @type eventMessage: bytes
+    @param eventMessage: packet in the form [command, playerStationHash(optional), data...]. This must be at least minimumLength bytes long
+
+    @rtype: tuple
+    """
+    def decode_arguments(self, eventMessage):
+        arguments = self.argumentStruct.unpack_from(eventMessage, 1)
+        if self.hasRawPayload:
+            return arguments + (eventMessage[self.minimumLength:],)
+        return arguments
+
+
+"""
+Every command that is passed between our device manager and Unity. Used to dispatch the commands that we receive and to translate our packets
+NOTE: PRINTER_REPRINT_TICKET does not have a handler, as reprints are not currently supported by our Unity application
+"""
+UNITY_COMMAND_REGISTRY = {
+    #General Commands
+    DragonMasterDeviceManager.STATUS_FROM_UNITY : UnityCommand("STATUS", DragonMasterDeviceManager.on_status_from_unity),
+    DragonMasterDeviceManager.DEVICE_CONNECTED : UnityCommand("DEVICE_CONNECTED"),
+    DragonMasterDeviceManager.DEVICE_DISCONNECTED : UnityCommand("DEVICE_DISCONNECTED"),
+    DragonMasterDeviceManager.OMNI_EVENT : UnityCommand("OMNI_EVENT", DragonMasterDeviceManager.on_omnidongle_event_received, hasRawPayload=True),
+    DragonMasterDeviceManager.RETRIEVE_CONNECTED_DEVICES : UnityCommand("RETRIEVE_ALL_DEVICES", DragonMasterDeviceManager.on_retrieve_connected_devices),
+    DragonMasterDeviceManager.KILL_APPLICATION_EVENT : UnityCommand("KILL_APPLICATION", DragonMasterDeviceManager.on_kill_application_event),
+    DragonMasterDeviceManager.SEND_DM_VERSION_NUMBER : UnityCommand("DM_VERSION_NUMBER", DragonMasterDeviceManager.on_ignored_unity_command),
+    DragonMasterDeviceManager.SEND_LOCATION_NAME : UnityCommand("LOCATION_NAME", DragonMasterDeviceManager.on_ignored_unity_command),
+    DragonMasterDeviceManager.SEND_MACHINE_NUMBER : UnityCommand("MACHINE_NUMBER", DragonMasterDeviceManager.on_ignored_unity_command),
+    DragonMasterDeviceManager.BATCH_STATION_EVENT : UnityCommand("BATCH_STATION", DragonMasterDeviceManager.on_batch_station_event, hasRawPayload=True),
+
+    #Drax Commands
+    DragonMasterDeviceManager.DRAX_INPUT_EVENT : UnityCommand("DRAX_INPUT"),
+    DragonMasterDeviceManager.DRAX_OUTPUT_EVENT : UnityCommand("DRAX_OUTPUT", DragonMasterDeviceManager.on_drax_output_event, True, "H"),
+    DragonMasterDeviceManager.DRAX_OUTPUT_BIT_ENABLE_EVENT : UnityCommand("DRAX_BIT_ENABLE", DragonMasterDeviceManager.on_drax_output_bit_enable_event, True, "H"),
+    DragonMasterDeviceManager.DRAX_OUTPUT_BIT_DISABLE_EVENT : UnityCommand("DRAX_BIT_DISABLE", DragonMasterDeviceManager.on_drax_output_bit_disable_event, True, "H"),
+    DragonMasterDeviceManager.DRAX_HARD_METER_EVENT : UnityCommand("DRAX_HARD_METER", DragonMasterDeviceManager.on_drax_hard_meter_event, True, "BH"),
+
+    #Joystick Commands
+    DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT : UnityCommand("JOYSTICK_AXIS"),
+
+    #Printer Commands
+    DragonMasterDeviceManager.PRINTER_CASHOUT_TICKET : UnityCommand("PRINT_CASHOUT", DragonMasterDeviceManager.on_print_cashout_ticket_event, True, hasRawPayload=True),
+    DragonMasterDeviceManager.PRINTER_AUDIT_TICKET : UnityCommand("PRINT_AUDIT", DragonMasterDeviceManager.on_print_audit_ticket_event, True, hasRawPayload=True),
+    DragonMasterDeviceManager.PRINTER_CODEX_TICKET : UnityCommand("PRINT_CODEX", DragonMasterDeviceManager.on_print_codex_ticket_event, True, hasRawPayload=True),
+    DragonMasterDeviceManager.PRINTER_TEST_TICKET : UnityCommand("PRINT_TEST", DragonMasterDeviceManager.on_print_test_ticket_event, True),
+    DragonMasterDeviceManager.PRINTER_REPRINT_TICKET : UnityCommand("PRINT_REPRINT"),
+    DragonMasterDeviceManager.PRINT_COMPLETE_EVENT : UnityCommand("PRINT_COMPLETE"),
+    DragonMasterDeviceManager.PRINT_ERROR_EVENT : UnityCommand("PRINT_ERROR_DURING_PRINT"),
+    DragonMasterDeviceManager.PRINTER_STATE_EVENT : UnityCommand("PRINT_STATE", DragonMasterDeviceManager.on_printer_state_request, True),
+
+    #Bill Acceptor Commands
+    DragonMasterDeviceManager.BA_BILL_INSERTED_EVENT : UnityCommand("BA_BILL_INSERT"),
+    DragonMasterDeviceManager.BA_BILL_ACCEPTED_EVENT : UnityCommand("BA_BILL_ACCEPTED"),
+    DragonMasterDeviceManager.BA_BILL_REJECTED_EVENT : UnityCommand("BA_BILL_REJECTED"),
+    DragonMasterDeviceManager.BA_BILL_RETURNED_EVENT : UnityCommand("BA_BILL_RETURNED"),
+    DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT : UnityCommand("BA_BILL_STATE", DragonMasterDeviceManager.on_ba_request_state_event, True),
+    DragonMasterDeviceManager.BA_ACCEPT_BILL_EVENT : UnityCommand("BA_ACCEPT_BILL", DragonMasterDeviceManager.on_ba_stack_bill_event, True),
+    DragonMasterDeviceManager.BA_REJECT_BILL_EVENT : UnityCommand("BA_REJECT_BILL", DragonMasterDeviceManager.on_ba_reject_bill_event, True),
+    DragonMasterDeviceManager.BA_IDLE_EVENT : UnityCommand("BA_IDLE", DragonMasterDeviceManager.on_ba_idle_event, True),
+    DragonMasterDeviceManager.BA_INHIBIT_EVENT : UnityCommand("BA_INHIBIT", DragonMasterDeviceManager.on_ba_inhibit_event, True),
+    DragonMasterDeviceManager.BA_RESET_EVENT : UnityCommand("BA_RESET", DragonMasterDeviceManager.on_ba_reset_event, True),
+}
+        
+
+#endregion helper classes
+
+
+#######################################################################################################################################################
+"""
+Class that handles all of our TCP communication. This will send and receive packets between our Unity application
+
+Note: Packets should be sent in the form of [Function, playerStationID, Data.....]
+"""
+class TCPManager:
+    MAX_THREADING_COUNT = 500
+    HOST_ADDRESS = "127.0.0.1"
+    SEND_PORT = 25001
+    RECEIVE_PORT = 35001
+
+    MAX_RECV_BUFFER = 1024
+
+    #When set to true, each direction will use one long lived connection that is only reconnected upon failure, rather than reconnecting for every send/receive.
+    #NOTE: Our Unity application must also be set to use persistent connections, as it will no longer be able to use the closed socket to mark the end of a message
+    USE_PERSISTENT_CONNECTION = False
+    PERSISTENT_SEND_INTERVAL = .01 #Seconds to wait between flushing our event queue over a persistent connection
+    PERSISTENT_RECONNECT_DELAY = .5 #Seconds to wait before attempting to reestablish a persistent connection that has failed
+
+    #When set to true our device manager will use the AsyncTCPManager, which runs both directions on one asyncio event loop rather than two threads
+    #NOTE: The asyncio engine always uses persistent connections
+    USE_ASYNCIO_ENGINE = False
+
+    #Since Unity and our device manager always run on the same cabinet, we can set this to true to talk to Unity through unix domain sockets
+    #rather than loopback TCP. This also means that we no longer need to open our ports in the firewall
+    USE_UNIX_SOCKET = False
+    UNIX_SOCKET_TYPE = socket.SOCK_STREAM #socket.SOCK_SEQPACKET may also be used. Each send from Unity will then be received as one complete message
+    UNIX_SEND_SOCKET_PATH = "/tmp/DragonMasterDeviceManagerSend.sock" #Path that we listen on to send events to Unity. Replaces SEND_PORT
+    UNIX_RECEIVE_SOCKET_PATH = "/tmp/DragonMasterDeviceManagerReceive.sock" #Path that Unity listens on to send events to us. Replaces RECEIVE_PORT
+    MAX_SEQPACKET_SIZE = 65536 #When using SOCK_SEQPACKET, any message larger than our receive buffer would be cut off, so we read using this size instead
+
+    MAX_EVENTS_PER_FLUSH = 256 #The max number of events that we will send in a single frame. This keeps our first frame small after Unity reconnects
+
+    #When set to true along with USE_PERSISTENT_CONNECTION, our send thread will be woken up as soon as an event is queued rather than waiting
+    #for PERSISTENT_SEND_INTERVAL to pass. Our asyncio engine always sends this way
+    USE_PUSH_MODE = False
+    PUSH_BATCH_WINDOW_MICROSECONDS = 0 #After being woken up, we will wait this long to collect any other events that are queued right behind the first
+
+    RECEIVE_SELECT_TIMEOUT = .5 #Max seconds that our receive threads will wait for data before checking if our application has been killed
+    RECEIVE_RETRY_DELAY = 1.0 / 30.0 #Seconds to wait before reconnecting if Unity did not have any events for us
+
+    def __init__(self, deviceManager):
+        self.sendingEventsToOurUnityApplication = False
+        self.tcpEventQueue = TCPEventQueue()#Queue of events that we want to send to Unity
+        self.frameEncoder = TCPFrameEncoder()#Reusable buffer that we write our queued events into before sending them to Unity
+        self.frameDecoder = TCPFrameDecoder()#Reusable buffer that we read the events sent from Unity into
+        self.frameEnqueueTimes = []#The times that each event in our current frame was queued
+        self.frameTraceEntries = []#(eventType, serialReadTime) of each event in our current frame. Only filled while latency tracing is enabled
+        self.frameFlushTime = 0#The time that our current frame was collected from our event queue
+        self.enqueueToWireLatency = LatencyHistogram()#Time between an event being queued and it being written to our socket
+        self.receiveToDispatchLatency = LatencyHistogram()#Time between an event's bytes being ready on our socket and it being processed. On our reconnecting receive thread this includes the time spent waiting to reconnect
+        self.partialEventReadyTime = None#The time that the partial event at the end of our frame decoder became ready to read. None if there is no partial event
+        self.deviceManager = deviceManager
+
+        self.start_socket_threads()
+        
+
+
+    """
+    Starts the threads that will send and receive events between our device manager and our Unity application
+    """
+    def start_socket_threads(self):
+        if TCPManager.USE_PERSISTENT_CONNECTION:
+            self.start_persistent_socket_threads()
+        else:
+            self.start_new_socket_receive_thread()
+            self.start_new_socket_send_thread()
+        return
+
+
+    """
+    This enqueues an event to send to our unity application
+
+    @type messageToQueueForSend: bytes
+    @param messageToQueuForSend: This is the byte packet that we want to enqueue and deliver to Unity as soon as possible
+
+    @type serialReadTime: int
+    @param serialReadTime: The time.perf_counter_ns() value from when the bytes that created this event were read. None if unknown
+    """
+    def add_event_to_send(self, messageToQueueForSend, serialReadTime = None):
+        if messageToQueueForSend == None:
+            print("message to send was none... what happened")
+            return
+        self.tcpEventQueue.put(messageToQueueForSend, serialReadTime)
+        return
+
+    #region socket creation
+    """
+    Creates the socket that our Unity application will connect to in order to receive our events. This will be a unix domain socket
+    if USE_UNIX_SOCKET is set, otherwise we will listen on SEND_PORT
+
+    @rtype: socket
+    @returns: A socket that is already bound and listening for a connection
+    """
+    def create_send_listener_socket(self):
+        if TCPManager.USE_UNIX_SOCKET:
+            if os.path.exists(TCPManager.UNIX_SEND_SOCKET_PATH):
+                os.unlink(TCPManager.UNIX_SEND_SOCKET_PATH)#Remove the socket file that was left over from our last connection
+            socketSend = socket.socket(socket.AF_UNIX, TCPManager.UNIX_SOCKET_TYPE)
+            socketSend.bind(TCPManager.UNIX_SEND_SOCKET_PATH)
+        else:
+            socketSend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            socketSend.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            socketSend.bind((TCPManager.HOST_ADDRESS, TCPManager.SEND_PORT))
+        socketSend.listen(1)
+        return socketSend
+
+    """
+    Creates the socket that we will use to connect to our Unity application and receive its events
+    """
+    def create_receive_socket(self):
+        if TCPManager.USE_UNIX_SOCKET:
+            return socket.socket(socket.AF_UNIX, TCPManager.UNIX_SOCKET_TYPE)
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    """
+    Returns the address that our receive socket should connect to
+    """
+    def get_receive_address(self):
+        if TCPManager.USE_UNIX_SOCKET:
+            return TCPManager.UNIX_RECEIVE_SOCKET_PATH
+        return (TCPManager.HOST_ADDRESS, TCPManager.RECEIVE_PORT)
+
+    """
+    Returns the number of bytes that we should request for each read from our receive socket
+    """
+    def get_receive_buffer_size(self):
+        if TCPManager.USE_UNIX_SOCKET and TCPManager.UNIX_SOCKET_TYPE == socket.SOCK_SEQPACKET:
+            return TCPManager.MAX_SEQPACKET_SIZE
+        return TCPManager.MAX_RECV_BUFFER
+
+    """
+    We send many small packets through our persistent connections. For TCP we do not want them to be held back by Nagle's algorithm.
+    Unix domain sockets do not need this
+    """
+    def set_low_latency_socket_options(self, connectedSocket):
+        if connectedSocket.family == socket.AF_INET:
+            connectedSocket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return
+    #endregion socket creation
+
+    """
+    Start a new instance of a socket thread that will send data to our Unity Application
+    """
+    def start_new_socket_send_thread(self):
+        sendThread = threading.Thread(target=self.socket_send)
+        sendThread.daemon = True
+        sendThread.start()
+        return
+
+    """
+    Start a new instance of a socket thread that will receive data from our unity application
+    """
+    def start_new_socket_receive_thread(self):
+        receiveThread = threading.Thread(target=self.socket_receive)
+        receiveThread.daemon = True
+        receiveThread.start()
+        return
+
+    """
+    Starts the send and receive threads for our persistent connection mode. Unlike our normal socket threads, these threads
+    are never restarted. They simply reconnect whenever their connection fails
+    """
+    def start_persistent_socket_threads(self):
+        sendThread = threading.Thread(target=self.persistent_socket_send)
+        sendThread.daemon = True
+        sendThread.start()
+
+        receiveThread = threading.Thread(target=self.persistent_socket_receive)
+        receiveThread.daemon = True
+        receiveThread.start()
+        return
+
+
+    """
+    This method sends all of the events that are currently in our event queue to our
+    Unity Application
+
+    Keep in mind that this method will append a byte at the beginning of the packet so that Unity can appropriately read the size of the packet
+
+    NOTE: Adding the size should only be done in this step, You should enque packets as you would like Unity to read them, the size packets will be stripped
+    once our Unity application has appropriately read them
+    For example [0x01, 0x03] would indicate that an omnidongle device was connected
+    Python sends the packets as [0x02, 0x01, 0x03] to say that there are two bytes to read for this packet
+    Unity side will take this information and strip the 0x02 when processing the packet. So unity will see it as [0x01, 0x03]
+    """
+    def socket_send(self):
+        
+        totalCount = 0
+        
+        while (totalCount < TCPManager.MAX_THREADING_COUNT):
+            try:
+                socketSend = self.create_send_listener_socket()
+                conn, addr = socketSend.accept()
+
+                if DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                    #Messages will not be sent if application is queued to end
+                    print ("Killing Send thread due to Kill Application Event")
+                    return
+                
+                if conn != None:
+                    convertedByteArrayToSend = self.get_all_queued_events_as_bytes()
+                    
+                    conn.send(convertedByteArrayToSend)
+                    self.record_frame_sent()
+                    conn.close()
+
+                    self.deviceManager.check_for_joystick_events()#Potentially we might want to look into some other form of sending joystick events...
+                socketSend.close()
+            except Exception as e:
+                print ("Error for socket send")
+                print (e)
+                if socketSend != None:
+                    socketSend.close()
+
+            # sleep(.01)
+            totalCount += 1
+            pass
+        socketSend.close()
+        self.start_new_socket_send_thread()
+        return
+
+
+    """
+    Sends the events in our event queue to our Unity application over one long lived connection. The connection is only
+    reestablished if it fails or Unity closes it. Events are sent with the same size prefixed packets that are used in socket_send,
+    so Unity should read each event using its size byte rather than reading until the socket is closed
+    """
+    def persistent_socket_send(self):
+        socketSend = None
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            conn = None
+            try:
+                if socketSend == None:
+                    socketSend = self.create_send_listener_socket()
+                conn, addr = socketSend.accept()
+                self.set_low_latency_socket_options(conn)
+
+                while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                    if self.persistent_connection_was_closed(conn):
+                        print ("Unity closed our persistent send connection")
+                        break
+                    convertedByteArrayToSend = self.get_all_queued_events_as_bytes()
+                    if len(convertedByteArrayToSend) > 0:
+                        conn.sendall(convertedByteArrayToSend)
+                        self.record_frame_sent()
+
+                    self.deviceManager.check_for_joystick_events()
+                    if TCPManager.USE_PUSH_MODE:
+                        self.wait_for_event_to_push()
+                    else:
+                        sleep(TCPManager.PERSISTENT_SEND_INTERVAL)
+            except Exception as e:
+                print ("Error for persistent socket send")
+                print (e)
+                if socketSend != None:
+                    socketSend.close()
+                    socketSend = None
+
+            if conn != None:
+                conn.close()
+            if not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                sleep(TCPManager.PERSISTENT_RECONNECT_DELAY)
+
+        if socketSend != None:
+            socketSend.close()
+        print ("Killing Persistent Send thread due to Kill Application Event")
+        return
+
+    """
+    Waits until an event has been queued so that it can be pushed to Unity right away. We will still wake up after PERSISTENT_SEND_INTERVAL
+    so that our joystick axes continue to be collected
+    """
+    def wait_for_event_to_push(self):
+        if self.tcpEventQueue.wait_for_event(TCPManager.PERSISTENT_SEND_INTERVAL) and TCPManager.PUSH_BATCH_WINDOW_MICROSECONDS > 0:
+            sleep(TCPManager.PUSH_BATCH_WINDOW_MICROSECONDS / 1000000.0)
+        return
+
+    """
+    Unity never sends anything over our send connection, so if the connection is ever readable it means that
+    Unity has closed it (a read will return 0 bytes).
+
+    @type conn: socket
+    @param conn: The persistent connection that we are sending events through
+    """
+    def persistent_connection_was_closed(self, conn):
+        readableSockets, writableSockets, erroredSockets = select.select([conn], [], [], 0)
+        if len(readableSockets) == 0:
+            return False
+        return len(conn.recv(TCPManager.MAX_RECV_BUFFER)) == 0
+
+    """
+    Receives events from our Unity application over one long lived connection. Events are processed as soon as their full
+    packet has been read in. Any partial packet that is left over in our frame decoder will be completed by the next read
+    """
+    def persistent_socket_receive(self):
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            socketRead = None
+            try:
+                socketRead = self.create_receive_socket()
+                socketRead.connect(self.get_receive_address())
+                self.set_low_latency_socket_options(socketRead)
+
+                self.receive_events_until_closed(socketRead)
+            except Exception as e:
+                pass#We will fail to connect any time our Unity application is not running. We will simply try again
+            
+            if socketRead != None:
+                socketRead.close()
+            sleep(TCPManager.PERSISTENT_RECONNECT_DELAY)
+        return
+
+    """
+    This method will be called to receive 
+
+    Similar to what was mentioned in the send function, when processing the received packets we will strip the size bytes before processing 
+    our packets through the DeviceManager. 
+    NOTE: As opposed to the above formula where we only append one byte to the beginning of our packet to indicate the size, Unity events contain 2 bytes at the start
+    due to Unity events (particularly printer events) can exceed 256 bytes. 
+    """
+    def socket_receive(self):
+        totalCount = 0
+        buff = None
+        retryWaitStartTime = None#Events that Unity queued while we were waiting to reconnect have been waiting on us since this time
+        while (totalCount < TCPManager.MAX_THREADING_COUNT):
+            eventsReceived = False
+            try:
+                socketRead = self.create_receive_socket()
+
+                socketRead.connect(self.get_receive_address())
+                
+                #Rather than waiting for Unity to close the connection before processing anything, each event is processed as soon as its packet is complete
+                eventsReceived = self.receive_events_until_closed(socketRead, retryWaitStartTime)
+                socketRead.close()
+            except Exception as e:
+                socketRead.close()
+            
+            if eventsReceived:
+                retryWaitStartTime = None
+            else:
+                retryWaitStartTime = time.perf_counter_ns()
+                sleep(TCPManager.RECEIVE_RETRY_DELAY)#Unity had nothing to send us. If it did, we reconnect right away as it may have more queued up
+            totalCount += 1
+            pass
+
+        socketRead.close()
+        self.start_new_socket_receive_thread()
+        return
+
+    """
+    Waits on our connected receive socket and processes each event as soon as its bytes arrive. Returns once Unity closes the connection
+    or our application has been killed
+
+    @type socketRead: socket
+    @param socketRead: socket that is connected to our Unity application
+
+    @type retryWaitStartTime: int
+    @param retryWaitStartTime: The time.perf_counter_ns() value from when we began waiting to reconnect. The first data that we read is measured
+    from this time, as Unity may have queued it at any point while we were not connected. None if we did not wait
+
+    @rtype: bool
+    @returns: True if we received any data from Unity
+    """
+    def receive_events_until_closed(self, socketRead, retryWaitStartTime = None):
+        eventsReceived = False
+        receiveBufferSize = self.get_receive_buffer_size()
+        self.frameDecoder.reset()
+        self.partialEventReadyTime = None
+        socketRead.setblocking(False)
+        receiveSelector = selectors.DefaultSelector()
+        receiveSelector.register(socketRead, selectors.EVENT_READ)
+        try:
+            while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                if len(receiveSelector.select(TCPManager.RECEIVE_SELECT_TIMEOUT)) == 0:
+                    continue
+                readyTime = time.perf_counter_ns()
+                try:
+                    bytesReceived = socketRead.recv_into(self.frameDecoder.get_read_buffer(receiveBufferSize))
+                except BlockingIOError:
+                    continue
+                if bytesReceived == 0:
+                    break#Unity has closed our connection
+                if not eventsReceived and retryWaitStartTime != None:
+                    readyTime = retryWaitStartTime
+                eventsReceived = True
+                self.dispatch_received_bytes(bytesReceived, readyTime)
+        finally:
+            receiveSelector.close()
+        return eventsReceived
+
+    """
+    Processes every event that has been completed by the bytes that were just read into our frame decoder, recording how long
+    each event waited between its bytes being ready on our socket and being dispatched. An event that was split between reads is
+    measured from when its first bytes were ready
+
+    @type bytesReceived: int
+    @param bytesReceived: The number of bytes that were read into the buffer returned by our frame decoder
+
+    @type readyTime: int
+    @param readyTime: The time.perf_counter_ns() value from when our socket was reported as readable
+    """
+    def dispatch_received_bytes(self, bytesReceived, readyTime):
+        if LatencyTracer.TRACING_ENABLED:
+            LATENCY_TRACER.set_dispatch_thread()
+        eventReadyTime = readyTime if self.partialEventReadyTime == None else self.partialEventReadyTime
+        for event in self.frameDecoder.decode_received_bytes(bytesReceived):
+            self.receiveToDispatchLatency.record_since(eventReadyTime)
+            eventReadyTime = readyTime#Every event after the first began in this read
+            self.deviceManager.execute_all_events_processed_from_tcp((event,))
+        if self.frameDecoder.dataEnd > self.frameDecoder.dataStart:
+            self.partialEventReadyTime = eventReadyTime
+        else:
+            self.partialEventReadyTime = None
+        return
+
+    """
+    Collects the events that are currently in our event queue and returns them as one frame that is ready to be sent to Unity.
+    Each event will be prefixed with a byte that contains the size of the event. At most MAX_EVENTS_PER_FLUSH events are collected,
+    any remaining events will be sent in the next frame
+
+    NOTE: The frame that is returned points into our frame encoder's buffer. It should be sent before the next time this method is called
+
+    @rtype: memoryview
+    @returns: All of our queued events in the form [size, event..., size, event...]
+    """
+    def get_all_queued_events_as_bytes(self):
+        self.frameEncoder.reset()
+        self.frameEnqueueTimes.clear()
+        self.frameTraceEntries.clear()
+        self.frameFlushTime = time.perf_counter_ns()
+        eventsAdded = 0
+        while not self.tcpEventQueue.empty() and eventsAdded < TCPManager.MAX_EVENTS_PER_FLUSH:
+            eventToAdd, enqueueTime, serialReadTime = self.tcpEventQueue.get_event_and_trace_times()
+            self.frameEnqueueTimes.append(enqueueTime)
+            if LatencyTracer.TRACING_ENABLED and len(eventToAdd) > 0:
+                LATENCY_TRACER.record(LatencyTracer.ENQUEUE_TO_FLUSH, eventToAdd[0], enqueueTime, self.frameFlushTime)
+                self.frameTraceEntries.append((eventToAdd[0], serialReadTime))
+            eventsAdded += 1
+            self.frameEncoder.add_event(eventToAdd)
+            
+            if (DragonMasterDeviceManager.DEBUG_PRINT_EVENTS_SENT_TO_UNITY):
+                print ("MSGOUT: " + str(eventToAdd))
+            
+        return self.frameEncoder.get_frame()
+
+    """
+    Should be called once the frame returned by get_all_queued_events_as_bytes has been written to our socket. Records how long each event
+    in the frame waited between being queued and being sent
+    """
+    def record_frame_sent(self):
+        sentTime = time.perf_counter_ns()
+        for enqueueTime in self.frameEnqueueTimes:
+            self.enqueueToWireLatency.record((sentTime - enqueueTime) // 1000)
+        self.frameEnqueueTimes.clear()
+        for eventType, serialReadTime in self.frameTraceEntries:
+            LATENCY_TRACER.record(LatencyTracer.FLUSH_TO_WIRE, eventType, self.frameFlushTime, sentTime)
+            if serialReadTime != None:
+                LATENCY_TRACER.record(LatencyTracer.SERIAL_READ_TO_WIRE, eventType, serialReadTime, sentTime)
+        self.frameTraceEntries.clear()
+        return
+
+
+"""
+Alternative to our TCPManager that runs both our send and receive connections on a single asyncio event loop, rather than two threads
+that are restarted every MAX_THREADING_COUNT iterations. Sockets are non-blocking, and the send task is woken as soon as a new event is queued.
+
+Device threads hand events to this class through add_event_to_send, and commands from Unity are handed to our devices through each
+device's own event queue, so nothing outside of this class ever runs on the event loop thread except for the processing of received commands
+
+NOTE: This engine always uses persistent connections. Our Unity application must be set to read events by their size byte.
+"""
+class AsyncTCPManager(TCPManager):
+
+    """
+    Creates our event loop and starts the thread that it will run on
+    """
+    def start_socket_threads(self):
+        self.eventLoop = asyncio.new_event_loop()
+        self.eventQueuedSignal = None#asyncio.Event that is set whenever a new event is queued. This is created on our event loop thread
+        self.sendTaskWakeScheduled = False
+
+        eventLoopThread = threading.Thread(target=self.run_event_loop)
+        eventLoopThread.daemon = True
+        eventLoopThread.start()
+        return
+
+    """
+    Runs our send and receive tasks until the application is killed
+    """
+    def run_event_loop(self):
+        asyncio.set_event_loop(self.eventLoop)
+        self.eventQueuedSignal = asyncio.Event()
+        try:
+            self.eventLoop.run_until_complete(asyncio.gather(self.async_socket_send(), self.async_socket_receive()))
+        except Exception as e:
+            print ("Our TCP event loop has stopped unexpectedly")
+            print (e)
+        return
+
+    """
+    Queues up an event to send to Unity and wakes up our send task. This is safe to call from any thread
+
+    @type messageToQueueForSend: bytes
+    @param messageToQueuForSend: This is the byte packet that we want to enqueue and deliver to Unity as soon as possible
+    """
+    def add_event_to_send(self, messageToQueueForSend, serialReadTime = None):
+        TCPManager.add_event_to_send(self, messageToQueueForSend, serialReadTime)
+        if not self.sendTaskWakeScheduled:#No need to wake the loop again if there is already a wake up waiting to be processed
+            self.sendTaskWakeScheduled = True
+            self.eventLoop.call_soon_threadsafe(self.wake_send_task)
+        return
+
+    """
+    Runs on our event loop thread to let our send task know that there are events ready to send
+    """
+    def wake_send_task(self):
+        self.sendTaskWakeScheduled = False
+        self.eventQueuedSignal.set()
+        return
+
+    """
+    Accepts a connection from our Unity application and sends events through it as soon as they are queued. We will still
+    wake up every PERSISTENT_SEND_INTERVAL to collect any updated joystick axes
+    """
+    async def async_socket_send(self):
+        socketSend = None
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            conn = None
+            try:
+                if socketSend == None:
+                    socketSend = self.create_send_listener_socket()
+                    socketSend.setblocking(False)
+                conn, addr = await self.eventLoop.sock_accept(socketSend)
+                conn.setblocking(False)
+                self.set_low_latency_socket_options(conn)
+
+                while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                    if self.persistent_connection_was_closed(conn):
+                        print ("Unity closed our persistent send connection")
+                        break
+                    self.deviceManager.check_for_joystick_events()
+                    self.eventQueuedSignal.clear()#Cleared before we collect our events, so that any event queued after this point will wake us back up
+                    convertedByteArrayToSend = self.get_all_queued_events_as_bytes()
+                    if len(convertedByteArrayToSend) > 0:
+                        await self.eventLoop.sock_sendall(conn, convertedByteArrayToSend)
+                        self.record_frame_sent()
+
+                    try:
+                        await asyncio.wait_for(self.eventQueuedSignal.wait(), TCPManager.PERSISTENT_SEND_INTERVAL)
+                        if TCPManager.PUSH_BATCH_WINDOW_MICROSECONDS > 0:
+                            await asyncio.sleep(TCPManager.PUSH_BATCH_WINDOW_MICROSECONDS / 1000000.0)
+                    except asyncio.TimeoutError:
+                        pass
+            except Exception as e:
+                print ("Error for async socket send")
+                print (e)
+                if socketSend != None:
+                    socketSend.close()
+                    socketSend = None
+
+            if conn != None:
+                conn.close()
+            if not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                await asyncio.sleep(TCPManager.PERSISTENT_RECONNECT_DELAY)
+
+        if socketSend != None:
+            socketSend.close()
+        print ("Killing Async Send task due to Kill Application Event")
+        return
+
+    """
+    Connects to our Unity application and processes each event as soon as its full packet has been received
+    """
+    async def async_socket_receive(self):
+        while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+            socketRead = None
+            try:
+                socketRead = self.create_receive_socket()
+                socketRead.setblocking(False)
+                await self.eventLoop.sock_connect(socketRead, self.get_receive_address())
+                self.set_low_latency_socket_options(socketRead)
+
+                receiveBufferSize = self.get_receive_buffer_size()
+                self.frameDecoder.reset()
+                self.partialEventReadyTime = None
+                readyTime = None
+                while not DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
+                    if readyTime == None:
+                        readyTime = time.perf_counter_ns()#Data that is already waiting was ready by the time that we looked for it
+                    try:
+                        bytesReceived = socketRead.recv_into(self.frameDecoder.get_read_buffer(receiveBufferSize))
+                    except BlockingIOError:
+                        readyTime = await self.wait_until_socket_is_readable(socketRead)
+                        continue
+                    if bytesReceived == 0:
+                        break#Unity has closed our connection
+                    self.dispatch_received_bytes(bytesReceived, readyTime)
+                    readyTime = None
+            except Exception as e:
+                pass#We will fail to connect any time our Unity application is not running. We will simply try again
+
+            if socketRead != None:
+                socketRead.close()
+            await asyncio.sleep(TCPManager.PERSISTENT_RECONNECT_DELAY)
+        return
+
+    """
+    Waits until our event loop reports that data can be read from our socket
+
+    @type socketRead: socket
+    @param socketRead: A non blocking socket
+
+    @rtype: int
+    @returns: The time.perf_counter_ns() value from when our socket became readable
+    """
+    async def wait_until_socket_is_readable(self, socketRead):
+        readableFuture = self.eventLoop.create_future()
+        def on_socket_readable():
+            if not readableFuture.done():
+                readableFuture.set_result(time.perf_counter_ns())
+            return
+        socketFileNumber = socketRead.fileno()
+        self.eventLoop.add_reader(socketFileNumber, on_socket_readable)
+        try:
+            return await readableFuture
+        finally:
+            self.eventLoop.remove_reader(socketFileNumber)
+
+
+"""
+Queue of the events that we will send to our Unity application. This can be used in place of a queue.Queue.
+
+Events are separated into priority lanes so that events involving money, such as a bill being accepted or a ticket being printed, are never
+held back behind a large number of joystick or device state updates. Each time we collect events, every event in a higher priority lane is
+returned before any event in a lower priority lane. Events within the same lane are always returned in the order that they were queued.
+Unity must never receive an event from a device before it has been told that the device was connected, so while a device has a connected or
+disconnected event waiting in our lifecycle lane, its transaction events are queued behind it in the lifecycle lane instead of jumping ahead.
+
+Many of the events that we send only report the current state of a device. If Unity has not collected our events yet, there is no reason
+to send it every state that a device has passed through. When a new state event is queued, any older event of the same type for the
+same player station that is still waiting to be sent is removed, and the new event is added to the end of its lane. All other events,
+such as a bill being inserted or a print completing, are always kept.
+
+Each lane holds at most LANE_MAX_DEPTHS events in memory, so our memory stays flat if Unity stops collecting events. When a lane is full
+we will follow the overflow policy of that lane. Telemetry simply drops its oldest event, as a newer input has already been queued. Events
+that involve money are never dropped. They are written to a spill file instead and are sent once the events in front of them have been sent.
+"""
+class TCPEventQueue:
+    #Set this to false to send every event to Unity, even if it has been replaced by a newer state
+    COALESCE_STATE_EVENTS = True
+
+    #Event types where only the most recent event for each player station needs to be sent
+    COALESCED_EVENT_TYPES = frozenset([
+        DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT,
+        DragonMasterDeviceManager.PRINTER_STATE_EVENT,
+        DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT,
+    ])
+
+    #region priority lanes
+    TRANSACTION_PRIORITY = 0#Events that involve money. These should reach Unity as soon as possible
+    LIFECYCLE_PRIORITY = 1#Devices connecting, disconnecting or changing state
+    TELEMETRY_PRIORITY = 2#Input from our players that is sent very frequently
+
+    PRIORITY_NAMES = ["transaction", "lifecycle", "telemetry"]
+
+    #Any event type that is not found here will be sent in our lifecycle lane
+    EVENT_PRIORITIES = {
+        DragonMasterDeviceManager.BA_BILL_INSERTED_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.BA_BILL_ACCEPTED_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.BA_BILL_REJECTED_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.BA_BILL_RETURNED_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.PRINT_COMPLETE_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.PRINT_ERROR_EVENT : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.DRAX_METER_ERROR : TRANSACTION_PRIORITY,
+        DragonMasterDeviceManager.OMNI_EVENT : TRANSACTION_PRIORITY,
+
+        DragonMasterDeviceManager.DEVICE_CONNECTED : LIFECYCLE_PRIORITY,
+        DragonMasterDeviceManager.DEVICE_DISCONNECTED : LIFECYCLE_PRIORITY,
+        DragonMasterDeviceManager.DRAX_STATUS_EVENT : LIFECYCLE_PRIORITY,
+        DragonMasterDeviceManager.PRINTER_STATE_EVENT : LIFECYCLE_PRIORITY,
+        DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT : LIFECYCLE_PRIORITY,
+
+        DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT : TELEMETRY_PRIORITY,
+        DragonMasterDeviceManager.DRAX_INPUT_EVENT : TELEMETRY_PRIORITY,
+    }
+
+    #Lifecycle events that announce a device to Unity. Transaction events from a device are held behind these until they have been sent
+    DEVICE_ANNOUNCEMENT_EVENT_TYPES = frozenset([
+        DragonMasterDeviceManager.DEVICE_CONNECTED,
+        DragonMasterDeviceManager.DEVICE_DISCONNECTED,
+    ])
+    #endregion priority lanes
+
+    #region overflow policies
+    DROP_OLDEST_POLICY = 0#The oldest event in the lane is thrown away to make room for the new event
+    BLOCK_POLICY = 1#The thread queueing the event will wait up to BLOCK_TIMEOUT seconds for room in the lane. If there is still no room the event is spilled. The thread that collects our events never waits, as no room would be made
+    SPILL_POLICY = 2#The event is written to our spill file and will be sent after every event in front of it
+
+    LANE_MAX_DEPTHS = [256, 512, 256]#The max number of events that each lane will hold in memory
+    LANE_OVERFLOW_POLICIES = [SPILL_POLICY, BLOCK_POLICY, DROP_OLDEST_POLICY]
+    BLOCK_TIMEOUT = .05
+    SPILL_FILE_DIRECTORY = "/tmp"
+    #endregion overflow policies
+
+    def __init__(self):
+        self.queueLock = threading.Lock()
+        self.eventAvailableCondition = threading.Condition(self.queueLock)
+        self.spaceAvailableCondition = threading.Condition(self.queueLock)#Signaled when an event is removed so that blocked threads can try again
+        #One queue for each priority. Each entry is a list of [event, coalesceKey, priority, enqueueTime, serialReadTime]. Replaced entries have their event set to None
+        self.priorityLanes = [collections.deque() for priority in TCPEventQueue.PRIORITY_NAMES]
+        self.latestStateEntries = {}#coalesceKey -> the most recent entry for that state
+        self.queuedEventCount = 0#Number of entries in our queue that have not been replaced
+        self.laneEventCounts = [0] * len(TCPEventQueue.PRIORITY_NAMES)#Number of events waiting to be sent in each lane
+        self.maxLaneEventCounts = [0] * len(TCPEventQueue.PRIORITY_NAMES)#The highest number of events that have been waiting in each lane
+        self.coalescedEventCount = 0#Total number of events that were removed because a newer state was queued
+        self.droppedEventCounts = [0] * len(TCPEventQueue.PRIORITY_NAMES)#Total number of events that were dropped because their lane was full
+        self.unannouncedDeviceEventCounts = {}#Key: device key | Value: Number of announcements and held back transaction events of that device waiting in our lifecycle lane
+        self.spillFiles = [TCPEventSpillFile(TCPEventQueue.SPILL_FILE_DIRECTORY, "DragonMasterTCPSpill_" + laneName + "_") \
+            for laneName in TCPEventQueue.PRIORITY_NAMES]
+        self.collectingThreadID = None#The thread that last collected events from our queue. This thread must never wait for room in a lane
+        return
+
+    """
+    Returns the priority lane that an event will be queued in
+
+    @type eventToQueue: bytes
+    @param eventToQueue: event in the form [eventType, playerStationHash(4 bytes), data...]
+    """
+    def get_event_priority(self, eventToQueue):
+        if len(eventToQueue) == 0:
+            return TCPEventQueue.LIFECYCLE_PRIORITY
+        return TCPEventQueue.EVENT_PRIORITIES.get(eventToQueue[0], TCPEventQueue.LIFECYCLE_PRIORITY)
+
+    """
+    Returns the key that is used to find older events of the same state. Events that should always be sent will return None
+
+    @type eventToQueue: bytes
+    @param eventToQueue: event in the form [eventType, playerStationHash(4 bytes), data...]
+    """
+    def get_coalesce_key(self, eventToQueue):
+        if not TCPEventQueue.COALESCE_STATE_EVENTS or len(eventToQueue) < 5:
+            return None
+        if eventToQueue[0] not in TCPEventQueue.COALESCED_EVENT_TYPES:
+            return None
+        return (eventToQueue[0], bytes(eventToQueue[1:5]))
+
+    """
+    Returns the key of the device that an event belongs to, which is the device type ID along with its player station hash. Returns None if
+    the event does not tell us which device it came from
+
+    @type eventToQueue: bytes
+    @param eventToQueue: event in the form [eventType, playerStationHash(4 bytes), data...]
+    """
+    def get_device_key(self, eventToQueue):
+        eventType = eventToQueue[0]
+        if eventType in TCPEventQueue.DEVICE_ANNOUNCEMENT_EVENT_TYPES:
+            if len(eventToQueue) < 6:
+                return None
+            deviceTypeID = eventToQueue[5]#The first byte of data in a connected or disconnected event is the device type ID
+        elif eventType == DragonMasterDeviceManager.OMNI_EVENT:
+            deviceTypeID = DragonMasterDeviceManager.OMNI_EVENT
+        else:
+            deviceTypeID = eventType & 0xf0#Our event types are grouped under the ID of the device that sends them
+        if deviceTypeID == DragonMasterDeviceManager.OMNI_EVENT:
+            return (deviceTypeID,)#There is only one omnidongle, and its events do not include a player station hash
+        if len(eventToQueue) < 5:
+            return None
+        return (deviceTypeID, bytes(eventToQueue[1:5]))
+
+    """
+    Returns true if the event must stay in order with the connected and disconnected events of its device. These are our announcements and
+    the transaction events that were held back in our lifecycle lane behind them
+
+    @type eventToQueue: bytes
+    @param eventToQueue: event in the form [eventType, playerStationHash(4 bytes), data...]
+
+    @type priority: int
+    @param priority: The lane that the event was queued in
+    """
+    def is_device_ordered_event(self, eventToQueue, priority):
+        if priority != TCPEventQueue.LIFECYCLE_PRIORITY or len(eventToQueue) == 0:
+            return False
+        return eventToQueue[0] in TCPEventQueue.DEVICE_ANNOUNCEMENT_EVENT_TYPES or \
+            TCPEventQueue.EVENT_PRIORITIES.get(eventToQueue[0]) == TCPEventQueue.TRANSACTION_PRIORITY
+
+    """
+    Adds to or removes from the number of events that are waiting in our lifecycle lane for the device of an event. This must be called
+    while holding our queue lock
+
+    @type deviceEvent: bytes
+    @param deviceEvent: An announcement or held back transaction event
+
+    @type countChange: int
+    @param countChange: 1 when the event is queued, -1 when the event is removed
+    """
+    def update_unannounced_device_count(self, deviceEvent, countChange):
+        deviceKey = self.get_device_key(deviceEvent)
+        if deviceKey == None:
+            return
+        eventCount = self.unannouncedDeviceEventCounts.get(deviceKey, 0) + countChange
+        if eventCount > 0:
+            self.unannouncedDeviceEventCounts[deviceKey] = eventCount
+        else:
+            self.unannouncedDeviceEventCounts.pop(deviceKey, None)
+        return
+
+    """
+    Adds an event to the end of its priority lane. If this is a state event, any older event with the same state that has not been sent is removed.
+    If the lane is full, the overflow policy of the lane will be followed
+
+    @type eventToQueue: bytes
+    @param eventToQueue: The event that we will send to Unity
+
+    @type serialReadTime: int
+    @param serialReadTime: The time.perf_counter_ns() value from when the bytes that created this event were read. None if unknown
+    """
+    def put(self, eventToQueue, serialReadTime = None):
+        coalesceKey = self.get_coalesce_key(eventToQueue)
+        priority = self.get_event_priority(eventToQueue)
+        with self.queueLock:
+            if priority == TCPEventQueue.TRANSACTION_PRIORITY and self.unannouncedDeviceEventCounts and \
+                self.get_device_key(eventToQueue) in self.unannouncedDeviceEventCounts:
+                priority = TCPEventQueue.LIFECYCLE_PRIORITY#Our device has not been announced to Unity yet, so this event waits behind its announcement
+            if self.spillFiles[priority].spilledEventCount > 0:
+                if self.spill_event(eventToQueue, priority, serialReadTime):#Once we have begun spilling, all new events in the lane must be spilled to keep them in order
+                    return
+            elif self.laneEventCounts[priority] >= TCPEventQueue.LANE_MAX_DEPTHS[priority] and coalesceKey not in self.latestStateEntries:
+                overflowPolicy = TCPEventQueue.LANE_OVERFLOW_POLICIES[priority]
+                if overflowPolicy == TCPEventQueue.DROP_OLDEST_POLICY:
+                    self.drop_oldest_event(priority)
+                else:
+                    if overflowPolicy == TCPEventQueue.BLOCK_POLICY and threading.get_ident() != self.collectingThreadID:
+                        self.spaceAvailableCondition.wait_for(lambda: self.laneEventCounts[priority] < TCPEventQueue.LANE_MAX_DEPTHS[priority], \
+                            TCPEventQueue.BLOCK_TIMEOUT)
+                    if self.laneEventCounts[priority] >= TCPEventQueue.LANE_MAX_DEPTHS[priority] or self.spillFiles[priority].spilledEventCount > 0:
+                        if self.spill_event(eventToQueue, priority, serialReadTime):
+                            return
+
+            queuedEntry = [eventToQueue, coalesceKey, priority, time.perf_counter_ns(), serialReadTime]
+            if coalesceKey != None:
+                replacedEntry = self.latestStateEntries.get(coalesceKey)
+                if replacedEntry != None:
+                    replacedEntry[0] = None#The entry is skipped when we reach it in our queue
+                    self.queuedEventCount -= 1
+                    self.laneEventCounts[replacedEntry[2]] -= 1
+                    self.coalescedEventCount += 1
+                self.latestStateEntries[coalesceKey] = queuedEntry
+            self.priorityLanes[priority].append(queuedEntry)
+            self.queuedEventCount += 1
+            self.laneEventCounts[priority] += 1
+            if self.is_device_ordered_event(eventToQueue, priority):
+                self.update_unannounced_device_count(eventToQueue, 1)
+            if self.laneEventCounts[priority] > self.maxLaneEventCounts[priority]:
+                self.maxLaneEventCounts[priority] = self.laneEventCounts[priority]
+            self.eventAvailableCondition.notify()
+        return
+
+    """
+    Removes the oldest event in a lane that has not already been replaced. This must be called while holding our queue lock
+
+    @type priority: int
+    @param priority: The lane that we will remove the event from
+    """
+    def drop_oldest_event(self, priority):
+        priorityLane = self.priorityLanes[priority]
+        while priorityLane:
+            droppedEntry = priorityLane.popleft()
+            if droppedEntry[0] == None:
+                continue
+            if droppedEntry[1] != None:
+                del self.latestStateEntries[droppedEntry[1]]
+            if self.is_device_ordered_event(droppedEntry[0], priority):
+                self.update_unannounced_device_count(droppedEntry[0], -1)
+            self.queuedEventCount -= 1
+            self.laneEventCounts[priority] -= 1
+            self.droppedEventCounts[priority] += 1
+            return
+        return
+
+    """
+    Writes an event to the spill file of its lane. This must be called while holding our queue lock
+
+    If the event could not be written, it is dropped, unless it is a transaction event. We would rather keep a transaction event in memory
+    over the bound of its lane than lose an event that involves money, even though it may be sent ahead of events that were already spilled
+
+    @type eventToQueue: bytes
+    @param eventToQueue: The event that we will send to Unity once every event in front of it has been sent
+
+    @type priority: int
+    @param priority: The lane that the event belongs to
+
+    @type serialReadTime: int
+    @param serialReadTime: The time.perf_counter_ns() value from when the bytes that created this event were read. None if unknown
+
+    @rtype: bool
+    @returns: False if the event could not be spilled and should be kept in memory instead
+    """
+    def spill_event(self, eventToQueue, priority, serialReadTime = None):
+        if not self.spillFiles[priority].write_event(eventToQueue, time.perf_counter_ns(), serialReadTime):
+            if priority == TCPEventQueue.TRANSACTION_PRIORITY:
+                return False
+            self.droppedEventCounts[priority] += 1
+            return True
+        if self.is_device_ordered_event(eventToQueue, priority):
+            self.update_unannounced_device_count(eventToQueue, 1)
+        self.queuedEventCount += 1
+        self.eventAvailableCondition.notify()
+        return True
+
+    """
+    Removes and returns the oldest event in the highest priority lane that has an event waiting
+
+    @type block: bool
+    @param block: If true, we will wait until an event has been queued before returning
+
+    @type timeout: float
+    @param timeout: The max number of seconds to wait for an event when blocking. None will wait forever
+
+    @rtype: bytes
+    @returns: The next event to send. Raises queue.Empty if there was no event to return
+    """
+    def get(self, block=True, timeout=None):
+        return self.get_event_and_enqueue_time(block, timeout)[0]
+
+    """
+    Same as get, but also returns the time that the event was queued
+
+    @rtype: tuple
+    @returns: The next event to send and the time.perf_counter_ns() value from when it was queued
+    """
+    def get_event_and_enqueue_time(self, block=True, timeout=None):
+        return self.get_event_and_trace_times(block, timeout)[:2]
+
+    """
+    Same as get, but also returns the time that the event was queued and the time that the bytes that created it were read
+
+    @rtype: tuple
+    @returns: The next event to send, the time.perf_counter_ns() value from when it was queued and the time.perf_counter_ns() value from
+    when it was read from its device (None if unknown)
     """
-    def start_new_socket_send_thread(self):
-        sendThread = threading.Thread(target=self.socket_send)
-        sendThread.daemon = True
-        sendThread.start()
+    def get_event_and_trace_times(self, block=True, timeout=None):
+        with self.queueLock:
+            self.collectingThreadID = threading.get_ident()
+            if block:
+                if not self.eventAvailableCondition.wait_for(lambda: self.queuedEventCount > 0, timeout):
+                    raise queue.Empty
+            for priority in range(len(self.priorityLanes)):
+                priorityLane = self.priorityLanes[priority]
+                while priorityLane:
+                    queuedEntry = priorityLane.popleft()
+                    if queuedEntry[0] == None:
+                        continue#This state was replaced by a more recent event
+                    if queuedEntry[1] != None:
+                        del self.latestStateEntries[queuedEntry[1]]
+                    if self.unannouncedDeviceEventCounts and self.is_device_ordered_event(queuedEntry[0], priority):
+                        self.update_unannounced_device_count(queuedEntry[0], -1)
+                    self.queuedEventCount -= 1
+                    self.laneEventCounts[priority] -= 1
+                    self.spaceAvailableCondition.notify()
+                    return queuedEntry[0], queuedEntry[3], queuedEntry[4]
+                if self.spillFiles[priority].spilledEventCount > 0:
+                    #Spilled events are always newer than the events that were held in memory, so they are only read once the lane is empty
+                    self.queuedEventCount -= 1
+                    spilledEntry = self.spillFiles[priority].read_event()
+                    if self.unannouncedDeviceEventCounts and self.is_device_ordered_event(spilledEntry[0], priority):
+                        self.update_unannounced_device_count(spilledEntry[0], -1)
+                    return spilledEntry
+            raise queue.Empty
+
+    """
+    Waits until there is at least one event waiting to be sent
+
+    @type timeout: float
+    @param timeout: The max number of seconds that we will wait
+
+    @rtype: bool
+    @returns: True if there is an event waiting to be sent. False if we timed out
+    """
+    def wait_for_event(self, timeout):
+        with self.queueLock:
+            return self.eventAvailableCondition.wait_for(lambda: self.queuedEventCount > 0, timeout)
+
+    """
+    Returns true if there are no events waiting to be sent
+    """
+    def empty(self):
+        return self.queuedEventCount <= 0
+
+    """
+    Returns the number of events that are waiting to be sent
+    """
+    def qsize(self):
+        return self.queuedEventCount
+
+    """
+    Returns a string that displays the number of events waiting in each lane along with our coalesce and drop counts
+    """
+    def to_string(self):
+        statsString = ""
+        for priority in range(len(TCPEventQueue.PRIORITY_NAMES)):
+            statsString += set_string_length_multiple(TCPEventQueue.PRIORITY_NAMES[priority], \
+                "depth: " + str(self.laneEventCounts[priority]) + "  max: " + str(self.maxLaneEventCounts[priority]) + \
+                "  spilled: " + str(self.spillFiles[priority].spilledEventCount) + "  dropped: " + str(self.droppedEventCounts[priority])) + '\n'
+        statsString += set_string_length_multiple("coalesced", str(self.coalescedEventCount))
+        return statsString
+
+"""
+Holds the events that did not fit in a lane of our TCPEventQueue. Events are written to a file, rather than kept in memory, and are read back
+in the same order that they were written. The file is cleared every time all of its events have been read
+
+Each spill file is a new temporary file that is removed as soon as it is closed, so no other queue, in this process or any other, can
+open or truncate the events that we have spilled
+"""
+class TCPEventSpillFile:
+
+    """
+    @type spillFileDirectory: str
+    @param spillFileDirectory: The directory that our temporary file is created in
+
+    @type spillFilePrefix: str
+    @param spillFilePrefix: The start of our temporary file's name
+    """
+    def __init__(self, spillFileDirectory, spillFilePrefix):
+        self.spillFileDirectory = spillFileDirectory
+        self.spillFilePrefix = spillFilePrefix
+        self.spillFile = None#We only create our file the first time an event is spilled
+        self.readOffset = 0
+        self.spilledEventCount = 0
         return
 
     """
-    Start a new instance of a socket thread that will receive data from our unity application
+    Writes an event to the end of our spill file. The event is written as a single record. If any part of the write fails, our file is
+    truncated back to where the record began, so that every record that we read back is whole
+
+    @type eventToSpill: bytes
+    @param eventToSpill: The event to write
+
+    @type enqueueTime: int
+    @param enqueueTime: The time.perf_counter_ns() value from when the event was queued
+
+    @type serialReadTime: int
+    @param serialReadTime: The time.perf_counter_ns() value from when the event was read from its device. None if unknown
+
+    @rtype: bool
+    @returns: True if the event was successfully written
     """
-    def start_new_socket_receive_thread(self):
-        receiveThread = threading.Thread(target=self.socket_receive)
-        receiveThread.daemon = True
-        receiveThread.start()
+    def write_event(self, eventToSpill, enqueueTime, serialReadTime = None):
+        #0 is written when the read time is unknown
+        spillRecord = enqueueTime.to_bytes(8, byteorder='big') + (serialReadTime or 0).to_bytes(8, byteorder='big') + \
+            len(eventToSpill).to_bytes(2, byteorder='big') + bytes(eventToSpill)
+        recordStart = None
+        try:
+            if self.spillFile == None:
+                #Our file is unbuffered, so that a failed write is seen here rather than when a later read flushes it
+                self.spillFile = tempfile.TemporaryFile(mode='w+b', buffering=0, prefix=self.spillFilePrefix, suffix=".bin", dir=self.spillFileDirectory)
+            self.spillFile.seek(0, os.SEEK_END)
+            recordStart = self.spillFile.tell()
+            if self.spillFile.write(spillRecord) != len(spillRecord):
+                raise IOError("Only part of our event was written")
+        except Exception as e:
+            print ("There was an error writing to our spill file " + os.path.join(self.spillFileDirectory, self.spillFilePrefix))
+            print (e)
+            if recordStart != None:
+                self.remove_partial_record(recordStart)
+            return False
+        self.spilledEventCount += 1
+        return True
+
+    """
+    Removes the part of a record that was written before its write failed
+
+    @type recordStart: int
+    @param recordStart: The position in our file where the record began
+    """
+    def remove_partial_record(self, recordStart):
+        try:
+            self.spillFile.truncate(recordStart)
+        except Exception as e:
+            print ("There was an error removing a partial record from our spill file")
+            print (e)
         return
 
+    """
+    Reads the oldest event that has not been read from our spill file
 
+    @rtype: tuple
+    @returns: The event that was spilled, the time that it was queued and the time that it was read from its device (None if unknown)
     """
-    This method sends all of the events that are currently in our event queue to our
-    Unity Application
+    def read_event(self):
+        self.spillFile.seek(self.readOffset)
+        enqueueTime = int.from_bytes(self.spillFile.read(8), byteorder='big')
+        serialReadTime = int.from_bytes(self.spillFile.read(8), byteorder='big') or None
+        eventSize = int.from_bytes(self.spillFile.read(2), byteorder='big')
+        spilledEvent = bytearray(self.spillFile.read(eventSize))
+        self.readOffset += 18 + eventSize
+        self.spilledEventCount -= 1
+
+        if self.spilledEventCount == 0:
+            self.spillFile.seek(0)
+            self.spillFile.truncate()
+            self.readOffset = 0
+        return spilledEvent, enqueueTime, serialReadTime
 
-    Keep in mind that this method will append a byte at the beginning of the packet so that Unity can appropriately read the size of the packet
+"""
+Builds the frames that we send to our Unity application. Rather than concatenating lists of bytes for every event, each event is
+written directly into a buffer that is reused between flushes. This keeps the cost of a flush linear with the number of bytes that
+we send, even when thousands of events have backed up while Unity was not reading them
+"""
+class TCPFrameEncoder:
+    INITIAL_BUFFER_SIZE = 4096
+
+    def __init__(self):
+        self.frameBuffer = bytearray(TCPFrameEncoder.INITIAL_BUFFER_SIZE)
+        self.frameLength = 0#The number of bytes in our buffer that belong to the current frame
+        return
 
-    NOTE: Adding the size should only be done in this step, You should enque packets as you would like Unity to read them, the size packets will be stripped
-    once our Unity application has appropriately read them
-    For example [0x01, 0x03] would indicate that an omnidongle device was connected
-    Python sends the packets as [0x02, 0x01, 0x03] to say that there are two bytes to read for this packet
-    Unity side will take this information and strip the 0x02 when processing the packet. So unity will see it as [0x01, 0x03]
     """
-    def socket_send(self):
-        
-        totalCount = 0
-        
-        while (totalCount < TCPManager.MAX_THREADING_COUNT):
-            try:
-                socketSend = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                socketSend.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                socketSend.bind((TCPManager.HOST_ADDRESS, TCPManager.SEND_PORT))
-                socketSend.listen(1)
-                conn, addr = socketSend.accept()
+    Clears the current frame so that we can begin writing a new one. The buffer itself is kept so that it can be reused
+    """
+    def reset(self):
+        self.frameLength = 0
+        return
 
-                if DragonMasterDeviceManager.KILL_DEVICE_MANAGER_APPLICATION:
-                    #Messages will not be sent if application is queued to end
-                    print ("Killing Send thread due to Kill Application Event")
-                    return
-                
-                if conn != None:
-                    bytesToSend = []
-                    while not self.tcpEventQueue.empty():
-                        eventToAdd = self.tcpEventQueue.get()
-                        eventToAdd.insert(0, len(eventToAdd))
-                        # eventToAdd.append(self.calculate_checksum_of_packet(eventToAdd))
-
-                        bytesToSend = bytesToSend + eventToAdd
-                        
-                        if (DragonMasterDeviceManager.DEBUG_PRINT_EVENTS_SENT_TO_UNITY):
-                            print ("MSGOUT: " + str(eventToAdd))
-                        eventToAdd.clear()
-                        
-                    convertedByteArrayToSend = bytearray(bytesToSend)#Converting our array into a byte array to send through our TCP socket
-                    
-                    conn.send(convertedByteArrayToSend)
-                    conn.close()
+    """
+    Writes an event into our frame, prefixed with a byte that contains the size of the event
 
-                    self.deviceManager.check_for_joystick_events()#Potentially we might want to look into some other form of sending joystick events...
-                socketSend.close()
-            except Exception as e:
-                print ("Error for socket send")
-                print (e)
-                if socketSend != None:
-                    socketSend.close()
+    @type eventToAdd: list
+    @param eventToAdd: The event that we want to send to Unity. This may be a list of byte values or any bytes-like object
+    """
+    def add_event(self, eventToAdd):
+        eventLength = len(eventToAdd)
+        endOfEvent = self.frameLength + 1 + eventLength
+        if endOfEvent > len(self.frameBuffer):
+            self.grow_buffer(endOfEvent)
+
+        self.frameBuffer[self.frameLength] = eventLength
+        self.frameBuffer[self.frameLength + 1:endOfEvent] = eventToAdd
+        self.frameLength = endOfEvent
+        return
 
-            # sleep(.01)
-            totalCount += 1
-            pass
-        socketSend.close()
-        self.start_new_socket_send_thread()
+    """
+    Doubles the size of our buffer until it can hold at least minimumSize bytes. We allocate a new buffer rather than resizing
+    our current one, as a frame that was previously returned may still be referencing it
+    """
+    def grow_buffer(self, minimumSize):
+        newBufferSize = len(self.frameBuffer) * 2
+        while newBufferSize < minimumSize:
+            newBufferSize *= 2
+        newFrameBuffer = bytearray(newBufferSize)
+        newFrameBuffer[:self.frameLength] = self.frameBuffer[:self.frameLength]
+        self.frameBuffer = newFrameBuffer
         return
 
+    """
+    Returns the frame that has been written so far without copying it
+
+    @rtype: memoryview
+    """
+    def get_frame(self):
+        return memoryview(self.frameBuffer)[:self.frameLength]
+
+"""
+Decodes the events that we receive from our Unity application. Each event is prefixed with two bytes that contain its size. Data is
+read directly into our decoder's buffer using recv_into, and each complete event is returned as a view into that buffer rather than a copy.
+Any partial event at the end of a read is kept and completed by the following read, so an event that is split between multiple reads is
+never lost and does not have to wait for the connection to close
+
+NOTE: The events that are returned point into our receive buffer. They are only valid until the next call to get_read_buffer. If an event
+needs to be kept after that point, it should be copied
+"""
+class TCPFrameDecoder:
+    INITIAL_BUFFER_SIZE = 4096
+    SIZE_PREFIX_LENGTH = 2
+
+    def __init__(self):
+        self.frameBuffer = bytearray(TCPFrameDecoder.INITIAL_BUFFER_SIZE)
+        self.frameBufferView = memoryview(self.frameBuffer)
+        self.dataStart = 0#Index of the first byte that has been received, but not yet decoded
+        self.dataEnd = 0#Index after the last byte that we have received
+        return
 
     """
-    This method will be called to receive 
+    Throws away any partial event that we have received. This should be called any time we open a new connection
+    """
+    def reset(self):
+        self.dataStart = 0
+        self.dataEnd = 0
+        return
 
-    Similar to what was mentioned in the send function, when processing the received packets we will strip the size bytes before processing 
-    our packets through the DeviceManager. 
-    NOTE: As opposed to the above formula where we only append one byte to the beginning of our packet to indicate the size, Unity events contain 2 bytes at the start
-    due to Unity events (particularly printer events) can exceed 256 bytes. 
     """
-    def socket_receive(self):
-        totalCount = 0
-        buff = None
-        while (totalCount < TCPManager.MAX_THREADING_COUNT):
-            try:
-                socketRead = socket.socket()
+    Returns the free space in our buffer that the next read should be written into. Any left over bytes from a partial event are moved
+    to the front of our buffer first. If the free space is smaller than the size requested, or too small to complete the event that we are
+    currently waiting on, we will allocate a larger buffer
 
-                fullResponse = bytearray()
-                socketRead.connect((self.HOST_ADDRESS, self.RECEIVE_PORT))
-                
-                buff = socketRead.recv(TCPManager.MAX_RECV_BUFFER)
-                while buff:
-                    fullResponse += buff
-                    buff = socketRead.recv(TCPManager.MAX_RECV_BUFFER)
+    @type readSize: int
+    @param readSize: The number of bytes we would like to be able to read in
 
-                if (len(fullResponse) > 0):
-                    self.deviceManager.execute_all_events_processed_from_tcp(self.separate_events_received_into_list(fullResponse))
-                socketRead.close()
-            except Exception as e:
-                socketRead.close()
-                
-            sleep(1.0 / 30.0)
-            totalCount += 1
-            pass
+    @rtype: memoryview
+    @returns: A view of the free space at the end of our buffer
+    """
+    def get_read_buffer(self, readSize):
+        leftOverLength = self.dataEnd - self.dataStart
+        if self.dataStart > 0:
+            if leftOverLength > 0:
+                self.frameBuffer[:leftOverLength] = self.frameBuffer[self.dataStart:self.dataEnd]
+            self.dataStart = 0
+            self.dataEnd = leftOverLength
+
+        requiredSize = leftOverLength + readSize
+        if leftOverLength >= TCPFrameDecoder.SIZE_PREFIX_LENGTH:
+            #We already know the size of the event that we are waiting on, so make sure the rest of it can be read in at once
+            requiredSize = max(requiredSize, TCPFrameDecoder.SIZE_PREFIX_LENGTH + (self.frameBuffer[0] << 8) + self.frameBuffer[1])
+        if requiredSize > len(self.frameBuffer):
+            self.grow_buffer(requiredSize)
+        return self.frameBufferView[self.dataEnd:]
 
-        socketRead.close()
-        self.start_new_socket_receive_thread()
+    """
+    Doubles the size of our buffer until it can hold at least minimumSize bytes. We allocate a new buffer rather than resizing
+    our current one, as events that were previously returned may still be referencing it
+    """
+    def grow_buffer(self, minimumSize):
+        newBufferSize = len(self.frameBuffer) * 2
+        while newBufferSize < minimumSize:
+            newBufferSize *= 2
+        newFrameBuffer = bytearray(newBufferSize)
+        newFrameBuffer[:self.dataEnd] = self.frameBuffer[:self.dataEnd]
+        self.frameBuffer = newFrameBuffer
+        self.frameBufferView = memoryview(self.frameBuffer)
         return
 
     """
-    Separates the events into a list. Upon receiving a packet, it is typically sent as one long bytearray.
-    this will break up our events into a list of byte arrays that can be read as events. We will remove the 
-    byte that shows the size of the packet. 
+    Should be called after reading into the buffer returned by get_read_buffer. Yields every event that has been completed so far
+
+    @type numberOfBytes: int
+    @param numberOfBytes: The number of bytes that were written into our read buffer
 
-    @type fullEventData: bytes
-    @param fullEventData: the complete packet that is received from our TCP buffer. This may contain multiple events within the packet
+    @rtype: generator
+    @returns: A memoryview of each complete event with its size bytes stripped
     """
-    def separate_events_received_into_list(self, fullEventData):
-        if fullEventData == None: 
-            return []
-        
-        eventList = []
-        startIndex = 0
-        endIndex = 0
-        sizeOfPacket = 0
-        while startIndex < len(fullEventData):
-            sizeOfPacket = fullEventData[startIndex] << 8
-            sizeOfPacket += fullEventData[startIndex + 1]
-            startIndex += 2 #To be clear, the first two bytes represent the size of the packet, which we will strip when processing our data packets
-            endIndex = startIndex + sizeOfPacket
-
-            eventData = fullEventData[startIndex:endIndex]
-            eventList.append(eventData)
+    def decode_received_bytes(self, numberOfBytes):
+        self.dataEnd += numberOfBytes
+        frameBuffer = self.frameBuffer#Local references, as this loop runs for every event that we receive
+        frameBufferView = self.frameBufferView
+        dataEnd = self.dataEnd
+        startIndex = self.dataStart
+        while startIndex + 2 <= dataEnd:
+            endIndex = startIndex + 2 + ((frameBuffer[startIndex] << 8) | frameBuffer[startIndex + 1])
+            if endIndex > dataEnd:
+                return#The rest of this event has not been received yet
+            self.dataStart = endIndex
+            yield frameBufferView[startIndex + 2:endIndex]
             startIndex = endIndex
-            pass
-        return eventList
-    pass
+        return
+
+    """
+    Copies data that has already been received into our buffer and yields every event that has been completed
+
+    @type receivedData: bytes
+    @param receivedData: data that was received from our Unity application
+    """
+    def decode_bytes(self, receivedData):
+        readBuffer = self.get_read_buffer(len(receivedData))
+        readBuffer[:len(receivedData)] = receivedData
+        return self.decode_received_bytes(len(receivedData))
+
+"""
+Keeps count of latency measurements in buckets that double in size. Bucket 0 holds every measurement below 1 microsecond and bucket n holds
+measurements from 2^(n-1) up to 2^n microseconds. Recording a measurement is cheap enough to be done for every event that we process.
+Percentiles that are returned are the upper bound of the bucket that the percentile falls in
+"""
+class LatencyHistogram:
+    NUMBER_OF_BUCKETS = 32
+
+    def __init__(self):
+        self.reset()
+        return
+
+    """
+    Clears all of the measurements that have been recorded
+    """
+    def reset(self):
+        self.bucketCounts = [0] * LatencyHistogram.NUMBER_OF_BUCKETS
+        self.sampleCount = 0
+        self.totalMicroseconds = 0
+        self.maxMicroseconds = 0
+        return
+
+    """
+    Adds a measurement to our histogram
+
+    @type microseconds: int
+    @param microseconds: The latency that was measured
+    """
+    def record(self, microseconds):
+        microseconds = int(microseconds)
+        self.bucketCounts[min(microseconds.bit_length(), LatencyHistogram.NUMBER_OF_BUCKETS - 1)] += 1
+        self.sampleCount += 1
+        self.totalMicroseconds += microseconds
+        if microseconds > self.maxMicroseconds:
+            self.maxMicroseconds = microseconds
+        return
+
+    """
+    Records the time that has passed since the time passed in
+
+    @type startTime: int
+    @param startTime: A value returned by time.perf_counter_ns()
+    """
+    def record_since(self, startTime):
+        self.record((time.perf_counter_ns() - startTime) // 1000)
+        return
+
+    """
+    Returns the upper bound in microseconds of the bucket that the percentile falls in
+
+    @type percentile: float
+    @param percentile: value between 0 and 100
+    """
+    def get_percentile(self, percentile):
+        if self.sampleCount == 0:
+            return 0
+        samplesToCount = self.sampleCount * percentile / 100.0
+        countedSamples = 0
+        for bucketIndex in range(LatencyHistogram.NUMBER_OF_BUCKETS):
+            countedSamples += self.bucketCounts[bucketIndex]
+            if countedSamples >= samplesToCount:
+                return min(1 << bucketIndex, self.maxMicroseconds)
+        return self.maxMicroseconds
+
+    """
+    Returns a string that displays the number of measurements along with the average, p50, p99 and max latencies
+    """
+    def to_string(self):
+        if self.sampleCount == 0:
+            return "no samples"
+        return "n: " + str(self.sampleCount) + "  avg: " + str(self.totalMicroseconds // self.sampleCount) + "us  p50: " + \
+            str(self.get_percentile(50)) + "us  p99: " + str(self.get_percentile(99)) + "us  max: " + str(self.maxMicroseconds) + "us"
+
+"""
+Measures how long our events take to travel through each hop between our devices and our Unity application. Every measurement is recorded in a
+LatencyHistogram for its hop and event type.
+
+Events to Unity are timed from the moment their first byte is read from a serial device, to being queued, collected into a frame and written
+to our socket. Commands from Unity are timed from the moment they queue an event on their device to the first time their device writes to its
+serial port. The read times are passed along using thread local values, so that none of our device methods need to pass them through themselves.
+Dispatching a command only sets the type of the command that is running. The clock is not read unless the command queues a device event
+"""
+class LatencyTracer:
+    TRACING_ENABLED = True #Adds roughly 0.1us to each Unity command that we dispatch, along with a clock read and a histogram increment for each event we measure
+
+    #region hop names
+    SERIAL_READ_TO_ENQUEUE = "serial read -> enqueue"
+    ENQUEUE_TO_FLUSH = "enqueue -> flush"
+    FLUSH_TO_WIRE = "flush -> wire"
+    SERIAL_READ_TO_WIRE = "serial read -> wire"
+    DISPATCH_TO_DEVICE_WRITE = "dispatch -> device write"#Measured from when the command queued its device event
+
+    HOP_NAMES = [SERIAL_READ_TO_ENQUEUE, ENQUEUE_TO_FLUSH, FLUSH_TO_WIRE, SERIAL_READ_TO_WIRE, DISPATCH_TO_DEVICE_WRITE]
+    #endregion hop names
+
+    def __init__(self):
+        self.hopHistograms = {}#Key: (hopName, eventType) | Value: LatencyHistogram
+        self.threadTraceState = threading.local()
+        self.dispatchingCommandType = None#The Unity command that is being dispatched. A plain value rather than a thread local, as it is set for every command
+        self.dispatchThreadID = None#The thread that dispatches our Unity commands. Events queued on any other thread are never traced against a command
+        return
+
+    """
+    Records the time between the start and end time for an event type in one of our hops
+
+    @type hopName: string
+    @param hopName: One of our HOP_NAMES
+
+    @type eventType: byte
+    @param eventType: The event or command type that was measured
+
+    @type startTime: int
+    @param startTime: time.perf_counter_ns() value from the start of the hop
+
+    @type endTime: int
+    @param endTime: time.perf_counter_ns() value from the end of the hop. If None, the current time is used
+    """
+    def record(self, hopName, eventType, startTime, endTime = None):
+        if not LatencyTracer.TRACING_ENABLED:
+            return
+        if endTime == None:
+            endTime = time.perf_counter_ns()
+        hopHistogram = self.hopHistograms.get((hopName, eventType))
+        if hopHistogram == None:
+            hopHistogram = self.hopHistograms.setdefault((hopName, eventType), LatencyHistogram())
+        hopHistogram.record((endTime - startTime) // 1000)
+        return
+
+    """
+    Should be called by a device's read thread as soon as it reads the first byte of a packet. Any events that are queued on this thread
+    before clear_serial_read_time is called will be timed from this moment
+    """
+    def set_serial_read_time(self):
+        if LatencyTracer.TRACING_ENABLED:
+            self.threadTraceState.serialReadTime = time.perf_counter_ns()
+        return
+
+    """
+    Should be called once a device's read thread has finished processing the packet that it read
+    """
+    def clear_serial_read_time(self):
+        self.threadTraceState.serialReadTime = None
+        return
 
     """
-    This method will calculate the checksum value that should be appended to the packet that we are delivering to our Unity Application
+    Returns the time that the packet being processed on this thread was read. None if this thread is not processing a packet
     """
-    def calculate_checksum_of_packet(self, packetBeforeChecksumByte):
-        checkSumValue = 0
-        for val in packetBeforeChecksumByte:
-            checkSumValue ^= val
-        return checkSumValue
+    def get_serial_read_time(self):
+        return getattr(self.threadTraceState, "serialReadTime", None)
 
+    """
+    Marks this thread as the thread that dispatches our Unity commands. Our receive loops call this once for each read, rather than for
+    every command, as only one receive loop is running at a time. While dispatchingCommandType is set, device events that are queued on
+    this thread will carry the command type and the time that they were queued to their device's worker
+    """
+    def set_dispatch_thread(self):
+        self.dispatchThreadID = threading.get_ident()
+        return
+
+    """
+    Returns the (commandType, dispatchTime) that a device event queued on this thread should carry to its worker. The dispatch time is
+    taken now, so that commands which do not queue a device event never read the clock
+
+    @rtype: tuple
+    @returns: (commandType, dispatchTime). None if this thread is not dispatching a Unity command
+    """
+    def get_command_dispatch(self):
+        commandType = self.dispatchingCommandType
+        if commandType == None or threading.get_ident() != self.dispatchThreadID:
+            return None
+        return (commandType, time.perf_counter_ns())
+
+    """
+    Sets the command that a device worker is carrying out on its thread to a value that was returned by get_command_dispatch. Only used
+    for events that were queued by a Unity command
+
+    @type commandDispatch: tuple
+    @param commandDispatch: (commandType, dispatchTime) or None to clear it
+    """
+    def set_worker_command_dispatch(self, commandDispatch):
+        self.threadTraceState.commandDispatch = commandDispatch
+        return
+
+    """
+    Should be called whenever a device writes to its port. The first write made while carrying out a Unity command records how long it
+    took for that command to reach its device
+    """
+    def record_device_write(self):
+        commandDispatch = getattr(self.threadTraceState, "commandDispatch", None)
+        if commandDispatch != None:
+            self.threadTraceState.commandDispatch = None#Only the first write of a command is measured
+            self.record(LatencyTracer.DISPATCH_TO_DEVICE_WRITE, commandDispatch[0], commandDispatch[1])
+        return
+
+    """
+    Clears all of our measurements
+    """
+    def reset(self):
+        self.hopHistograms = {}
+        return
+
+    """
+    Returns a string that displays the latency of every event type that has been measured, grouped by hop
+    """
+    def to_string(self):
+        hopHistograms = dict(self.hopHistograms)
+        traceString = ""
+        for hopName in LatencyTracer.HOP_NAMES:
+            eventTypes = sorted(eventType for histogramHop, eventType in hopHistograms if histogramHop == hopName)
+            if len(eventTypes) == 0:
+                continue
+            traceString += hopName + '\n'
+            for eventType in eventTypes:
+                traceString += "    " + byte_command_to_string(eventType) + ": " + hopHistograms[(hopName, eventType)].to_string() + '\n'
+        if traceString == "":
+            return "no events have been traced"
+        return traceString.rstrip('\n')
+
+LATENCY_TRACER = LatencyTracer() #Shared by our device manager, TCP manager and devices
 
 #region firmware update methods
 """
@@ -1347,6 +3839,24 @@ def get_latest_firmware_version():
 
 #endregion firmware update methods
 
+#region file helper methods
+"""
+Creates a directory that only the user running our device manager can open, if it does not already exist. Our device manager runs as root,
+so any file that we write should be kept out of directories that other users can write to
+
+@type directoryPath: string
+@param directoryPath: The directory to create
+"""
+def create_private_directory(directoryPath):
+    try:
+        os.makedirs(directoryPath, mode=0o700, exist_ok=True)
+        os.chmod(directoryPath, 0o700)#makedirs does not change the mode of a directory that already exists
+    except Exception as e:
+        print ("There was an error creating the directory " + str(directoryPath))
+        print (e)
+    return
+#endregion file helper methods
+
 #region string helper methods
 """
 Returns a new string that is of the desired length. Fills in remaining space with
@@ -1438,6 +3948,21 @@ def interpret_debug_command(commandToRead, deviceManager):
     elif command == "status":
         debug_status_message(deviceManager)
         return
+    elif command == "tcpstats":
+        debug_tcp_stats(deviceManager)
+        return
+    elif command == "devicestats":
+        debug_device_stats(deviceManager)
+        return
+    elif command == "eventstats":
+        debug_event_stats(deviceManager)
+        return
+    elif command == "stationstate":
+        debug_station_state(deviceManager)
+        return
+    elif command == "latency":
+        debug_latency_trace(deviceManager, len(commandSplit) > 1 and commandSplit[1].lower() == "reset")
+        return
     elif command == "version":
         print ('-' * 60)
         print ("Python Ver: " + sys.version)
@@ -1642,12 +4167,73 @@ def debug_status_message(deviceManager):
         print ("No devices connected...")
         return
 
-    for key in deviceManager.playerStationDictionary:
-        print (deviceManager.playerStationDictionary[key].to_string(True))
+    for playerStation in deviceManager.playerStationRegistry.snapshot().values():
+        print (playerStation.to_string(True))
     print ("TOTAL DEV: " + str(len(deviceManager.allConnectedDevices)))
     
     return
 
+"""
+Prints out the number of events that are waiting to be sent to our Unity application
+"""
+def debug_tcp_stats(deviceManager):
+    print (set_string_length("tcp stats", 60, '-'))
+    print (deviceManager.tcpManager.tcpEventQueue.to_string())
+    print ("enqueue to wire: " + deviceManager.tcpManager.enqueueToWireLatency.to_string())
+    print ("ready to dispatch: " + deviceManager.tcpManager.receiveToDispatchLatency.to_string())
+    print ('-' * 60)
+    return
+
+"""
+Prints out the number of events of each type that have been published to our device event bus, along with the state of each of our subscribers
+"""
+def debug_event_stats(deviceManager):
+    print (set_string_length("event stats", 60, '-'))
+    print (deviceManager.eventCountSubscriber.to_string())
+    if deviceManager.eventJournalSubscriber != None:
+        print (deviceManager.eventJournalSubscriber.to_string())
+    print ('-' * 60)
+    return
+
+"""
+Prints out the last commanded state of each player station that will be restored if its devices reconnect
+"""
+def debug_station_state(deviceManager):
+    print (set_string_length("station state", 60, '-'))
+    print (deviceManager.stationStateStore.to_string())
+    print ('-' * 60)
+    return
+
+"""
+Prints out the latency of each hop between our devices and Unity for every event type that has been traced. Pass in 'reset' to clear
+all measurements
+"""
+def debug_latency_trace(deviceManager, resetMeasurements = False):
+    if resetMeasurements:
+        LATENCY_TRACER.reset()
+        print ("Latency measurements were reset")
+        return
+    print (set_string_length("latency trace", 60, '-'))
+    print (LATENCY_TRACER.to_string())
+    print ('-' * 60)
+    return
+
+"""
+Prints out the number of events that are waiting to be performed by each device along with how long each type of event took to execute
+"""
+def debug_device_stats(deviceManager):
+    print (set_string_length("device stats", 60, '-'))
+    if deviceManager.bootToAllReadySeconds != None:
+        print (set_string_length_multiple("boot to all devices ready", "{:.2f}".format(deviceManager.bootToAllReadySeconds) + "s"))
+    for dev in deviceManager.allConnectedDevices:
+        print (set_string_length_multiple(dev.to_string(), "queued: " + str(dev.get_queue_depth())))
+        if isinstance(dev, DragonMasterSerialDevice.Draxboard):
+            print ("    output writes elided: " + str(dev.elidedOutputWriteCount) + " merged: " + str(dev.mergedOutputWriteCount))
+        for commandName in list(dev.commandExecutionTimes.keys()):
+            print ("    " + commandName + ": " + dev.commandExecutionTimes[commandName].to_string())
+    print ('-' * 60)
+    return
+
 """
 Function to test our threaded device events. Sends 3 queued events all the connected devices that we have
 """
@@ -1670,6 +4256,11 @@ def debug_help_message():
     print ('**General Commands**')
     print ("'quit' - This will exit the python appliation by killing the main thread")
     print ("'status' - Displays all connected devices and their current state")
+    print ("'tcpstats' - Displays the number of events waiting to be sent to Unity in each priority lane and how long they took to send")
+    print ("'devicestats' - Displays the number of events queued for each device and how long each of its commands took to execute")
+    print ("'eventstats' - Displays the number of events of each type that our devices have published")
+    print ("'stationstate' - Displays the last state that Unity commanded for each player station. This is what we restore when a device reconnects")
+    print ("'latency' - Displays how long each type of event took at every hop between our devices and Unity. 'latency reset' clears the measurements")
     print ("'version' - Prints the current version of our python application.")
     print ("'msgout' - This will enable/disable displaying messages that are received from our Unity Application")
     print ("'msgin' - This will enable/disable the messages that we queue to send to our Unity Application")
@@ -2211,66 +4802,10 @@ def debug_print_audit_ticket(deviceManager, playerStationHash = -1):
 Returns a string representation of the commands that are being sent and received. This is relly only for debugging purposes
 """
 def byte_command_to_string(byteCommand):
-    if byteCommand == DragonMasterDeviceManager.STATUS_FROM_UNITY:
-        return "STATUS"
-    elif byteCommand == DragonMasterDeviceManager.DEVICE_CONNECTED:
-        return "DEVICE_CONNECTED"
-    elif byteCommand == DragonMasterDeviceManager.DEVICE_DISCONNECTED:
-        return "DEVICE_DISCONNECTED"
-    elif byteCommand == DragonMasterDeviceManager.OMNI_EVENT:
-        return "OMNI_EVENT"
-    elif byteCommand == DragonMasterDeviceManager.RETRIEVE_CONNECTED_DEVICES:
-        return "RETRIEVE_ALL_DEVICES"
-    elif byteCommand == DragonMasterDeviceManager.DRAX_INPUT_EVENT:
-        return "DRAX_INPUT"
-    elif byteCommand == DragonMasterDeviceManager.DRAX_OUTPUT_EVENT:
-        return "DRAX_OUTPUT"
-    elif byteCommand == DragonMasterDeviceManager.DRAX_OUTPUT_BIT_ENABLE_EVENT:
-        return "DRAX_BIT_ENABLE"
-    elif byteCommand == DragonMasterDeviceManager.DRAX_OUTPUT_BIT_DISABLE_EVENT:
-        return "DRAX_BIT_DISABLE"
-    elif byteCommand == DragonMasterDeviceManager.DRAX_HARD_METER_EVENT:
-        return "DRAX_HARD_METER"
-    elif byteCommand == DragonMasterDeviceManager.JOYSTICK_INPUT_EVENT:
-        return "JOYSTICK_AXIS"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_CASHOUT_TICKET:
-        return "PRINT_CASHOUT"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_AUDIT_TICKET:
-        return "PRINT_AUDIT"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_CODEX_TICKET:
-        return "PRINT_CODEX"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_TEST_TICKET:
-        return "PRINT_TEST"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_REPRINT_TICKET:
-        return "PRINT_REPRINT"
-    elif byteCommand == DragonMasterDeviceManager.PRINT_COMPLETE_EVENT:
-        return "PRINT_COMPLETE"
-    elif byteCommand == DragonMasterDeviceManager.PRINT_ERROR_EVENT:
-        return "PRINT_ERROR_DURING_PRINT"
-    elif byteCommand == DragonMasterDeviceManager.PRINTER_STATE_EVENT:
-        return "PRINT_STATE"
-    elif byteCommand == DragonMasterDeviceManager.BA_BILL_INSERTED_EVENT:
-        return "BA_BILL_INSERT"
-    elif byteCommand == DragonMasterDeviceManager.BA_BILL_ACCEPTED_EVENT:
-        return "BA_BILL_ACCEPTED"
-    elif byteCommand == DragonMasterDeviceManager.BA_BILL_REJECTED_EVENT:
-        return "BA_BILL_REJECTED"
-    elif byteCommand == DragonMasterDeviceManager.BA_BILL_RETURNED_EVENT:
-        return "BA_BILL_RETURNED"
-    elif byteCommand == DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT:
-        return "BA_BILL_STATE"
-    elif byteCommand == DragonMasterDeviceManager.BA_ACCEPT_BILL_EVENT:
-        return "BA_ACCEPT_BILL"
-    elif byteCommand == DragonMasterDeviceManager.BA_REJECT_BILL_EVENT:
-        return "BA_REJECT_BILL"
-    elif byteCommand == DragonMasterDeviceManager.BA_IDLE_EVENT:
-        return "BA_IDLE"
-    elif byteCommand == DragonMasterDeviceManager.BA_INHIBIT_EVENT:
-        return "BA_INHIBIT"
-    elif byteCommand == DragonMasterDeviceManager.BA_RESET_EVENT:
-        return "BA_RESET"
-
-    return "Byte Command Unknown..."
+    unityCommand = UNITY_COMMAND_REGISTRY.get(byteCommand)
+    if unityCommand == None:
+        return "Byte Command Unknown..."
+    return unityCommand.commandName
 
 
 #endregion debug methods
@@ -16,8 +16,9 @@ email: ryan@eq-games.com
 """
 ################################################################################################################################################
 
-os.system("sudo ufw allow " + str(DragonMasterDeviceManager.TCPManager.SEND_PORT))#allows access to the port if it is currently firewalled
-os.system("sudo ufw allow " + str(DragonMasterDeviceManager.TCPManager.RECEIVE_PORT))#allows access to the port if it is currently firewalled
+if not DragonMasterDeviceManager.TCPManager.USE_UNIX_SOCKET:#Unix domain sockets do not go through our firewall
+    os.system("sudo ufw allow " + str(DragonMasterDeviceManager.TCPManager.SEND_PORT))#allows access to the port if it is currently firewalled
+    os.system("sudo ufw allow " + str(DragonMasterDeviceManager.TCPManager.RECEIVE_PORT))#allows access to the port if it is currently firewalled
 
 print ("Launching Device Manager v" + DragonMasterDeviceManager.DragonMasterDeviceManager.VERSION)
 
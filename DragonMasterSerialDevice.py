@@ -9,6 +9,7 @@ import os
 #external imports
 import serial
 import serial.tools.list_ports
+import serial.tools.list_ports_linux
 import threading
 
 #internal project imports
@@ -21,6 +22,7 @@ import DragonMasterDeviceManager
 The base class for all devices that use Serial communication
 """
 class SerialDevice(DragonMasterDevice.DragonMasterDevice):
+    __slots__ = ("serialObject", "pollingDevice", "serialState", "comport")
 
     #region serial states
 
@@ -55,6 +57,7 @@ class SerialDevice(DragonMasterDevice.DragonMasterDevice):
     We will want to close our serial port upon disconnecting our device
     """
     def disconnect_device(self):
+        DragonMasterDevice.DragonMasterDevice.disconnect_device(self)
         self.pollingDevice = False
         self.close_serial_device()
         self.serialState = SerialDevice.SERIAL_NOT_POLLING
@@ -121,12 +124,15 @@ class SerialDevice(DragonMasterDevice.DragonMasterDevice):
             while self.pollingDevice:
                 firstReadByte = self.serialObject.read(1)
                 if firstReadByte != None and len(firstReadByte) > 0:
+                    DragonMasterDeviceManager.LATENCY_TRACER.set_serial_read_time()#Events queued while processing this packet are timed from here
                     self.on_data_received_event(firstReadByte)
+                    DragonMasterDeviceManager.LATENCY_TRACER.clear_serial_read_time()
 
         except Exception as e:
-            print ("There was an error polling device " + str(self.get_player_station_hash()) + ", Error: " + self.to_string())
-            print (e)
-            self.on_poll_serial_errored()
+            if self.pollingDevice:#If we are no longer polling, our device was disconnected on purpose (ex. by a udev remove event) and our read failed because our port was closed
+                print ("There was an error polling device " + str(self.get_player_station_hash()) + ", Error: " + self.to_string())
+                print (e)
+                self.on_poll_serial_errored()
             self.pollingDevice = False  # Thread will end if there is an error polling for a device
 
 
@@ -153,6 +159,7 @@ class SerialDevice(DragonMasterDevice.DragonMasterDevice):
     def write_to_serial(self, messageToSend):
         try:
             self.serialObject.write(messageToSend)
+            DragonMasterDeviceManager.LATENCY_TRACER.record_device_write()
         except Exception as e:
             print ("There was an error writing to our serial device")
             print (e)
@@ -166,6 +173,7 @@ class SerialDevice(DragonMasterDevice.DragonMasterDevice):
 Base class for our Bill Acceptors. This is a class that can apply to every bill acceptor that we add to the project.
 """
 class BillAcceptor(SerialDevice):
+    __slots__ = ()
     DBV_DESCRIPTION = ""
 
     """
@@ -182,11 +190,13 @@ class BillAcceptor(SerialDevice):
 A class that handles all our Bill Acceptor Actions
 """
 class DBV400(BillAcceptor):
+    __slots__ = ("dbvVersionBytes", "dbvVersion", "UID", "UidSet", "State", "AutoReject", "AmountStored", "DOWNLOAD_INDEX", "MAX_DOWNLOAD_BYTE_SIZE", \
+        "DOWNLOAD_START_POSITION", "DOWNLOAD_INFO_COLLECTED", "DOWNLOAD_PROCESS_BEGAN", "idleRestorePending")
     FIRMWARE_UPDATE_FILE_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "DBV400_LatestFirmware.bin")
     #region Constants
     DBV_DESCRIPTION = "DBV-400"
     DBV_BAUDRATE = 9600
-    UID = 0x42
+    DEFAULT_UID = 0x42
     #endregion
     #region Commands
 
@@ -250,17 +260,26 @@ class DBV400(BillAcceptor):
     FIRMWARE_MISMATCH = 0x03d2 #Firmware mismatch... noe entirely sure how you get this
 
     #endregion
-    #region variables
-    UidSet = False # UID of this device has been set. If this is true,
-    State = NOT_INIT_STATE # Current state of the DBV
-    AutoReject = False # If set to true, immediately reject any bills inserted into the DBV. NOTE: We really don't use this anymore. This is handled on Unity's side now
-    AmountStored = 0 # Current amount stored the
-    #endregion
-
     def __init__(self, deviceManager):
         super().__init__(deviceManager)
         self.dbvVersionBytes = []
         self.dbvVersion = None
+        #region variables
+        self.UID = DBV400.DEFAULT_UID
+        self.UidSet = False # UID of this device has been set. If this is true,
+        self.State = DBV400.NOT_INIT_STATE # Current state of the DBV
+        self.AutoReject = False # If set to true, immediately reject any bills inserted into the DBV. NOTE: We really don't use this anymore. This is handled on Unity's side now
+        self.AmountStored = 0 # Current amount stored the
+        self.idleRestorePending = False # Set when our player station was last commanded to idle. We will idle once our startup inhibit has completed
+        #endregion
+
+        #region download variables
+        self.DOWNLOAD_INDEX = 0 #Index in Download packet that we are currently in
+        self.MAX_DOWNLOAD_BYTE_SIZE = 0 #This represents the max number of bytes that we can send at a time for our download packets
+        self.DOWNLOAD_START_POSITION = 0 #Upon starting our download process, the dbv will send a hex address that will indicate where we should write our data, this should be saved so that we do not have to ask for download info before sending each download packet
+        self.DOWNLOAD_INFO_COLLECTED = False #Before starting our download process we should set this to false. If set to false we will request download info. Upon receiving this packet, this will be toggled back to True
+        self.DOWNLOAD_PROCESS_BEGAN = False
+        #endregion
         return
 
 
@@ -399,6 +418,8 @@ class DBV400(BillAcceptor):
             self.State = DBV400.ACTIVE_STATE
 
         self.send_event_message(DragonMasterDeviceManager.DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT,self.State.to_bytes(2, 'big'))#Sends a state update to our unity application
+        if self.State == DBV400.INHIBIT_STATE:
+            self.on_inhibit_state_reached()
         # print("New State: " + str(self.State))
 
     """ We have received a message that the DBV has started (or restarted) and needs to be acknowledged """
@@ -471,6 +492,7 @@ class DBV400(BillAcceptor):
         self.send_dbv_message(inhibitMessage)
         self.send_event_message(DragonMasterDeviceManager.DragonMasterDeviceManager.BA_BILL_STATE_UPDATE_EVENT, self.State.to_bytes(2, 'big'))
         self.check_begin_firmware_download()
+        self.on_inhibit_state_reached()
         return
 
 
@@ -640,6 +662,35 @@ class DBV400(BillAcceptor):
         self.send_dbv_message(DBV400.INHIBIT_REQUEST)
         return
 
+    """
+    Restores the idle state that Unity last commanded for our player station. Our DBV is always inhibited while it starts up, either by
+    start_device or by the reset that follows a power up, and that inhibit may not have been reported yet. So rather than idling now, we
+    idle once our DBV reports that it is inhibited. Any idle or inhibit command from Unity cancels the restore
+    """
+    def restore_idle_state(self):
+        self.idleRestorePending = True
+        self.add_event_to_queue(self.apply_idle_restore)#Idles right away if our DBV is already inhibited
+        return
+
+    """ Cancels an idle restore that has not been applied yet. Called when Unity commands our DBV directly """
+    def cancel_idle_restore(self):
+        self.idleRestorePending = False
+        return
+
+    """ Called whenever our DBV reports that it is inhibited """
+    def on_inhibit_state_reached(self):
+        if self.idleRestorePending:
+            self.add_event_to_queue(self.apply_idle_restore)
+        return
+
+    """ Idles our DBV if a restore is still pending. This runs on our worker, so it is performed in order with the commands from Unity """
+    def apply_idle_restore(self):
+        if not self.idleRestorePending or self.State != DBV400.INHIBIT_STATE:
+            return
+        self.idleRestorePending = False
+        self.idle_dbv()
+        return
+
     """ Power up method. Set the UID of the DBV and reset """
     def power_up_dbv(self):
         self.set_uid()
@@ -672,7 +723,7 @@ class DBV400(BillAcceptor):
     def send_event_message(self, eventType, messageContent):
         message = messageContent
         playerStationHash = self.get_player_station_hash()
-        self.dragonMasterDeviceManager.add_event_to_send(eventType, message, playerStationHash)
+        self.publish_event(eventType, message, playerStationHash)
         return
 
     """ Send event message to request the version of the DBV that that we are running """
@@ -692,12 +743,7 @@ class DBV400(BillAcceptor):
 
 
 
-    DOWNLOAD_INDEX = 0 #Index in Download packet that we are currently in
     DOWNLOAD_PACKET_DATA = [] #List of all the bytes that we need to send to our DBV. This should only need to be opened once per 
-    MAX_DOWNLOAD_BYTE_SIZE = 0 #This represents the max number of bytes that we can send at a time for our download packets
-    DOWNLOAD_START_POSITION = 0 #Upon starting our download process, the dbv will send a hex address that will indicate where we should write our data, this should be saved so that we do not have to ask for download info before sending each download packet
-    DOWNLOAD_INFO_COLLECTED = False #Before starting our download process we should set this to false. If set to false we will request download info. Upon receiving this packet, this will be toggled back to True
-    DOWNLOAD_PROCESS_BEGAN = False
 
     """
 
@@ -998,11 +1044,10 @@ class DBV400(BillAcceptor):
 
 
     def fetch_parent_path(self, deviceElement):
-        devToReturn = None
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if dev.device_path.__contains__(deviceElement.location) and dev.device_path.__contains__(deviceElement.name):
-                devToReturn = dev.parent.parent.parent.device_path
-        return devToReturn
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_serial_device(deviceElement.location, deviceElement.name)
+        if dev == None:
+            return None
+        return dev.parent.parent.parent.device_path
 
     def to_string(self):
         return "DBV-400 " + self.comport
@@ -1017,6 +1062,7 @@ class DBV400(BillAcceptor):
 This bill acceptor is functionally the same as our DBV-400
 """
 class iVizion(DBV400):
+    __slots__ = ()
     DBV_DESCRIPTION = "iVIZION"
 
     def to_string(self):
@@ -1034,6 +1080,7 @@ New device, that is functionally similar to our DBV-400, with additional feature
 DBV-500 devices that are connected
 """
 class DBV500(DBV400):
+    __slots__ = ()
     DBV_DESCRIPTION = "DBV-500"
 
     def to_string(self):
@@ -1050,6 +1097,9 @@ class DBV500(DBV400):
 Class that maanages our Draxboard communication and state
 """
 class Draxboard(SerialDevice):
+    __slots__ = ("versionNumberHigh", "versionNumberLow", "draxOutputState", "playerStationNumber", "meterTicksRemaining", "playerStationHash", \
+        "pendingOutputLock", "pendingOutputIsQueued", "pendingOutputAbsoluteState", "pendingOutputEnableBits", "pendingOutputDisableBits", \
+        "hasWrittenOutputState", "elidedOutputWriteCount", "mergedOutputWriteCount")
     #region command byte arrays
     REQUEST_STATUS = bytearray([0x01, 0x00, 0x01, 0x02])
     SET_OUTPUT_STATE = bytearray([0x04, 0x02, 0x05, 0x00, 0x00, 0x00, 0x00, 0x00])
@@ -1068,6 +1118,8 @@ class Draxboard(SerialDevice):
     IN_METER_MACHINE = 0x02#In some cases our draxboard will have 4 meters. 3 and 4 are meant to represent the machine money in/out
     OUT_METER_MACHINE = 0x03
 
+    DEFAULT_OUTPUT_STATE = 0x180f #The output state that we set on start if Unity has never commanded an output state for this player station
+
     ##Return Packet Data
     #Interupting Events (Not polled)
     INPUT_EVENT_ID = 0xfa
@@ -1109,6 +1161,16 @@ class Draxboard(SerialDevice):
         self.meterTicksRemaining = 0
         self.playerStationHash = 0#The player station hash is a value assigned only to our Draxboard. It is a value derived from the usb path to our draxboard
 
+        #Output commands from Unity are merged here until our worker thread gets to them, so that a burst of commands becomes a single write
+        self.pendingOutputLock = threading.Lock()
+        self.pendingOutputIsQueued = False#True while an apply_pending_output_state event is waiting in our device queue
+        self.pendingOutputAbsoluteState = None#The full output state that was requested. None if only bits were enabled/disabled
+        self.pendingOutputEnableBits = 0
+        self.pendingOutputDisableBits = 0
+        self.hasWrittenOutputState = False#We always write our first output state, since we don't know the state of the draxboard until then
+        self.elidedOutputWriteCount = 0#Output writes that were skipped because they would not have changed our output state
+        self.mergedOutputWriteCount = 0#Output commands that were merged into an output command that was already queued
+
         return
 
     #region Override methods
@@ -1128,8 +1190,12 @@ class Draxboard(SerialDevice):
 
         self.write_to_serial(self.DRAXBOARD_OUTPUT_ENABLE)#Turns on all outputs that need to be on
 
-        self.toggle_output_state_of_drax(0x180f)
         self.playerStationHash = self.get_draxboard_device_path_hash(deviceElement)
+        restoredOutputState = self.dragonMasterDeviceManager.stationStateStore.get_station_state(self.playerStationHash, \
+            DragonMasterDeviceManager.StationStateStore.DRAX_OUTPUT_STATE)#The last output state that Unity set for this station, if we were disconnected or restarted
+        if restoredOutputState == None:
+            restoredOutputState = Draxboard.DEFAULT_OUTPUT_STATE
+        self.toggle_output_state_of_drax(restoredOutputState)
 
         return True
 
@@ -1137,11 +1203,10 @@ class Draxboard(SerialDevice):
     Retrieves the parent path of our draxboard device
     """
     def fetch_parent_path(self, deviceElement):
-        devToReturn = None
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if dev.device_path.__contains__(deviceElement.location) and dev.device_path.__contains__(deviceElement.name):
-                devToReturn = dev.parent.parent.parent.device_path
-        return devToReturn
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_serial_device(deviceElement.location, deviceElement.name)
+        if dev == None:
+            return None
+        return dev.parent.parent.parent.device_path
 
     """
     Sends a request status packet which will return the version number as well as other initialization values.
@@ -1246,7 +1311,7 @@ class Draxboard(SerialDevice):
         try:
             outputBytes = bytePacket[3:7]
             self.draxOutputState = int.from_bytes(outputBytes, byteorder='little')
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_OUTPUT_EVENT, \
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_OUTPUT_EVENT, \
                 outputBytes, self.playerStationHash)
         except Exception as e:
             print("There was an error collecting our output event")
@@ -1350,7 +1415,7 @@ class Draxboard(SerialDevice):
                 return
 
         except Exception as e:
-            self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_METER_ERROR, [], self.playerStationHash)#Add that there was an error attempting to tick meters
+            self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_METER_ERROR, [], self.playerStationHash)#Add that there was an error attempting to tick meters
             print ("There was an error while sending our hard meter tick event")
             print (e)
         return
@@ -1368,7 +1433,7 @@ class Draxboard(SerialDevice):
         if DragonMasterDeviceManager.DragonMasterDeviceManager.DEBUG_SHOW_DRAX_BUTTONS:
             print (str(self.playerStationHash) + ": " + str(inputData))#For debug purposes only
 
-        self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_INPUT_EVENT, inputData, self.playerStationHash)
+        self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_INPUT_EVENT, inputData, self.playerStationHash)
         return
 
     """
@@ -1381,6 +1446,7 @@ class Draxboard(SerialDevice):
         Type 2 - output bit disable (Use this to toggle one bit off)
 
     NOTE: Any other value aside from 0-2 will result in this method not running
+    NOTE: If the resulting output state is the same as our current output state, no packet will be written
     """
     def toggle_output_state_of_drax(self, outputToggleu32, toggleMessageType=0):
         if toggleMessageType == 0:
@@ -1393,6 +1459,9 @@ class Draxboard(SerialDevice):
         else:
             print ("Message type was not valid in toggle_output_state_of_drax")
             return None
+        if self.hasWrittenOutputState and outputToggleu32 == self.draxOutputState:
+            self.elidedOutputWriteCount += 1
+            return
         byte1 = outputToggleu32 >> 24 & 0xff
         byte2 = outputToggleu32 >> 16 & 0xff
         byte3 = outputToggleu32 >> 8 & 0xff
@@ -1408,6 +1477,68 @@ class Draxboard(SerialDevice):
 
         self.write_to_serial(outputMessageArray)
         self.draxOutputState = outputToggleu32
+        self.hasWrittenOutputState = True
+        return
+
+    """
+    Queues an output command for our worker thread. If an output command is already waiting in our queue, this command is merged into it
+    rather than queuing another write, so a burst of output commands from Unity will only write the final output state to our draxboard.
+    The toggle types are the same as toggle_output_state_of_drax
+
+    NOTE: Because merged commands are carried out at the position of the first output command in our queue, they may be written before
+    other types of events (such as meter increments) that were queued between them
+
+    @type outputToggleu32: uint
+    @param outputToggleu32: The output state or output bits that we are toggling
+
+    @type toggleMessageType: int
+    @param toggleMessageType: 0 - set the output state, 1 - enable output bits, 2 - disable output bits
+    """
+    def queue_output_state_change(self, outputToggleu32, toggleMessageType=0):
+        with self.pendingOutputLock:
+            if toggleMessageType == 0:
+                self.pendingOutputAbsoluteState = outputToggleu32
+                self.pendingOutputEnableBits = 0
+                self.pendingOutputDisableBits = 0
+            elif toggleMessageType == 1:
+                if self.pendingOutputAbsoluteState != None:
+                    self.pendingOutputAbsoluteState |= outputToggleu32
+                else:
+                    self.pendingOutputEnableBits |= outputToggleu32
+                    self.pendingOutputDisableBits &= ~outputToggleu32
+            elif toggleMessageType == 2:
+                if self.pendingOutputAbsoluteState != None:
+                    self.pendingOutputAbsoluteState &= ~outputToggleu32
+                else:
+                    self.pendingOutputDisableBits |= outputToggleu32
+                    self.pendingOutputEnableBits &= ~outputToggleu32
+            else:
+                print ("Message type was not valid in queue_output_state_change")
+                return
+
+            if self.pendingOutputIsQueued:
+                self.mergedOutputWriteCount += 1
+                return
+            self.pendingOutputIsQueued = True
+        self.add_event_to_queue(self.apply_pending_output_state)
+        return
+
+    """
+    Writes the output state that results from all of the output commands that were merged by queue_output_state_change. This should
+    only be called from our device worker thread
+    """
+    def apply_pending_output_state(self):
+        with self.pendingOutputLock:
+            outputState = self.pendingOutputAbsoluteState
+            if outputState == None:
+                outputState = self.draxOutputState
+            outputState = (outputState | self.pendingOutputEnableBits) & ~self.pendingOutputDisableBits
+            self.pendingOutputAbsoluteState = None
+            self.pendingOutputEnableBits = 0
+            self.pendingOutputDisableBits = 0
+            self.pendingOutputIsQueued = False
+        self.dragonMasterDeviceManager.stationStateStore.set_station_state(self.playerStationHash, DragonMasterDeviceManager.StationStateStore.DRAX_OUTPUT_STATE, outputState)
+        self.toggle_output_state_of_drax(outputState, 0)
         return
 
 
@@ -1416,7 +1547,7 @@ class Draxboard(SerialDevice):
     """
     def send_current_drax_output_state(self, byte1, byte2):
         packetToSend = [byte1, byte2]
-        self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_OUTPUT_EVENT, packetToSend, self.playerStationHash)
+        self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.DRAX_OUTPUT_EVENT, packetToSend, self.playerStationHash)
         return
 
 
@@ -1448,6 +1579,7 @@ serial communication to retrieve the state of the device and the paper level. Ha
 commands that are special to the reliance printer as well
 """
 class ReliancePrinterSerial(SerialDevice):
+    __slots__ = ("associatedReliancePrinter",)
     #####Command List for Reliance Printer#####
     PRINTER_STATUS_REQUEST = bytearray([0x10, 0x04, 0x14])
     PAPER_STATUS_REQUEST = bytearray([0x10, 0x04, 0x04])
@@ -1484,6 +1616,8 @@ class ReliancePrinterSerial(SerialDevice):
     def poll_serial_thread(self):
         self.pollingDevice = True
         self.serialState = SerialDevice.SERIAL_WAIT_FOR_EVENT
+        if DragonMasterDeviceManager.DragonMasterDeviceManager.HANDLE_UDEV_REMOVE_EVENTS:
+            return#Our device manager will remove this device when udev tells us that it was unplugged, so we do not need to poll it. pollingDevice is left on, as it marks this device as connected
         try:
             while self.pollingDevice:
                 if self.serialObject.in_waiting:#This is strictly just here to throw an exception if the device is ever disconnected. That way we can properly remove from the device manager
@@ -1566,6 +1700,7 @@ our device, this class strictly relays packets between this device and our Unity
 in this class is whether or not it is connected
 """
 class Omnidongle(SerialDevice):
+    __slots__ = ()
     OMNI_BAUD_RATE = 19200
     OMNI_BIT_RATE = 8
     OMNI_SERIAL_DESCRIPTION = "POM OmniDongle"
@@ -1600,6 +1735,8 @@ class Omnidongle(SerialDevice):
     def poll_serial_thread(self):
         self.pollingDevice = True
         self.serialState = SerialDevice.SERIAL_WAIT_FOR_EVENT
+        if DragonMasterDeviceManager.DragonMasterDeviceManager.HANDLE_UDEV_REMOVE_EVENTS:
+            return#Our device manager will remove this device when udev tells us that it was unplugged, so we do not need to poll it. pollingDevice is left on, as it marks this device as connected
         try:
             while self.pollingDevice:
                 if self.serialObject.in_waiting:#This is strictly just here to throw an exception if the device is ever disconnected. That way we can properly remove from the device manager
@@ -1624,9 +1761,9 @@ class Omnidongle(SerialDevice):
     """
     def fetch_parent_path(self, deviceElement):
         devToReturn = None
-        for dev in self.dragonMasterDeviceManager.deviceContext.list_devices():
-            if dev.device_path.__contains__(deviceElement.location) and dev.device_path.__contains__(deviceElement.name):
-                devToReturn = dev.parent.parent.parent.parent.device_path
+        dev = self.dragonMasterDeviceManager.get_device_topology_index().get_serial_device(deviceElement.location, deviceElement.name)
+        if dev != None:
+            devToReturn = dev.parent.parent.parent.parent.device_path
         print (devToReturn)
         return devToReturn
 
@@ -1662,7 +1799,7 @@ class Omnidongle(SerialDevice):
 
         sleep(.025)#Give it a small buffer time before reading the packet in. Omnidonge message can get very long and we may miss something if we start reading immediately
         fullOmnidongleResponse = firstByteOfPacket + self.serialObject.read(self.serialObject.in_waiting)
-        self.dragonMasterDeviceManager.add_event_to_send(DragonMasterDeviceManager.DragonMasterDeviceManager.OMNI_EVENT , fullOmnidongleResponse)#returns the response from our omnidongle
+        self.publish_event(DragonMasterDeviceManager.DragonMasterDeviceManager.OMNI_EVENT , fullOmnidongleResponse)#returns the response from our omnidongle
 
     """
     Returns the type of device as well as the comport that this device is associated with
@@ -1679,57 +1816,76 @@ class Omnidongle(SerialDevice):
 
 ##Search Device Methods
 """
-Returns a list of all connected DBV 400 comports
+Rules used to classify each of our comports by its description. The first rule with a description that is found in the comport description
+is used. Each rule is (Description (string), Serial device class (type))
 """
-def get_all_connected_bill_acceptors():
-    dbv400Elements = []
-    iVizionElements = []
-    dbv500Elements = []
-    allPorts = serial.tools.list_ports.comports()
-    for element in allPorts:
-        if element.description.__contains__(DBV400.DBV_DESCRIPTION):
-            dbv400Elements.append(element)
-        if element.description.__contains__(iVizion.DBV_DESCRIPTION):
-            iVizionElements.append(element)
-        if element.description.__contains__(DBV500.DBV_DESCRIPTION):
-            dbv500Elements.append(element)
-
-    return dbv400Elements, iVizionElements, dbv500Elements
+SERIAL_DEVICE_RULES = (
+    (Draxboard.DRAX_DESCRIPTION, Draxboard),
+    (Draxboard.ALT_DRAX_DESCRIPTION, Draxboard),
+    (DBV400.DBV_DESCRIPTION, DBV400),
+    (iVizion.DBV_DESCRIPTION, iVizion),
+    (DBV500.DBV_DESCRIPTION, DBV500),
+    (Omnidongle.OMNI_SERIAL_DESCRIPTION, Omnidongle),
+    (ReliancePrinterSerial.RELIANCE_SERIAL_DESCRIPTION, ReliancePrinterSerial),
+)
 
 """
-Returns the first omnidongle comport that we find
+Returns every comport that is connected to our machine. This is the only place that we should list our comports, so that a search
+only enumerates them once
 """
-def get_omnidongle_comports():
-    allPorts = serial.tools.list_ports.comports()
+def get_all_serial_port_elements():
+    return serial.tools.list_ports.comports()
 
-    for element in allPorts:
-        if element.description.__contains__(Omnidongle.OMNI_SERIAL_DESCRIPTION):
-            return element
+"""
+Sorts the comports that are passed in by the serial device class that should be created for them. Comports that do not belong to one of
+our devices are left out
 
-    return None
+@rtype: dict
+@returns: Key: Serial device class (type) | Value: list of comport elements
+"""
+def classify_serial_port_elements(allPorts):
+    elementsByDeviceClass = {}
+    for element in allPorts:
+        deviceClass = get_serial_device_class_for_element(element)
+        if deviceClass != None:
+            elementsByDeviceClass.setdefault(deviceClass, []).append(element)
+    return elementsByDeviceClass
 
 """
-Returns a list of all the connected draxboards that are found in our system
+Returns a list of all Reliance serial comports. During a search, read from the DeviceDiscoverySnapshot instead, so that our comports are
+only listed once
 """
-def get_all_connected_draxboard_elements():
-    allPorts = serial.tools.list_ports.comports()
-    draxboardElements = []
-    for element in allPorts:
-        if element.description.__contains__(Draxboard.DRAX_DESCRIPTION) or element.description.__contains__(Draxboard.ALT_DRAX_DESCRIPTION):
-            draxboardElements.append(element)
+def get_all_reliance_printer_serial_elements():
+    return classify_serial_port_elements(get_all_serial_port_elements()).get(ReliancePrinterSerial, [])
 
-    return draxboardElements
+"""
+Returns the comport element of a single serial device node. This lets us look at a newly connected device without listing every comport
+in our system. Returns None if the node is not a usb serial device
 
+@type deviceNode: string
+@param deviceNode: The path to our serial device (ex. /dev/ttyACM0)
 """
-Returns a list of all Reliance serial comports
+def get_serial_port_element(deviceNode):
+    try:
+        portElement = serial.tools.list_ports_linux.SysFS(deviceNode)
+    except Exception as e:
+        print ("There was an error reading the serial port " + str(deviceNode))
+        print (e)
+        return None
+    if portElement.subsystem == 'platform':#Built in serial ports are skipped, the same way they are when listing comports
+        return None
+    return portElement
+
 """
-def get_all_reliance_printer_serial_elements():
-    allPorts = serial.tools.list_ports.comports()
-    relianceElements = []
-    for element in allPorts:
-        if element.description.__contains__(ReliancePrinterSerial.RELIANCE_SERIAL_DESCRIPTION):
-            relianceElements.append(element)
+Returns the serial device class that should be created for the comport element that is passed in, using our SERIAL_DEVICE_RULES.
+Returns None if the comport does not belong to one of our devices
 
-    return relianceElements
+@rtype: type
+"""
+def get_serial_device_class_for_element(portElement):
+    for description, deviceClass in SERIAL_DEVICE_RULES:
+        if portElement.description.__contains__(description):
+            return deviceClass
+    return None
 
 #End Search Device Methods
\ No newline at end of file